@@ -5,19 +5,17 @@ import argparse
 import locale
 import six
 
-from requests.exceptions import HTTPError
-from dateutil import parser as date_parser
-
 from .config import settings
 from . import Log
-from . import credential_store as creds
 
 from .text_utils import _encode
-from .commands import JQLCommand
+from .__main__ import lazy_command
 
 def dump_command(command, encoding):
+    dump_issue(next(command.execute()), encoding)
+
+def dump_issue(issue, encoding):
     headers = dict(settings.items('headers'))
-    issue = next(command.execute())
     for k in sorted(issue):
         _k = _encode(encoding, k)
         _v = _encode(encoding, headers.get(k.lower()))
@@ -26,6 +24,22 @@ def dump_command(command, encoding):
         sys.stdout.write(_str)
         sys.stdout.write('\n')
             
+def dump_stored_issue(directory, base_url, issuekey, encoding, username=None, password=None, offline=False):
+    '''Dump {issuekey} looked up through the issue store in {directory}.
+    When {offline} the issue must already be stored.'''
+    from . import jira
+    from .dataprocessor import flatten_json_struct
+    from .issue_store import IssueStore
+
+    with IssueStore(directory, base_url) as store:
+        jira.use_issue_store(store, offline=offline)
+        try:
+            issue = jira.get_issue(base_url, issuekey, username=username, password=password)
+        finally:
+            jira.use_issue_store(None)
+    dump_issue({k:v for k,v in flatten_json_struct(issue, datetime_fields=['lastViewed', 'created', 'updated'])},
+               encoding)
+
 def create_parser(settings):
 
     base_url = settings.get('jira','base_url')
@@ -50,6 +64,11 @@ def create_parser(settings):
         help='Password (insecure), if blank will prommpt',
         default=None)
 
+    parser.add_argument('-t', '--api-token',
+        metavar='TOKEN',
+        help='Jira API token, used instead of password and keyring [default: $QJIRA_API_TOKEN]',
+        default=os.getenv('QJIRA_API_TOKEN'))
+
     parser.add_argument('-d', '--debug',
         dest='debugLevel',
         action='count',
@@ -60,6 +79,15 @@ def create_parser(settings):
         default='ASCII',
         help='Specify an output encoding. In Python 2.x, only default ASCII is supported.')
 
+    parser.add_argument('--store',
+        metavar='DIR',
+        default=None,
+        help='Look the issue up by key through issue store DIR, storing it')
+
+    parser.add_argument('--offline',
+        action='store_true',
+        help='Read the issue from the issue store only, no network')
+
     parser.add_argument('--add-field', '-f',
         action='append',
         metavar='NAME',
@@ -68,7 +96,7 @@ def create_parser(settings):
     parser.add_argument('issuekey',
         help='Provide an issuekey value.')
 
-    parser.set_defaults(func=JQLCommand)
+    parser.set_defaults(func=lazy_command('JQLCommand'))
     
     return parser
 
@@ -89,12 +117,23 @@ def main(args=None):
     if my_args.debugLevel:
         Log.debugLevel = my_args.debugLevel
 
+    if my_args.offline:
+        if not my_args.store:
+            parser.error('--offline requires --store')
+        dump_stored_issue(my_args.store, my_args.base_url, my_args.issuekey, my_args.encoding, offline=True)
+        return
+
     func_args = {k:v for k,v in vars(my_args).items()
-                 if k not in ['func', 'user', 'password', 'debugLevel', 'encoding', 'issuekey']}
+                 if k not in ['func', 'user', 'password', 'api_token', 'debugLevel', 'encoding', 'issuekey',
+                              'store', 'offline']}
         
+    from requests.exceptions import HTTPError
+    from . import credential_store as creds
+
     # get/store user private Jira credentials from OS keyring
     username, password = creds.get_credentials(my_args.user,
-                                               my_args.password)
+                                               my_args.password,
+                                               api_token=my_args.api_token)
 
     func_args.update({
         'username': username,
@@ -106,10 +145,14 @@ def main(args=None):
     command = my_args.func(**func_args)
     
     try:
-        dump_command(command, my_args.encoding)
+        if my_args.store:
+            dump_stored_issue(my_args.store, my_args.base_url, my_args.issuekey, my_args.encoding,
+                              username=username, password=password)
+        else:
+            dump_command(command, my_args.encoding)
     except HTTPError as err:
         if err.response.status_code == 401:
-            creds.clear_credentials(username)
+            creds.clear_credentials(username, api_token=my_args.api_token)
         raise err
 
 if __name__ == "__main__":
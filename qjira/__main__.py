@@ -10,15 +10,12 @@ import io
 import os
 import argparse
 import locale
-
-from requests.exceptions import HTTPError
-from dateutil import parser as date_parser
+import importlib
 
 from .config import settings
 from . import Log
-from . import credential_store as creds
-
-from .commands import *
+from .timing import Timing
+from .metrics import HttpMetrics
 
 PY3 = sys.version_info > (3,)
 
@@ -48,14 +45,37 @@ def _open(filepath, encoding):
     else:
         return io.open(filepath, 'wb')
 
+def _write_metrics(filepath, textfile):
+    '''Write the HTTP metrics as JSON to {filepath} and Prometheus {textfile}.'''
+    if filepath == '-':
+        HttpMetrics.write_json(sys.stderr)
+    elif filepath:
+        with open(filepath, 'w') as f:
+            HttpMetrics.write_json(f)
+    if textfile:
+        HttpMetrics.write_textfile(textfile)
+
 def date_string(string):
     '''Convert supplied string to a datetime.date() object.'''
+    from dateutil import parser as date_parser
     try:
         value = date_parser.parse(string)
     except ValueError as ve:
         raise argparse.ArgumentTypeError(ve)
     return value.date()
 
+def lazy_command(class_name):
+    '''Return a factory for the named command class.
+
+    The qjira.commands package (and with it requests, dateutil, etc.) is
+    only imported once a command is created, so printing usage or argument
+    errors stays fast.
+    '''
+    def create_command(*args, **kwargs):
+        commands = importlib.import_module('.commands', __package__)
+        return getattr(commands, class_name)(*args, **kwargs)
+    create_command.__name__ = class_name
+    return create_command
 
 def create_parser(settings):
 
@@ -81,6 +101,11 @@ def create_parser(settings):
         help='Password (insecure), if blank will prommpt',
         default=None)
 
+    parser.add_argument('-t', '--api-token',
+        metavar='TOKEN',
+        help='Jira API token, used instead of password and keyring [default: $QJIRA_API_TOKEN]',
+        default=os.getenv('QJIRA_API_TOKEN'))
+
     parser.add_argument('-d', '--debug',
         dest='debugLevel',
         action='count',
@@ -91,6 +116,42 @@ def create_parser(settings):
         action='store_true',
         help='Process single record only')                
 
+    parser.add_argument('--profile',
+        action='store_true',
+        help='Print time spent per processing stage to stderr')
+
+    parser.add_argument('--profile-json',
+        metavar='FILENAME',
+        default=None,
+        help='Write time spent per processing stage as JSON to FILENAME')
+
+    parser.add_argument('--metrics',
+        metavar='FILENAME',
+        default=None,
+        help='Write Jira request metrics as JSON to FILENAME, use - for stderr')
+
+    parser.add_argument('--metrics-textfile',
+        metavar='FILENAME',
+        default=None,
+        help='Write Jira request metrics in Prometheus textfile format to FILENAME')
+
+    parser.add_argument('--store',
+        metavar='DIR',
+        default=None,
+        help='Keep issues looked up by key, e.g. epics, in issue store DIR')
+
+    snapshot_group = parser.add_mutually_exclusive_group()
+
+    snapshot_group.add_argument('--record',
+        metavar='FILE',
+        default=None,
+        help='Record all Jira responses into snapshot archive FILE')
+
+    snapshot_group.add_argument('--replay',
+        metavar='FILE',
+        default=None,
+        help='Answer all Jira requests from snapshot archive FILE, no network')
+
     parser.set_defaults(func=None)
 
     # sub-commands: velocity, cycletimes, summary, techdebt
@@ -149,7 +210,53 @@ def create_parser(settings):
         parents=[parser_command_options],
         help='Produce cycletime data')
 
-    parser_cycletime.set_defaults(func=CycleTimeCommand)
+    parser_cycletime.add_argument('--order',
+        choices=['sorted', 'streaming'],
+        default='sorted',
+        help='Sort issues by cycle dates, or write each issue as soon as it is processed [default: sorted]')
+
+    parser_cycletime.add_argument('--stats',
+        action='store_true',
+        help='Output count, mean, percentiles and histogram of cycle days')
+
+    parser_cycletime.add_argument('--group-by',
+        metavar='COLUMN',
+        action='append',
+        help='Group --stats by column(s), e.g. issuetype_name')
+
+    parser_cycletime.set_defaults(func=lazy_command('CycleTimeCommand'))
+
+    parser_timeinstatus = subparsers.add_parser('timeinstatus',
+        parents=[parser_command_options],
+        help='Produce days spent in each status')
+
+    parser_timeinstatus.add_argument('--business-days',
+        action='store_true',
+        help='Count business days only, see weekend and holidays settings')
+
+    parser_timeinstatus.add_argument('--aggregate',
+        action='store_true',
+        help='Output issues, total and mean days per status')
+
+    parser_timeinstatus.set_defaults(func=lazy_command('TimeInStatusCommand'))
+
+    parser_flow = subparsers.add_parser('flow',
+        parents=[parser_command_options],
+        help='Produce daily issue count per status')
+
+    parser_flow.add_argument('-S', '--start-date',
+        type=date_string,
+        metavar='yyyy/mm/dd',
+        default=None,
+        help='First day [default: first status change]')
+
+    parser_flow.add_argument('-E', '--end-date',
+        type=date_string,
+        metavar='yyyy/mm/dd',
+        default=None,
+        help='Last day [default: today]')
+
+    parser_flow.set_defaults(func=lazy_command('FlowCommand'))
 
     parser_velocity = subparsers.add_parser('velocity',
         parents=[parser_command_options],
@@ -169,7 +276,38 @@ def create_parser(settings):
         default=None,
         help='Filter sprints starting earlier than START date.')
 
-    parser_velocity.set_defaults(func=VelocityCommand)
+    # the cached run only requests recent issues, too few for throughput
+    velocity_history_group = parser_velocity.add_mutually_exclusive_group()
+
+    velocity_history_group.add_argument('--cache',
+        dest='cache_file',
+        metavar='FILE',
+        default=None,
+        help='Keep closed sprint velocity in FILE, later runs fetch only open and updated sprints')
+
+    parser_velocity.add_argument('--backlog',
+        type=float,
+        metavar='EFFORT',
+        default=None,
+        help='Forecast when EFFORT remaining is done with Monte Carlo simulations of past sprints')
+
+    velocity_history_group.add_argument('--throughput',
+        action='store_true',
+        help='Forecast from issues completed per week, --backlog counts issues')
+
+    parser_velocity.add_argument('--trials',
+        type=int,
+        metavar='N',
+        default=10000,
+        help='Monte Carlo simulations of the forecast [default: 10000]')
+
+    parser_velocity.add_argument('--limit',
+        type=int,
+        metavar='N',
+        default=None,
+        help='Output only the latest N sprints')
+
+    parser_velocity.set_defaults(func=lazy_command('VelocityCommand'))
 
     parser_summary = subparsers.add_parser('summary',
         parents=[parser_command_options],
@@ -185,19 +323,36 @@ def create_parser(settings):
         dest='use_csv_formatter',
         help='Output CSV rather than HTML Fragments')
     
-    parser_summary.set_defaults(func=SummaryCommand)
+    parser_summary.add_argument('--limit',
+        type=int,
+        metavar='N',
+        default=None,
+        help='Output only the first N issues')
+
+    parser_summary.set_defaults(func=lazy_command('SummaryCommand'))
 
     parser_techdebt = subparsers.add_parser('debt',
         parents=[parser_command_options],
         help='Produce tech debt report')
 
-    parser_techdebt.set_defaults(func=TechDebtCommand)
+    parser_techdebt.add_argument('--by',
+        choices=['sprint', 'month'],
+        default=None,
+        help='Tech debt per sprint or month the issues were completed in')
+
+    parser_techdebt.add_argument('--cache',
+        dest='cache_file',
+        metavar='FILE',
+        default=None,
+        help='Keep closed sprints or months of --by in FILE, later runs fetch only recent updates')
+
+    parser_techdebt.set_defaults(func=lazy_command('TechDebtCommand'))
 
     parser_backlog = subparsers.add_parser('backlog',
         parents=[parser_command_options],
         help='Query bug backlog by fixVersion')
 
-    parser_backlog.set_defaults(func=BacklogCommand)
+    parser_backlog.set_defaults(func=lazy_command('BacklogCommand'))
 
     parser_worklog = subparsers.add_parser('worklog',
         parents=[parser_common],
@@ -225,7 +380,32 @@ def create_parser(settings):
         action='store_true',
         help='Restrict listings to authors provided.')
 
-    parser_worklog.add_argument('--total',
+    parser_worklog.add_argument('--sync',
+        dest='worklog_store',
+        metavar='FILE',
+        default=None,
+        help='Sync worklogs into FILE and report from it, only changed worklogs are requested')
+
+    # the timesheet has a total column per author
+    worklog_total_group = parser_worklog.add_mutually_exclusive_group()
+
+    worklog_total_group.add_argument('--team',
+        action='store_true',
+        help='Output a timesheet of the authors, days logged per author and day')
+
+    parser_worklog.add_argument('--shard-size',
+        type=int,
+        metavar='N',
+        default=1,
+        help='Search the issues of N authors at a time in --team mode [default: 1]')
+
+    parser_worklog.add_argument('--workers',
+        type=int,
+        metavar='N',
+        default=8,
+        help='Concurrent Jira requests in --team mode [default: 8]')
+
+    worklog_total_group.add_argument('--total',
         dest='total_by_username',
         action='store_true',
         help='Include total days per author')
@@ -233,7 +413,13 @@ def create_parser(settings):
 #    parser_worklog.add_argument('-G', '--group-by',
 #        help='Group results by an arbitrary (existing) column, e.g. project_name.')
 
-    parser_worklog.set_defaults(func=WorklogCommand)
+    parser_worklog.add_argument('--limit',
+        type=int,
+        metavar='N',
+        default=None,
+        help='Output only the first N rows, or N authors with --team')
+
+    parser_worklog.set_defaults(func=lazy_command('WorklogCommand'))
     
     parser_jql = subparsers.add_parser('jql',
         parents=[parser_common],
@@ -256,7 +442,7 @@ def create_parser(settings):
         nargs='?',
         help='Define a pivot field, e.g. fixVersions')
     
-    parser_jql.set_defaults(func=JQLCommand)
+    parser_jql.set_defaults(func=lazy_command('JQLCommand'))
     
     return parser
 
@@ -275,8 +461,9 @@ def main(args=None):
     # filter out arguments commands do not need to understand
     func_args = {k:v for k,v in vars(my_args).items()
                  if k not in ['func', 'subparser_name', 'outfile', 'debugLevel',
-                              'suppress_progress', 'user', 'password',
-                              'delimiter', 'encoding', 'oneShot']}
+                              'suppress_progress', 'user', 'password', 'api_token',
+                              'delimiter', 'encoding', 'oneShot', 'profile', 'profile_json',
+                              'metrics', 'metrics_textfile', 'record', 'replay', 'store']}
 
     # build up some additional keyword args for the commands
     if not my_args.suppress_progress:
@@ -285,14 +472,38 @@ def main(args=None):
     if my_args.oneShot:
         func_args.update({'continue_cb': lambda: False})
 
-    # get/store user private Jira credentials from OS keyring
-    username, password = creds.get_credentials(my_args.user,
-                                               my_args.password)
+    from requests.exceptions import HTTPError
+    from . import credential_store as creds
+
+    if my_args.replay:
+        from .snapshot import Snapshot
+        # no network, so no credentials either
+        Snapshot.replay(my_args.replay)
+        username, password = None, None
+    else:
+        # get/store user private Jira credentials from OS keyring
+        username, password = creds.get_credentials(my_args.user,
+                                                   my_args.password,
+                                                   api_token=my_args.api_token)
+        if my_args.record:
+            from .snapshot import Snapshot
+            Snapshot.record(my_args.record)
+
     func_args.update({
         'username': username,
         'password': password
     })
 
+    Timing.reset(enabled=my_args.profile or bool(my_args.profile_json))
+    HttpMetrics.reset()
+
+    store = None
+    if my_args.store:
+        from . import jira
+        from .issue_store import IssueStore
+        store = IssueStore(my_args.store, my_args.base_url)
+        jira.use_issue_store(store)
+
     Log.debug('Args: {0}'.format(func_args))
     command = my_args.func(**func_args)
     output_writer = command.writer
@@ -302,8 +513,22 @@ def main(args=None):
                                      delimiter=my_args.delimiter)
     except HTTPError as err:
         if err.response.status_code == 401:
-            creds.clear_credentials(username)
+            creds.clear_credentials(username, api_token=my_args.api_token)
         raise err
+    finally:
+        if my_args.record or my_args.replay:
+            Snapshot.close()
+        if store:
+            jira.use_issue_store(None)
+            store.close()
+        # failed runs are reported too, alerts depend on them
+        _write_metrics(my_args.metrics, my_args.metrics_textfile)
+
+    if my_args.profile:
+        Timing.write_report(sys.stderr)
+    if my_args.profile_json:
+        with open(my_args.profile_json, 'w') as f:
+            Timing.write_json(f)
 
 if __name__ == "__main__":
     locale.setlocale(locale.LC_TIME, 'en_US')
@@ -1,41 +1,13 @@
 import sys
-import io
 import os
 import argparse
 import locale
 import six
 
-from requests.exceptions import HTTPError
-from dateutil import parser as date_parser
-
 from .config import settings
 from . import Log
-from . import credential_store as creds
-
-from .text_utils import _encode
-from .commands import WorklogCommand
-
-def _open(filepath, encoding):
-    '''Open the file with given encoding.
-
-    If the filepath is the default sys.stdout, just return it.
-    '''
-    if not filepath:
-        return sys.stdout
-    elif PY3:
-        return io.open(filepath, 'wt',
-                       encoding=encoding,
-                       newline='')
-    else:
-        return io.open(filepath, 'wb')
-
-def date_string(string):
-    '''Convert supplied string to a datetime.date() object.'''
-    try:
-        value = date_parser.parse(string)
-    except ValueError as ve:
-        raise argparse.ArgumentTypeError(ve)
-    return value.date()
+
+from .__main__ import lazy_command, date_string, _open
 
 def create_parser(settings):
 
@@ -61,6 +33,11 @@ def create_parser(settings):
         help='Password (insecure), if blank will prommpt',
         default=None)
 
+    parser.add_argument('-t', '--api-token',
+        metavar='TOKEN',
+        help='Jira API token, used instead of password and keyring [default: $QJIRA_API_TOKEN]',
+        default=os.getenv('QJIRA_API_TOKEN'))
+
     parser.add_argument('-d', '--debug',
         dest='debugLevel',
         action='count',
@@ -95,7 +72,13 @@ def create_parser(settings):
         default=None,
         help='Exclude worklogDate after end date')
     
-    parser.set_defaults(func=WorklogCommand)
+    parser.add_argument('--sync',
+        dest='worklog_store',
+        metavar='FILE',
+        default=None,
+        help='Sync worklogs into FILE and report from it, only changed worklogs are requested')
+
+    parser.set_defaults(func=lazy_command('WorklogCommand'))
     
     return parser
 
@@ -113,11 +96,15 @@ def main(args=None):
         Log.debugLevel = my_args.debugLevel
 
     func_args = {k:v for k,v in vars(my_args).items()
-                 if k not in ['func', 'user', 'password', 'debugLevel', 'encoding', 'outfile', 'delimiter']}
+                 if k not in ['func', 'user', 'password', 'api_token', 'debugLevel', 'encoding', 'outfile', 'delimiter']}
         
+    from requests.exceptions import HTTPError
+    from . import credential_store as creds
+
     # get/store user private Jira credentials from OS keyring
     username, password = creds.get_credentials(my_args.user,
-                                               my_args.password)
+                                               my_args.password,
+                                               api_token=my_args.api_token)
 
     func_args.update({
         'username': username,
@@ -136,7 +123,7 @@ def main(args=None):
 
     except HTTPError as err:
         if err.response.status_code == 401:
-            creds.clear_credentials(username)
+            creds.clear_credentials(username, api_token=my_args.api_token)
         raise err
 
 if __name__ == "__main__":
@@ -0,0 +1,38 @@
+'''JSON cache files holding an entry per key, e.g. one per query.
+
+The file is rewritten through a temporary file and a rename, so readers
+never see a partial file.
+'''
+import os
+import json
+
+from .log import Log
+
+def read(path):
+    '''Return all entries of cache file {path}, empty when missing or
+    unreadable.'''
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+
+def load(path, key):
+    '''Return entry {key} of cache file {path}, None when missing.'''
+    return read(path).get(key)
+
+def save(path, key, entry):
+    '''Replace entry {key} in cache file {path}.'''
+    entries = read(path)
+    entries[key] = entry
+    tmp_path = '{0}.{1}'.format(path, os.getpid())
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(entries, f, sort_keys=True)
+        if os.name != 'posix' and os.path.exists(path):
+            os.remove(path)
+        os.rename(tmp_path, path)
+    except (IOError, OSError) as err:
+        Log.error(err)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
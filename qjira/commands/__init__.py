@@ -4,6 +4,8 @@ Enable loading of various commands from qjira.commands package.
 from .base_command import BaseCommand
 from .velocity import VelocityCommand
 from .cycletime import CycleTimeCommand
+from .timeinstatus import TimeInStatusCommand
+from .flow import FlowCommand
 from .summary import SummaryCommand
 from .techdebt import TechDebtCommand
 from .backlog import BacklogCommand
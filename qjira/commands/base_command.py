@@ -1,6 +1,6 @@
 """ Command base class for processing Jira issues"""
 import abc
-import copy
+import heapq
 import re
 from functools import partial
 from collections import OrderedDict
@@ -15,8 +15,11 @@ except ImportError:
 from .. import jira
 from .. import dataprocessor as dp
 from .. import unicode_csv_writer
+from .. import external_sort
 
 from ..log import Log
+from ..timing import Timing
+from ..row import Row
 from ..config import settings
 
 
@@ -25,6 +28,22 @@ header_formats = {'seconds_to_days':lambda x: '{0:.2f}'.format(x/60/60/8.0)}
 def query_builder(name, items):
     return '{0} in ({1})'.format(name, ','.join(items))
 
+def sort_key(*columns):
+    '''Return a function building one composite key of {columns} per row.
+
+    Columns are names or (name, default) pairs. None and missing values
+    are replaced by the default [default: ''], e.g. datetime.date.max to
+    sort rows without a date last.
+    '''
+    columns = [c if isinstance(c, tuple) else (c, '') for c in columns]
+    def key(row):
+        values = []
+        for name, default in columns:
+            value = row.get(name)
+            values.append(default if value is None else value)
+        return tuple(values)
+    return key
+
 class BaseCommand:
 
     __metaclass__ = abc.ABCMeta
@@ -33,6 +52,7 @@ class BaseCommand:
                  base_url=None, project=[],
                  fixversion=[], all_fields=False,
                  pre_load=None,
+                 limit=None,
                  settings=settings,
                  *args, **kwargs):
         '''Initialize a command.
@@ -46,6 +66,7 @@ class BaseCommand:
         Optional Arguments:
 
         fixversion - list of FixVersion values
+        limit - keep the first N rows of sorted output (see sort_rows)
         '''
         if not base_url:
             raise TypeError('Missing keyword "base_url"')
@@ -57,6 +78,7 @@ class BaseCommand:
         self._all_fields = all_fields
         self._pivot_field = pivot_field
         self._pre_load = pre_load
+        self._limit = limit
         self._init(settings)
         self.kwargs = kwargs
 
@@ -66,6 +88,10 @@ class BaseCommand:
         self._story_types = settings.get('jira', 'story_types').lower().split(',')
         self._complete_status = settings.get('jira', 'complete_status').split(',')
         self._header_keys = list(self._command_settings['headers'].split(','))
+        try:
+            self._sort_buffer_rows = settings.getint('jira', 'sort_buffer_rows')
+        except configparser.NoOptionError:
+            self._sort_buffer_rows = external_sort.DEFAULT_BUFFER_ROWS
         self._header_key_name_map = {}
         self._header_key_format_map = {}
         for k,v in settings.items('headers'):
@@ -219,21 +245,34 @@ class BaseCommand:
             Log.verbose(x['issue_key'])
             #print(json.dumps(x, indent=4))
             if self._pre_load:
-                self._pre_load(x)
+                with Timing.stage('pre_load', count=1):
+                    self._pre_load(x)
                 
             if pivot_on and pivot_on in x and x[pivot_on]:
-                pivots = copy.copy(x[pivot_on])
-                del x[pivot_on]
+                pivots = x.pop(pivot_on)
                 Log.verbose('Pivot on field {0} with {1} item(s)'.format(pivot_on, len(pivots)))
-                # Create new json object for each pivot field
-                for pivot in pivots:
-                    y = {pivot_on: pivot}
-                    y.update(x.copy())
+                # overlay the issue with each pivot value, no copies
+                for y in dp.pivot_overlays(x, pivot_on, pivots):
                     yield y
             else:
                 yield x
 
     
+    def sort_rows(self, rows, key, last=False):
+        '''Return {rows} sorted by {key}, a list or a generator when more
+        than sort_buffer_rows [jira] rows are sorted through temporary
+        files (see external_sort).
+
+        With a limit only the first N rows of the order are kept, or the
+        last N with {last}, selected with a heap of N rows instead of
+        sorting all of them.
+        '''
+        if self._limit is None:
+            return external_sort.sort(rows, key, buffer_rows=self._sort_buffer_rows)
+        if last:
+            return list(reversed(heapq.nlargest(self._limit, rows, key=key)))
+        return heapq.nsmallest(self._limit, rows, key=key)
+
     def post_process(self, generate_rows):
         '''Override to construct a new row generator from the source generator'''
         Log.debug('post_process: {0}'.format(generate_rows))
@@ -244,7 +283,13 @@ class BaseCommand:
                                count_fields=self.count_fields,
                                datetime_fields=self.datetime_fields)
         http_req = self.http_request()
-        generate_rows = ({k:v for k,v in flatten_rows(x)}
-                         for x in self.pre_process(http_req))
+        issues = Timing.timed('pre_process', self.pre_process(http_req))
+        def flatten(x):
+            if isinstance(x, dp.PivotOverlay):
+                return Row.from_items(x.flatten(flatten_rows))
+            return Row.from_items(flatten_rows(x))
+        generate_rows = Timing.timed('flatten_json_struct', (flatten(x) for x in issues))
         Log.debug('execute: {0}'.format(generate_rows))
-        return self.post_process(generate_rows)
+        with Timing.stage('post_process'):
+            rows = self.post_process(generate_rows)
+        return Timing.timed('post_process', rows)
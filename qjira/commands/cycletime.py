@@ -1,11 +1,13 @@
 from operator import itemgetter
 
 import re
+import datetime
 
 from ..config import settings
 from ..log import Log
 from .base_command import BaseCommand
 from ..dataprocessor import load_transitions
+from ..cycle_stats import CycleStatistics, summary_columns
 
 class CycleTimeCommand(BaseCommand):
     '''Class encapsulating cycle time of an issue. This class will
@@ -20,16 +22,43 @@ class CycleTimeCommand(BaseCommand):
 
    This does not record separate values for bugs being dev
    complete Resolved and being test complete Closed.
+
+   With order 'streaming' each issue is written as soon as its last
+   transition is processed, in the order Jira returned the issues.
+
+   With {stats} a summary table is written instead: count, mean,
+   percentiles and histogram of the days from stats_begin to stats_end
+   per {group_by} columns.
     '''
 
-    def __init__(self, *args, **kwargs):
+    ORDERS = ('sorted', 'streaming')
+
+    def __init__(self, order='sorted', stats=False, group_by=None, *args, **kwargs):
         super(CycleTimeCommand, self).__init__('cycletime', pre_load=load_transitions, *args, **kwargs)
 
+        if order not in self.ORDERS:
+            raise ValueError('order must be one of {0}'.format(', '.join(self.ORDERS)))
+        self._order = order
         self._add_columns = []
+        self._statistics = None
+        if stats:
+            self._statistics = CycleStatistics(
+                group_by=group_by or [],
+                begin=self._command_settings['stats_begin'],
+                end=self._command_settings['stats_end'],
+                percentiles=[float(p) for p in self._command_settings['stats_percentiles'].split(',')],
+                buckets=[int(b) for b in self._command_settings['stats_buckets'].split(',')])
 
         state_transitions_name = self._command_settings['transitions']
         self._state_transitions = [tuple([k]+v.split(',')) for k,v in settings.items(state_transitions_name)]
 
+        # decision table: (column, compiled pattern, sort, count column or None)
+        self._rules = [(col, re.compile(tranz), srt, 'count_{0}'.format(col) if s_count == 'True' else None)
+                       for col,tranz,srt,s_count in self._state_transitions]
+        # transitions names repeat, memoize the rules matching each
+        self._rules_by_name = {}
+        self._header_key_set = None
+
     @property
     def state_transitions(self):
         return self._state_transitions
@@ -40,13 +69,32 @@ class CycleTimeCommand(BaseCommand):
 
     @property
     def header_keys(self):
+        if self._statistics is not None:
+            return summary_columns(self._statistics.group_by,
+                                   self._statistics.percentiles,
+                                   self._statistics.buckets)
         _header_keys = super(CycleTimeCommand, self).header_keys
         for col in self._add_columns:
             if col not in _header_keys:
                 _header_keys.append(col)
         
         return _header_keys
-    
+
+    def _add_rule_columns(self):
+        for col, pattern, srt, count_col in self._rules:
+            if col not in self._add_columns:
+                self._add_columns.append(col)
+            if count_col and count_col not in self._add_columns:
+                self._add_columns.append(count_col)
+
+    def _matching_rules(self, name):
+        '''Return (column, sort, count column) of the rules matching transition {name}.'''
+        rules = self._rules_by_name.get(name)
+        if rules is None:
+            rules = self._rules_by_name[name] = tuple(
+                (col, srt, count_col) for col, pattern, srt, count_col in self._rules
+                if pattern.match(name))
+        return rules
 
     def post_process(self, rows):
         """Summarize lead & cycle time for items.
@@ -55,39 +103,63 @@ class CycleTimeCommand(BaseCommand):
         Ready to Resolve/Verified. Cycle time is time from WorkInProgress
         to Resolve/Verified.
         """
+        if self._statistics is not None:
+            return self._statistics.extend(self._stream_issues(rows)).rows()
+
+        if self._order == 'streaming':
+            return self._stream_issues(rows)
 
         accumulated = {}
-        
-        for r in rows:
+        for r in self._with_header(rows):
             issue_key = r['issue_key']
-            if issue_key not in accumulated:
-                accumulated[issue_key] = {k:v for k,v in r.items() if k in self.header_keys}
-
-            for col,tranz,srt,s_count in self.state_transitions:
-                
-                if col not in self._add_columns:
-                    self._add_columns.append(col)
-
-                cnt = True if s_count == "True" else False
-                count_col = 'count_{0}'.format(col)
-
-                if cnt and count_col not in self._add_columns:
-                    self._add_columns.append(count_col)
-                
-                if re.match(tranz, r['transitions_name']):
-                    d = r['transitions_change_date']
-                    if col not in accumulated[issue_key]:
-                        accumulated[issue_key][col] = d
-                    elif srt == 'lt' and d < accumulated[issue_key][col]:
-                        accumulated[issue_key][col] = d
-                    elif srt == 'gt' and d > accumulated[issue_key][col]:
-                        accumulated[issue_key][col] = d
-
-                    if cnt and count_col not in accumulated[issue_key]:
-                        accumulated[issue_key][count_col] = 1
-                    elif cnt:
-                        accumulated[issue_key][count_col] = accumulated[issue_key][count_col] + 1
-
-        rows = [dict(v, issue_key=k) for k,v in accumulated.items()]
-        #print(rows)
-        return rows
+            acc = accumulated.get(issue_key)
+            if acc is None:
+                acc = accumulated[issue_key] = self._new_record(r)
+            self._accumulate(acc, r)
+
+        date_columns = [col for col, pattern, srt, count_col in self._rules]
+        return sorted(accumulated.values(),
+                      key=lambda x: tuple(x.get(col) or datetime.date.max for col in date_columns))
+
+    def _stream_issues(self, rows):
+        '''Generate the record of each issue once the rows move on to
+        the next issue, pivoting keeps the rows of an issue together.'''
+        acc = None
+        for r in self._with_header(rows):
+            if acc is None or acc['issue_key'] != r['issue_key']:
+                if acc is not None:
+                    yield acc
+                acc = self._new_record(r)
+            self._accumulate(acc, r)
+        if acc is not None:
+            yield acc
+
+    def _with_header(self, rows):
+        '''Add the rule columns to the header once rows arrive.'''
+        for r in rows:
+            if self._header_key_set is None:
+                self._add_rule_columns()
+                self._header_key_set = set(self.header_keys)
+            yield r
+
+    def _new_record(self, r):
+        record = {k:v for k,v in r.items() if k in self._header_key_set}
+        record['issue_key'] = r['issue_key']
+        return record
+
+    def _accumulate(self, acc, r):
+        rules = self._matching_rules(r['transitions_name'])
+        if not rules:
+            return
+
+        d = r['transitions_change_date']
+        for col, srt, count_col in rules:
+            if col not in acc:
+                acc[col] = d
+            elif srt == 'lt' and d < acc[col]:
+                acc[col] = d
+            elif srt == 'gt' and d > acc[col]:
+                acc[col] = d
+
+            if count_col:
+                acc[count_col] = acc.get(count_col, 0) + 1
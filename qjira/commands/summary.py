@@ -1,7 +1,6 @@
 '''
 Summarize the backlog
 '''
-from operator import itemgetter
 from functools import partial
 
 import datetime
@@ -25,6 +24,13 @@ def sprint_startDate_sort(x, reverse=False):
         return SORT_REVERSE_YEAR if reverse else SORT_DEFAULT_YEAR 
 
 
+def summary_sort(x):
+    return (sprint_startDate_sort(x),
+            x.get('sprint_0_name') or '',
+            x.get('epic_issue_key') or '',
+            x['issue_key'])
+
+
 def sprint_header(sprint_name, sprint_startDate, sprint_endDate):
     if sprint_name and sprint_startDate and sprint_endDate:
         return '{}  [{} to {}]'.format(sprint_name.upper(),
@@ -91,18 +97,12 @@ class SummaryCommand(BaseCommand):
         return self._hyperlink(row[link_col], name)
     
     def post_process(self, rows):
-        # Secondary sort by issuekey
-        rows = sorted(rows, key=itemgetter('issue_key'))
-        # Secondary sort by epickey
-        rows = sorted(rows, key=lambda x: x.get('epic_issue_key') or '')
-        # Secondary sort by name to distinguish grooming sprint from non-started sprints
-        rows = sorted(rows, key=lambda x: x.get('sprint_0_name') or '')
-        # Primary sort by sprint startdate
-        rows = sorted(rows, key=partial(sprint_startDate_sort))
-        
-        epics = set(row['epic_issue_key'] for row in rows if row.get('epic_issue_key'))
+        # Primary sort by sprint startdate, then by name to distinguish
+        # grooming sprint from non-started sprints, epic key and issue key
+        rows = self.sort_rows(rows, summary_sort)
         
-        epic_link_table = { epic:self._resolve_epic(epic) for epic in epics }
+        # rows may be read once from disk, epics are resolved as they come
+        epic_link_table = {}
         
         sprint_placeholder = 'na'
         
@@ -120,6 +120,8 @@ class SummaryCommand(BaseCommand):
             epic_key = row.get('epic_issue_key')
             issue_key = row.get('issue_key')
             if epic_key:
+                if epic_key not in epic_link_table:
+                    epic_link_table[epic_key] = self._resolve_epic(epic_key)
                 url, name = epic_link_table[epic_key]
                 row['epic_link'] = self._hyperlink(url, name)
 
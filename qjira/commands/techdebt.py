@@ -1,30 +1,82 @@
 '''
 Analyze progress of tech debt ratios completed. Story vs Bug points.
 '''
-from functools import partial, cmp_to_key, reduce as reduce_
+import datetime
+from functools import partial, cmp_to_key
 
 from ..config import settings
 from .base_command import BaseCommand
 from .engine_mixin import EngineMixin
 from ..log import Log
+from ..dataprocessor import load_changelog
+from .. import cache_file
+from .. import jira
 
 DEFAULT_POINTS = 0.0
 TOTAL_COL = 'Grand Total'
 
+BUCKETS = ('sprint', 'month')
+
 class TechDebtCommand(BaseCommand, EngineMixin):
+    '''Bug versus story points per project.
+
+    With {by} 'sprint' or 'month' the points are split into buckets by
+    the date each issue was completed (changelog): the sprint it was
+    completed in, or the calendar month. With a {cache_file} the points of
+    closed buckets (complete sprints, past months) are kept between runs,
+    later runs only request issues updated since the oldest open bucket.
+    '''
 
-    def __init__(self, *args, **kwargs):
-        super(TechDebtCommand, self).__init__('techdebt', *args, **kwargs)
+    def __init__(self, by=None, cache_file=None, *args, **kwargs):
+        if by is not None and by not in BUCKETS:
+            raise ValueError('by must be one of {0}'.format(', '.join(BUCKETS)))
+        super(TechDebtCommand, self).__init__('techdebt',
+                                              pivot_field='sprint' if by == 'sprint' else None,
+                                              pre_load=load_changelog if by else None,
+                                              *args, **kwargs)
         EngineMixin.__init__(self)
 
+        self._by = by
+        self._cache_file = cache_file if by else None
+        self._cache = None
+        # bucket -> first day, orders the buckets
+        self._bucket_start = {}
+        self._closed_buckets = set()
         self._header_keys += [self.effort_field]
+        if by:
+            self._header_keys.insert(1, 'bucket')
+
+    @property
+    def query(self):
+        query = super(TechDebtCommand, self).query
+        if self._cache_file and self._cached_buckets()['since']:
+            # a day of overlap, updated is compared in the Jira user's timezone
+            since = _parse_date(self._cached_buckets()['since']) - datetime.timedelta(days=1)
+            query = '{0} AND updated >= "{1:%Y/%m/%d}"'.format(query, since)
+        return query
 
     def request_fields(self):
         fields = super(TechDebtCommand, self).request_fields()
         fields += EngineMixin.request_fields(self)
+        if self._by == 'sprint':
+            fields.append(jira.customfield_value('sprint'))
         return fields
 
-    
+    @property
+    def _cache_key(self):
+        return '|'.join([self._base_url,
+                         ','.join(sorted(self._projects or [])),
+                         ','.join(sorted(self._fixversions or [])),
+                         self.effort_field,
+                         self._by])
+
+    def _cached_buckets(self):
+        '''Return the cache entry of this query, loaded once.'''
+        if self._cache is None:
+            self._cache = cache_file.load(self._cache_file, self._cache_key) or \
+                {'last_run': None, 'since': None, 'buckets': {}}
+        return self._cache
+
     def _format_points(self, f):
         return '{0:.0f}'.format(f)
 
@@ -35,31 +87,13 @@ class TechDebtCommand(BaseCommand, EngineMixin):
         except ZeroDivisionError:
             return '{:.0f}%'.format(0)
 
-    def _to_story_points(self, x, y):
-        '''Accumulate all points of same type into a new structure.
-
-        x is new structure: {project_name: tuple}
-        y is source row
-        '''
-        proj_name = y['project_name']
-        
-        story_points = y.get(self.effort_field) or 0
-        
-        if self.is_story_type(y):
-            item = (0, story_points)
-        else:
-            item = (story_points, 0)
-
-        if proj_name in x:
-            x[proj_name] = tuple(map(sum, zip(x[proj_name], item)))
-        else:
-            x[proj_name] = item
-
-        if TOTAL_COL not in x:
-            x[TOTAL_COL] = (0,0)
-            
-        x[TOTAL_COL] = tuple(map(sum, zip(x[TOTAL_COL], item)))
-        return x
+    def _add_points(self, acc, key, y):
+        '''Add the points of row {y} to the [bug, story] accumulator of {key}.'''
+        points = y.get(self.effort_field) or 0
+        entry = acc.get(key)
+        if entry is None:
+            entry = acc[key] = [0, 0]
+        entry[1 if self.is_story_type(y) else 0] += points
 
     def _sort_by_name(self, name, x, y):
         '''Sort dict by key name.
@@ -74,7 +108,15 @@ class TechDebtCommand(BaseCommand, EngineMixin):
             lx = x[name].lower()
             ly =y[name].lower()
             return (lx > ly) - (lx < ly)
-    
+
+    def _result(self, project_name, points):
+        return {
+            'project_name': project_name,
+            'bug_points': self._format_points(points[0]),
+            'story_points': self._format_points(points[1]),
+            'tech_debt': self._tech_debt_perc(points)
+        }
+
     def post_process(self, rows):
         """
         Build a table including:
@@ -83,13 +125,106 @@ class TechDebtCommand(BaseCommand, EngineMixin):
         NameN        |
         Grand Total  |
         """
-        project_points_by_type = reduce_(self._to_story_points, rows, {})
-        results = ({
-            'project_name': k,
-            'bug_points': self._format_points(v[0]),
-            'story_points': self._format_points(v[1]),
-            'tech_debt': self._tech_debt_perc(v)
-        } for k, v in project_points_by_type.items())
+        if self._by:
+            return self._bucket_process(rows)
+
+        project_points_by_type = {}
+        for y in rows:
+            self._add_points(project_points_by_type, y['project_name'], y)
+        if project_points_by_type:
+            total = project_points_by_type[TOTAL_COL] = [0, 0]
+            for k, points in project_points_by_type.items():
+                if k != TOTAL_COL:
+                    total[0] += points[0]
+                    total[1] += points[1]
+        results = (self._result(k, v) for k, v in project_points_by_type.items())
         sort_by_name = partial(self._sort_by_name, 'project_name')
         return sorted(results, key=cmp_to_key(sort_by_name))
-    
+
+    def _completed_date(self, row):
+        for status in self.complete_status:
+            if row.get(status):
+                return row[status]
+        return None
+
+    def _bucket(self, row, completed):
+        '''Return the bucket of {row} completed on date {completed}, None
+        when it was not completed in the sprint of the row.'''
+        if self._by == 'month':
+            bucket = '{0:%Y-%m}'.format(completed)
+            if bucket not in self._bucket_start:
+                self._bucket_start[bucket] = completed.replace(day=1)
+                if self._bucket_start[bucket] < datetime.date.today().replace(day=1):
+                    self._closed_buckets.add(bucket)
+            return bucket
+
+        start = row.get('sprint_startDate')
+        complete = row.get('sprint_completeDate')
+        if not start or completed < start or (complete and completed > complete):
+            return None
+        bucket = row['sprint_name']
+        self._bucket_start.setdefault(bucket, start)
+        if complete:
+            self._closed_buckets.add(bucket)
+        return bucket
+
+    def _bucket_process(self, rows):
+        '''Accumulate the points of each (project, bucket), then the total
+        of each bucket.'''
+        cached = dict(self._cached_buckets()['buckets']) if self._cache_file else {}
+        acc = {}
+        for y in rows:
+            completed = self._completed_date(y)
+            if not completed:
+                continue
+            bucket = self._bucket(y, completed)
+            if bucket is None or bucket in cached:
+                continue
+            Log.debug('Issue {0} completed in {1}'.format(y['issue_key'], bucket))
+            self._add_points(acc, (y['project_name'], bucket), y)
+
+        if self._cache_file:
+            self._update_cache(acc)
+            for bucket, entry in cached.items():
+                self._bucket_start[bucket] = _parse_date(entry['start'])
+                for project_name, points in entry['projects'].items():
+                    acc[(project_name, bucket)] = points
+
+        totals = {}
+        for (project_name, bucket), points in list(acc.items()):
+            total = totals.get(bucket)
+            if total is None:
+                total = totals[bucket] = acc[(TOTAL_COL, bucket)] = [0, 0]
+            total[0] += points[0]
+            total[1] += points[1]
+
+        results = []
+        for (project_name, bucket), points in acc.items():
+            result = self._result(project_name, points)
+            result['bucket'] = bucket
+            results.append(result)
+        sort_by_name = partial(self._sort_by_name, 'project_name')
+        results.sort(key=cmp_to_key(sort_by_name))
+        results.sort(key=lambda x: (self._bucket_start[x['bucket']], x['bucket']))
+        return results
+
+    def _update_cache(self, acc):
+        '''Add the closed buckets to the cache file.'''
+        entry = self._cached_buckets()
+        for (project_name, bucket), points in acc.items():
+            if bucket in self._closed_buckets:
+                cached = entry['buckets'].setdefault(bucket, {
+                    'start': self._bucket_start[bucket].isoformat(),
+                    'projects': {}})
+                cached['projects'][project_name] = points
+        today = datetime.date.today()
+        open_starts = [start for bucket, start in self._bucket_start.items()
+                       if bucket not in self._closed_buckets]
+        if self._by == 'month':
+            open_starts.append(today.replace(day=1))
+        entry['since'] = min(open_starts + [today]).isoformat()
+        entry['last_run'] = today.isoformat()
+        cache_file.save(self._cache_file, self._cache_key, entry)
+
+def _parse_date(value):
+    return datetime.datetime.strptime(value, '%Y-%m-%d').date()
@@ -0,0 +1,92 @@
+'''Time spent in each status by issue, from the full changelog.'''
+import datetime
+from collections import OrderedDict
+
+from .base_command import BaseCommand
+from ..text_utils import _generate_name
+from .. import time_in_status as tis
+
+DAYS_PREFIX = 'days'
+
+class TimeInStatusCommand(BaseCommand):
+    '''Days every issue spent in each status, summed over all visits of
+    the status. The time in the current status counts up to {as_of}
+    [default: now], except for complete statuses (e.g. Closed, Done).
+
+    With {business_days} weekends and the configured holidays are not
+    counted.
+
+    Columns are the configured statuses, or every status in order of
+    first appearance. Configured statuses let each issue be written as
+    soon as it is processed, otherwise the status columns are known once
+    all issues are read.
+
+    With {aggregate} a row per status is written instead: the issues
+    that were in the status, their total and mean days.
+    '''
+
+    AGGREGATE_HEADER = ['status', 'issues', 'total_days', 'mean_days']
+
+    def __init__(self, aggregate=False, business_days=False, as_of=None, *args, **kwargs):
+        super(TimeInStatusCommand, self).__init__('timeinstatus', pre_load=self._load_time_in_status, *args, **kwargs)
+
+        self._aggregate = aggregate
+        self._as_of = as_of or datetime.datetime.now()
+        self._calendar = None
+        if business_days or self._command_settings.get('business_days') == 'True':
+            self._calendar = tis.BusinessCalendar(
+                weekend=[int(d) for d in self._command_settings['weekend'].split(',') if d],
+                holidays=tis.BusinessCalendar.parse_holidays(self._command_settings['holidays']))
+        self._statuses = [s for s in self._command_settings['statuses'].split(',') if s]
+        # status -> column, in order of first appearance
+        self._status_columns = OrderedDict()
+        for status in self._statuses:
+            self._status_column(status)
+
+    @property
+    def header_keys(self):
+        if self._aggregate:
+            return self.AGGREGATE_HEADER
+        return self._header_keys + list(self._status_columns.values())
+
+    def _status_column(self, status):
+        column = self._status_columns.get(status)
+        if column is None:
+            column = self._status_columns[status] = _generate_name(DAYS_PREFIX, status.replace(' ', ''))
+        return column
+
+    def _load_time_in_status(self, data):
+        '''Replace the changelog of issue {data} with its days per status.'''
+        changelog = data.pop('_changelog', None)
+        histories = changelog['histories'] if changelog else []
+        status = (data.get('status') or {}).get('name')
+        until = None if status in self._complete_status else self._as_of
+        created = tis.parse_time(data['created']) if data.get('created') else None
+        intervals = tis.status_intervals(tis.status_changes(histories),
+                                         created=created, status=status, until=until)
+        totals = tis.time_in_status(intervals, self._calendar)
+        for s, days in totals.items():
+            data[self._status_column(s)] = round(days, 2)
+
+    def post_process(self, rows):
+        if self._aggregate:
+            return self._aggregate_rows(rows)
+        if self._statuses:
+            return rows
+        # status columns are complete once every issue is read
+        return list(rows)
+
+    def _aggregate_rows(self, rows):
+        issues = {}
+        totals = {}
+        for r in rows:
+            for column, days in r.items():
+                if column.startswith(DAYS_PREFIX + '_'):
+                    issues[column] = issues.get(column, 0) + 1
+                    totals[column] = totals.get(column, 0.0) + days
+        return [{'status': status,
+                 'issues': issues[column],
+                 'total_days': round(totals[column], 2),
+                 'mean_days': round(totals[column] / issues[column], 2)}
+                for status, column in self._status_columns.items()
+                if column in issues]
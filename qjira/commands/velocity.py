@@ -2,18 +2,22 @@
 calculate the story points planned, completed, and 
 carried over for every sprint associated with an issue.
 '''
-from operator import itemgetter
 from functools import reduce as reduce_
 
 import datetime
 
-from .base_command import BaseCommand
+from .base_command import BaseCommand, sort_key
 from .engine_mixin import EngineMixin
 from ..log import Log
 from ..dataprocessor import load_changelog
+from .. import velocity_cache
+from ..forecast import simulate, confidence_intervals, DEFAULT_TRIALS
 
 DEFAULT_EFFORT = 0.0
 
+# by start date, sprints not started last
+SPRINT_ORDER = sort_key(('sprint_startDate', datetime.date.max), 'sprint_name', 'project_key')
+
 class VelocityCommand(BaseCommand, EngineMixin):
     '''Analyze data for velocity metrics.
 
@@ -31,9 +35,22 @@ class VelocityCommand(BaseCommand, EngineMixin):
     carried points   - continued from previous sprint (e.g. not planned but carried over)
     story points     - total points included in this sprint, whether planned or carried
     completed points - finished in this sprint (status = Closed, Done)
+
+    With a {cache_file}, the velocity of closed sprints is kept between
+    runs and only issues of open, unknown or recently updated sprints are
+    requested from Jira.
+
+    With a {backlog} of remaining effort a Monte Carlo forecast is written
+    instead: the sprints needed and the date the backlog is done at 50%,
+    85% and 95% confidence, over {trials} simulations drawn from the
+    completed effort of the closed sprints. With {throughput} the history
+    is the issues completed per week and the backlog is a count of issues.
     '''
 
-    def __init__(self, include_bugs=False, forecast=False, filter_by_date=None, *args, **kwargs):
+    def __init__(self, include_bugs=False, forecast=False, filter_by_date=None, cache_file=None,
+                 backlog=None, throughput=False, trials=DEFAULT_TRIALS, seed=None, *args, **kwargs):
+        if cache_file and throughput:
+            raise ValueError('throughput cannot be forecast from a velocity cache, only recent issues are requested')
         super(VelocityCommand, self).__init__('velocity', pivot_field='sprint', pre_load=load_changelog,  *args, **kwargs)
         EngineMixin.__init__(self)
 
@@ -41,18 +58,70 @@ class VelocityCommand(BaseCommand, EngineMixin):
         self._forecast = forecast
         self._filter_by_date = filter_by_date
         self._target_sprint_ids = set()
+        self._open_sprint_ids = set()
+        self._closed_sprints = []
+        self._cache_file = cache_file
+        self._cache = None
+        self._backlog = backlog
+        self._throughput = throughput
+        self._trials = trials
+        self._seed = seed
+        # issue_key -> completion date, for throughput
+        self._completed = {}
 
         velocity_metrics_prefix = ['planned_', 'carried_', 'completed_']
         self._effort_header_keys = [self.effort_field] + [pre + self.effort_field for pre in velocity_metrics_prefix] 
 
         self._header_keys += self._effort_header_keys
     
+    @property
+    def header_keys(self):
+        if self._backlog is not None:
+            return ['confidence', 'weeks' if self._throughput else 'sprints', 'date']
+        return super(VelocityCommand, self).header_keys
+
     @property
     def query(self):
         if self._include_bugs:
-            return self._command_settings['query_bug']
+            query = self._command_settings['query_bug']
         else:
-            return super(VelocityCommand, self).query
+            query = super(VelocityCommand, self).query
+        if self._cache_file:
+            restriction = self._cache_restriction()
+            if restriction:
+                query = '{0} AND ({1})'.format(query, restriction)
+        return query
+
+    @property
+    def _cache_key(self):
+        return '|'.join([self._base_url,
+                         ','.join(sorted(self._projects or [])),
+                         ','.join(sorted(self._fixversions or [])),
+                         self.effort_field,
+                         'bugs' if self._include_bugs else 'stories'])
+
+    def _cached_sprints(self):
+        '''Return the cache bucket of this query, loaded once.'''
+        if self._cache is None:
+            self._cache = velocity_cache.load(self._cache_file, self._cache_key)
+        return self._cache
+
+    def _cache_restriction(self):
+        '''Return JQL matching issues of sprints missing from the cache.
+
+        Every sprint seen by the last run is cached or was open, a sprint
+        created since then only has issues updated since then. The query
+        grows with the open sprints, not with the cached ones.'''
+        bucket = self._cached_sprints()
+        if not bucket['last_run']:
+            return None
+        clauses = ['sprint in openSprints()', 'sprint in futureSprints()']
+        if bucket['open_sprint_ids']:
+            clauses.append('sprint in ({0})'.format(','.join(sorted(bucket['open_sprint_ids'], key=int))))
+        # a day of overlap, updated is compared in the Jira user's timezone
+        last_run = datetime.datetime.strptime(bucket['last_run'], '%Y-%m-%d').date()
+        clauses.append('updated >= "{0:%Y/%m/%d}"'.format(last_run - datetime.timedelta(days=1)))
+        return ' OR '.join(clauses)
 
     def request_fields(self):
         fields = super(VelocityCommand, self).request_fields()
@@ -74,41 +143,130 @@ class VelocityCommand(BaseCommand, EngineMixin):
     
     def post_process(self, rows):
         '''data processor wrapper to calculate points as planned, carried, completed'''
+        if self._throughput:
+            rows = self._record_completions(rows)
         results = self._reduce_process(rows)
-        sorted_sprints = sorted(results, key=itemgetter('project_key'))
-        sorted_sprints = sorted(sorted_sprints, key=itemgetter('sprint_name'))
-        sorted_sprints = sorted(sorted_sprints, key=lambda x: x.get('sprint_startDate') or datetime.date.max)
-        return sorted_sprints
+        if self._backlog is not None:
+            # the forecast reads the closed sprints, not the sprint rows
+            return self._forecast_rows()
+        # the latest sprints are the last of the order
+        return self.sort_rows(results, SPRINT_ORDER, last=True)
+
+    def _record_completions(self, rows):
+        '''Pass {rows} through, recording the completion date of each issue.'''
+        for row in rows:
+            if row['issue_key'] not in self._completed:
+                for status in self.complete_status:
+                    if row.get(status):
+                        self._completed[row['issue_key']] = row[status]
+                        break
+            yield row
+
+    def _weekly_throughput(self):
+        '''Return the issues completed per week, weeks without any included,
+        and the last completion date.'''
+        dates = list(self._completed.values())
+        if not dates:
+            return [], None
+        first = min(dates)
+        first_week = first - datetime.timedelta(days=first.weekday())
+        last = max(dates)
+        history = [0] * ((last - first_week).days // 7 + 1)
+        for d in dates:
+            history[(d - first_week).days // 7] += 1
+        return history, last
+
+    def _sprint_history(self):
+        '''Return the completed effort of the closed sprints, the last end
+        date and the median sprint length in days.'''
+        closed = [s for s in self._closed_sprints if s.get('sprint_endDate')]
+        if not closed:
+            return [], None, None
+        lengths = sorted((s['sprint_endDate'] - s['sprint_startDate']).days for s in closed
+                         if s.get('sprint_startDate'))
+        length = lengths[len(lengths) // 2] if lengths else 14
+        return [s[self.completed_field] for s in closed], max(s['sprint_endDate'] for s in closed), length
+
+    def _forecast_rows(self):
+        '''Return the forecast rows of the backlog.'''
+        if self._throughput:
+            history, last_date = self._weekly_throughput()
+            period_days = 7
+        else:
+            history, last_date, period_days = self._sprint_history()
+        Log.debug('Forecast {0} remaining from history {1}'.format(self._backlog, history))
+        if last_date is None:
+            Log.error('No completed history to forecast from')
+            return []
+        try:
+            periods = simulate(history, self._backlog, trials=self._trials, seed=self._seed)
+        except ValueError:
+            # only periods without completed effort
+            Log.error('No completed history to forecast from')
+            return []
+        unit = self.header_keys[1]
+        return [{'confidence': '{0}%'.format(c),
+                 unit: n,
+                 'date': last_date + datetime.timedelta(days=n * period_days)}
+                for c, n in confidence_intervals(periods)]
     
     def _reduce_process(self, rows):
-        '''reduce the {rows} to an array of dict structures where each sprint velocity is summarized in a single row.'''
-        results = {}
+        '''reduce the {rows} to an array of dict structures where each sprint velocity is summarized in a single row.
 
-        for s in list(self._raw_process(rows)):
+        Rows are consumed one at a time into per-sprint accumulators, the
+        sprint filter is applied once all rows are seen.'''
+        header_keys = set(self._header_keys)
+        point_fields = (self.planned_field, self.carried_field, self.effort_field, self.completed_field)
+        cached = self._cached_sprints()['sprints'] if self._cache_file else {}
+        accumulators = {}
+        closed_sprint_ids = set()
+        story_sprint_ids = set()
+
+        for s in self._raw_process(rows):
             sprint_id = s['sprint_id']
+            if sprint_id in cached:
+                continue
+            acc = accumulators.get(sprint_id)
+            if acc is None:
+                Log.verbose('Accumulating velocity in sprint_id {0}'.format(sprint_id))
+                acc = accumulators[sprint_id] = {k:v for k, v in s.items() if k in header_keys}
+                acc.update((f, 0) for f in point_fields)
+            for f, v in zip(point_fields, self._get_points(s)):
+                acc[f] += v
+            if s.get('sprint_completeDate'):
+                closed_sprint_ids.add(sprint_id)
+            if self.is_story_type(s):
+                story_sprint_ids.add(sprint_id)
+
+        if self._cache_file:
+            self._update_cache(accumulators, closed_sprint_ids, story_sprint_ids)
+            for sprint_id, entry in cached.items():
+                acc = accumulators[sprint_id] = velocity_cache.decode_sprint(entry)
+                start_date = acc.get('sprint_startDate', datetime.date.max)
+                if entry['story'] or (self._filter_by_date and self._filter_by_date <= start_date):
+                    self._target_sprint_ids.add(sprint_id)
 
+        results = []
+        self._closed_sprints = []
+        for sprint_id, acc in accumulators.items():
             #print('> sprint_id %s in target_ids %s' % (sprint_id, self._target_sprint_ids))
             if sprint_id not in self._target_sprint_ids:
                 Log.debug('Skipping filtered sprint_id {0}'.format(sprint_id))
                 continue
+            results.append(acc)
+            if sprint_id in closed_sprint_ids or sprint_id in cached:
+                self._closed_sprints.append(acc)
+        return results
 
-            Log.verbose('Updating velocity in sprint_id {0}'.format(sprint_id))
-            if not sprint_id in results:
-                results[sprint_id] = {k:v for k, v in s.items() if k in self.header_keys}
-                current_effort = (0, 0, 0, 0)
-            else:
-                current_effort = self._get_points(results[sprint_id])
-            effort_value = self._get_points(s)
-            total_effort = tuple(map(sum, zip(current_effort, effort_value)))
-                
-            results[sprint_id].update({
-                self.planned_field: total_effort[0],
-                self.carried_field: total_effort[1],
-                self.effort_field: total_effort[2],
-                self.completed_field: total_effort[3]
-            })
-
-        return results.values()
+    def _update_cache(self, accumulators, closed_sprint_ids, story_sprint_ids):
+        '''Add the newly closed sprints to the cache file.'''
+        bucket = self._cached_sprints()
+        for sprint_id in closed_sprint_ids:
+            bucket['sprints'][sprint_id] = velocity_cache.encode_sprint(accumulators[sprint_id],
+                                                                        sprint_id in story_sprint_ids)
+        bucket['open_sprint_ids'] = sorted(self._open_sprint_ids - set(bucket['sprints']))
+        bucket['last_run'] = datetime.date.today().isoformat()
+        velocity_cache.save(self._cache_file, self._cache_key, bucket)
 
     def _get_points(self, r):
         '''return point fields from row {r}'''
@@ -134,6 +292,9 @@ class VelocityCommand(BaseCommand, EngineMixin):
                 #print('> %d skip non-sprint work item' % idx)
                 continue
             
+            if not row.get('sprint_completeDate'):
+                self._open_sprint_ids.add(row['sprint_id'])
+
             if not self._forecast and not row.get('sprint_completeDate'):
                 #print ('> %d skip incomplete sprint' % idx)
                 continue
@@ -29,15 +29,37 @@ Reports worklog entries for list of issues.
 #     ]
 #}
 from __future__ import division
-import copy
-from datetime import date
-from operator import itemgetter
-from .base_command import BaseCommand
+from collections import OrderedDict
+from datetime import date, timedelta
+from multiprocessing.pool import ThreadPool
+from .base_command import BaseCommand, sort_key
+from .. import jira
 from ..jira import get_worklog
+from ..dataprocessor import pivot_overlays
 from ..log import Log
+from ..timing import Timing
+from ..worklog_store import WorklogStore
+
+TOTAL_ISSUE_KEYS = u'Total of entire time period'
 
 class WorklogCommand(BaseCommand):
-    def __init__(self, author=[], start_date=None, end_date=None, group_by=None, restrict_to_username=True, total_by_username=False, *args, **kwargs):
+    '''Days logged per author and day.
+
+    With a {worklog_store} file every worklog of the Jira instance started
+    since {start_date} (all of them without a start date) is synced into
+    the store, and the authors are reported from it instead of searching
+    issues and requesting the worklog of each. The store is not searched
+    with JQL: the [worklog] query setting does not restrict its worklogs.
+
+    With {team} a timesheet is written instead: a row per author and a
+    column per day. The authors are split into shards of {shard_size},
+    each shard searched separately, and the worklog of every issue found
+    is requested once, {workers} requests at a time. Only worklogs of the
+    authors are counted, a limit keeps the first N authors.
+    '''
+
+    def __init__(self, author=[], start_date=None, end_date=None, group_by=None, restrict_to_username=True, total_by_username=False, worklog_store=None,
+                 team=False, shard_size=1, workers=8, *args, **kwargs):
         super(WorklogCommand, self).__init__('worklog', *args, **kwargs)
 
         if restrict_to_username and not author:
@@ -50,6 +72,7 @@ class WorklogCommand(BaseCommand):
 
         self._base_query = user_query
         self._author = [a.lower() for a in author]
+        self._author_set = frozenset(self._author)
         self._restrict_to_username = restrict_to_username
         self._total_by_username = total_by_username
         self._group_by = group_by
@@ -57,20 +80,40 @@ class WorklogCommand(BaseCommand):
         self._start_date = start_date
         self._end_date = end_date
 
-        if start_date and end_date:
-            self._date_filter = lambda d: d >= start_date and d <= end_date
-        elif start_date:
-            self._date_filter = lambda d: d >= start_date
-        elif end_date:
-            self._date_filter = lambda d: d <= end_date
-        else:
-            self._date_filter = None
+        # worklogs are filtered on the day of their started timestamp, the
+        # YYYY-MM-DD prefix compares like the date without parsing it
+        self._start_day = str(start_date) if start_date else None
+        self._end_day = str(end_date) if end_date else None
+        self._worklog_store = worklog_store
+        self._team = team
+        self._shard_size = max(shard_size, 1)
+        self._workers = max(workers, 1)
+        self._timesheet_header = None
+        if team:
+            if total_by_username:
+                raise ValueError('team timesheets always include the total per author')
+            if not self._author:
+                raise TypeError('Missing required argument "author"')
+            if self._limit is not None:
+                self._author = self._author[:self._limit]
+                self._author_set = frozenset(self._author)
+            self._restrict_to_username = True
+
+    @property
+    def header_keys(self):
+        if self._timesheet_header is not None:
+            return self._timesheet_header
+        return super(WorklogCommand, self).header_keys
 
     @property
     def query(self):
         """Build worklog author query"""
+        return self._query_for(self._author)
 
-        base_query = 'worklogAuthor in (%s)' % ', '.join(self._author)
+    def _query_for(self, authors):
+        """Build worklog query of {authors}"""
+
+        base_query = 'worklogAuthor in (%s)' % ', '.join(authors)
         if self._base_query is not None:
             base_query = ' AND '.join([self._base_query, base_query])
             
@@ -89,10 +132,22 @@ class WorklogCommand(BaseCommand):
         base_fields = super(WorklogCommand, self).datetime_fields
         base_fields.append('worklog_started')
         return base_fields
+
+    def _include_worklog(self, w):
+        """Return True if worklog {w} passes the author and date filters."""
+        if self._restrict_to_username and w['author']['name'] not in self._author_set:
+            return False
+        day = w['started'][:10]
+        if self._start_day and day < self._start_day:
+            return False
+        if self._end_day and day > self._end_day:
+            return False
+        return True
     
     def pre_process(self, generate_data):
         """Return a generator of this source issue, including
-        all worklog entries recorded against it."""
+        the worklog entries recorded against it that pass the
+        author and date filters."""
 
         username=self.kwargs.get('username')
         password=self.kwargs.get('password')
@@ -100,105 +155,135 @@ class WorklogCommand(BaseCommand):
         for x in generate_data:
             w = get_worklog(self._base_url, x['issue_key'], username=username, password=password)
             #print('worklog entries: {0}'.format(len(w['worklogs'])))
-            for wk in w['worklogs']:
-                y = {'worklog': copy.copy(wk)}
-                y.update(x.copy())
+            worklogs = [y for y in w['worklogs'] if self._include_worklog(y)]
+            Log.verbose('{0}: {1} of {2} worklog entries'.format(x['issue_key'], len(worklogs), len(w['worklogs'])))
+            for y in pivot_overlays(x, 'worklog', worklogs):
                 yield y
-            
-    def post_process(self, rows):
-        """ Summarize each user by day """
-
-        if self._restrict_to_username:
-            rows = [r for r in rows if r['worklog_author_name'] in self._author]
 
-        # filter by start date
-        if self._date_filter:
-            rows = [r for r in rows if self._date_filter(r['worklog_started'])]
+    def execute(self):
+        if self._team and not self._worklog_store:
+            return self._team_execute()
+        if not self._worklog_store:
+            return super(WorklogCommand, self).execute()
+        if self._base_query:
+            Log.info('The [worklog] query is not applied to worklogs synced into {0}'.format(self._worklog_store))
+        store = WorklogStore(self._worklog_store, self._base_url)
+        with Timing.stage('worklog_sync'):
+            store.sync(self._start_date,
+                       username=self.kwargs.get('username'),
+                       password=self.kwargs.get('password'))
+            store.save()
+        rows = store.rows(authors=self._author_set if self._author else None,
+                          start_date=self._start_date, end_date=self._end_date)
+        with Timing.stage('post_process'):
+            rows = self._timesheet(rows) if self._team else self.post_process(rows)
+        return Timing.timed('post_process', rows)
 
-        accumulated = {}
-
-        date_max = str(date.max)
-        
-        for r in rows:
-            #print([k for k in r.keys() if k.startswith('worklog_')])
-            
-            author_name = r['worklog_author_name']
-            if author_name not in accumulated:
-                accumulated[author_name] = {}
+    def _search_shard(self, authors):
+        """Return the keys of the issues {authors} logged work on."""
+        return [x['issue_key'] for x in jira.all_issues(self._base_url, self._query_for(authors),
+                                                        username=self.kwargs.get('username'),
+                                                        password=self.kwargs.get('password'),
+                                                        fields=['-*navigable'], expands=[])]
 
-            activerow = accumulated[author_name]
-                
-            if self._group_by and self._group_by not in r:
-                raise Exception('group_by failed: column "%s" does not exist.' % self._group_by)
+    def _fetch_worklogs(self, issue_key):
+        """Return the rows of the worklogs of {issue_key} passing the filters."""
+        w = get_worklog(self._base_url, issue_key,
+                        username=self.kwargs.get('username'),
+                        password=self.kwargs.get('password'))
+        return [{'issue_key': issue_key,
+                 'worklog_author_name': y['author']['name'],
+                 'worklog_started': y['started'][:10],
+                 'worklog_timeSpentSeconds': y['timeSpentSeconds']}
+                for y in w['worklogs'] if self._include_worklog(y)]
 
-            if self._group_by:
-                group_by = r[self._group_by]
-                if group_by not in accumulated[author_name]:
-                    accumulated[author_name][group_by] = {}
+    def _team_execute(self):
+        shards = [self._author[i:i + self._shard_size] for i in range(0, len(self._author), self._shard_size)]
+        pool = ThreadPool(self._workers)
+        try:
+            with Timing.stage('search'):
+                # issues shared by authors of several shards are fetched once
+                issue_keys = OrderedDict()
+                for keys in pool.imap(self._search_shard, shards):
+                    issue_keys.update((k, None) for k in keys)
+            Log.debug('{0} issues of {1} shards'.format(len(issue_keys), len(shards)))
+            with Timing.stage('worklogs', count=len(issue_keys)):
+                rows = [r for rows in pool.imap_unordered(self._fetch_worklogs, issue_keys) for r in rows]
+        finally:
+            pool.close()
+            pool.join()
+        with Timing.stage('post_process'):
+            rows = self._timesheet(rows)
+        return Timing.timed('post_process', rows)
 
-                activerow = accumulated[author_name][group_by]
-            
-            started = str(r['worklog_started'])
-            #print(type(r['worklog_started']), r['worklog_started'], type(started), started)
-            
-            if started not in activerow:
-                activerow[started] = {}
+    def _timesheet(self, rows):
+        """Return a row per author, the days logged on each day and in total."""
+        seconds = {}
+        for r in rows:
+            key = (r['worklog_author_name'], str(r['worklog_started']))
+            seconds[key] = seconds.get(key, 0) + r['worklog_timeSpentSeconds']
 
-            if 'worklog_timeSpentSeconds' not in activerow[started]:
-                activerow[started]['worklog_timeSpentSeconds'] = 0
-                
-            activerow[started]['worklog_timeSpentSeconds'] = activerow[started]['worklog_timeSpentSeconds'] + r['worklog_timeSpentSeconds']
-            
-            if 'issue_keys' not in activerow[started]:
-                activerow[started]['issue_keys'] = []
+        logged_days = sorted(set(day for author_name, day in seconds))
+        first = self._start_date or (date(*map(int, logged_days[0].split('-'))) if logged_days else None)
+        # without logged work the range is the start date alone
+        last = self._end_date or (date(*map(int, logged_days[-1].split('-'))) if logged_days else first)
+        days = []
+        while first is not None and first <= last:
+            days.append(str(first))
+            first += timedelta(days=1)
+        self._timesheet_header = ['worklog_author_name'] + days + ['worklog_timeSpentDays']
 
-            if r['issue_key'] not in activerow[started]['issue_keys']:
-                activerow[started]['issue_keys'].append(r['issue_key'])
+        results = []
+        for author_name in self._author:
+            row = OrderedDict(worklog_author_name=author_name)
+            total = 0
+            for day in days:
+                s = seconds.get((author_name, day), 0)
+                row[day] = '{:.3f}'.format(s/60/60/8)
+                total += s
+            row['worklog_timeSpentDays'] = '{:.3f}'.format(total/60/60/8)
+            results.append(row)
+        return results
 
-            if not self._total_by_username:
-                continue
-                
-            if date_max not in activerow:
-                activerow[date_max] = {}
+    def post_process(self, rows):
+        """ Summarize each user by day """
 
-            if 'worklog_timeSpentSeconds' not in activerow[date_max]:
-                activerow[date_max]['worklog_timeSpentSeconds'] = 0
+        # (author, group, day) -> [seconds, issue keys in order of first entry]
+        accumulated = OrderedDict()
+        date_max = str(date.max)
 
-            activerow[date_max]['worklog_timeSpentSeconds'] = activerow[date_max]['worklog_timeSpentSeconds'] + r['worklog_timeSpentSeconds']
+        for r in rows:
+            author_name = r['worklog_author_name']
 
-            if 'issue_keys' not in activerow[date_max]:
-                activerow[date_max]['issue_keys'] = [u'Total of entire time period']
+            if self._group_by:
+                if self._group_by not in r:
+                    raise Exception('group_by failed: column "%s" does not exist.' % self._group_by)
+                group_by = r[self._group_by]
+            else:
+                group_by = None
 
+            seconds = r['worklog_timeSpentSeconds']
+            self._accumulate(accumulated, (author_name, group_by, str(r['worklog_started'])),
+                             seconds, r['issue_key'])
+            if self._total_by_username:
+                self._accumulate(accumulated, (author_name, group_by, date_max), seconds, TOTAL_ISSUE_KEYS)
 
+        rows = [self._summary_row(k, v) for k, v in accumulated.items()]
+        return self.sort_rows(rows, sort_key('worklog_author_name', 'worklog_started'))
 
-        rows = list(self.flatten_levels(accumulated))
-        #rows = [dict(worklog_timeSpentDays='{:.3f}'.format(v1['worklog_timeSpentSeconds']/60/60/8),
-        #             issue_keys=' '.join(v1['issue_keys']),
-        #             worklog_started=k1,
-        #             worklog_author_name=k) for k,v in accumulated.items() for k1, v1 in v.items()]
-        
-        rows = sorted(rows, key=itemgetter('worklog_started'))
-        rows = sorted(rows, key=itemgetter('worklog_author_name'))
-          
-        return rows
+    def _accumulate(self, accumulated, key, seconds, issue_key):
+        acc = accumulated.get(key)
+        if acc is None:
+            acc = accumulated[key] = [0, OrderedDict()]
+        acc[0] += seconds
+        acc[1][issue_key] = None
 
-    def flatten_levels(self, accumulated):
+    def _summary_row(self, key, acc):
+        author_name, group_by, started = key
+        row = dict(worklog_timeSpentDays='{:.3f}'.format(acc[0]/60/60/8),
+                   issue_keys=' '.join(acc[1]),
+                   worklog_started=started,
+                   worklog_author_name=author_name)
         if self._group_by:
-            for k, v in accumulated.items():
-                for k1, v1 in v.items():
-                    for k2, v2 in v1.items():
-                        yield dict(worklog_timeSpentDays='{:.3f}'
-                                   .format(v2['worklog_timeSpentSeconds']/60/60/8),
-                                   issue_keys=' '.join(v2['issue_keys']),
-                                   worklog_started=k2,
-                                   project_name=k1,
-                                   worklog_author_name=k)
-        else:
-            for k, v in accumulated.items():
-                for k1, v1 in v.items():
-                    yield dict(worklog_timeSpentDays='{:.3f}'
-                               .format(v1['worklog_timeSpentSeconds']/60/60/8),
-                               issue_keys=' '.join(v1['issue_keys']),
-                               worklog_started=k1,
-                               worklog_author_name=k)
-                    
+            row['project_name'] = group_by
+        return row
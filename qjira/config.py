@@ -25,5 +25,24 @@ def read_config():
         config.read([os.path.expanduser('~/.qjira.ini')])
     return config
 
-settings = read_config()
+class LazyConfig(object):
+    '''Proxy to a ConfigParser, reading the configuration files on first use.
 
+    Importing this module must stay cheap, so that the CLI entry points can
+    print usage or argument errors without touching the disk.
+    '''
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._config = None
+
+    @property
+    def loaded(self):
+        return self._config is not None
+
+    def __getattr__(self, name):
+        if self._config is None:
+            self._config = self._loader()
+        return getattr(self._config, name)
+
+settings = LazyConfig(read_config)
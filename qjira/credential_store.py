@@ -1,14 +1,102 @@
 import getpass
-import keyring
+import json
+import os
+import stat
+import time
 
 from .log import Log
+from .config import settings
 
 KEYRING_NAME = 'qjira-sp'
 
-def get_credentials(username, password):
+CACHE_FILE_MODE = stat.S_IRUSR | stat.S_IWUSR
+
+def _cache_ttl():
+    '''Seconds credentials remain in the cache file, 0 disables the cache.'''
+    return settings.getint('credentials', 'cache_ttl')
+
+def _cache_file():
+    return os.path.expanduser(settings.get('credentials', 'cache_file'))
+
+def _read_cache(path):
+    '''Return the unexpired cache entries stored in {path}.
+
+    A cache file readable by other users is ignored.'''
+    try:
+        if os.name == 'posix' and os.stat(path).st_mode & (stat.S_IRWXG | stat.S_IRWXO):
+            Log.error('Ignoring credential cache {0}, permissions are too open'.format(path))
+            return {}
+        with open(path, 'r') as f:
+            entries = json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+    now = time.time()
+    return {k:v for k,v in entries.items() if v.get('expires', 0) > now}
+
+def _write_cache(path, entries):
+    '''Replace the cache file, readable and writable by the owner only.'''
+    tmp_path = '{0}.{1}'.format(path, os.getpid())
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, CACHE_FILE_MODE)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entries, f)
+        os.chmod(tmp_path, CACHE_FILE_MODE)
+        if os.name != 'posix' and os.path.exists(path):
+            os.remove(path)
+        os.rename(tmp_path, path)
+    except (IOError, OSError) as err:
+        Log.error(err)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def get_cached_password(username):
+    '''Return the cached password of {username} or None.'''
+    if _cache_ttl() <= 0:
+        return None
+    entry = _read_cache(_cache_file()).get(username)
+    return entry['password'] if entry else None
+
+def cache_password(username, password):
+    '''Store the password of {username} in the cache file until it expires.'''
+    ttl = _cache_ttl()
+    if ttl <= 0 or not password:
+        return
+    path = _cache_file()
+    entries = _read_cache(path)
+    entries[username] = {'password': password, 'expires': time.time() + ttl}
+    _write_cache(path, entries)
+
+def clear_cached_password(username):
+    '''Remove {username} from the cache file.'''
+    path = _cache_file()
+    if not os.path.exists(path):
+        return
+    entries = _read_cache(path)
+    if username in entries:
+        del entries[username]
+        _write_cache(path, entries)
+
+def get_credentials(username, password, api_token=None):
+    '''Return tuple of username and password.
+
+    An {api_token} is used as the password as-is, neither the cache nor
+    the OS keyring are consulted. Otherwise the password is looked up
+    in the credential cache, then the OS keyring, then prompted for.
+    '''
     if not username:
         username = getpass.getuser()
 
+    if api_token:
+        return username, api_token
+
+    if not password:
+        password = get_cached_password(username)
+        if password:
+            Log.debug('Using cached credentials for {0}'.format(username))
+            return username, password
+
+    import keyring
+
     _needs_storage = True
     
     if not password:
@@ -26,13 +114,28 @@ def get_credentials(username, password):
             keyring.set_password(KEYRING_NAME, username, password)
         except keyring.errors.PasswordSetError as err:
             Log.error(err)
+
+    cache_password(username, password)
         
     return username, password
 
-def clear_credentials(username):
-    if username and keyring.get_keyring():
+def clear_credentials(username, api_token=None):
+    '''Forget the stored credentials of {username}, e.g. after a 401.
+
+    Credentials supplied as an {api_token} never reached the OS keyring,
+    so only the cache is cleared.'''
+    if not username:
+        return
+
+    clear_cached_password(username)
+
+    if api_token:
+        return
+
+    import keyring
+
+    if keyring.get_keyring():
         try:
             keyring.delete_password(KEYRING_NAME, username)
         except keyring.errors.PasswordDeleteError as err:
             Log.error(err)
-            
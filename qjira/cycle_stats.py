@@ -0,0 +1,166 @@
+'''Cycle time statistics: count, mean, percentiles and a histogram of the
+days between two dates of every issue, grouped by columns.
+
+Day counts are collected into compact arrays while the issues stream
+by. With NumPy installed (pip install qjira[stats]) the statistics are
+computed with vectorized array operations, otherwise in pure Python with
+the same results.
+'''
+import bisect
+import datetime
+from array import array
+from collections import OrderedDict
+
+DEFAULT_PERCENTILES = (50, 85, 95)
+
+DEFAULT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34)
+
+def bucket_names(buckets):
+    '''Return the histogram column names of bucket lower bounds {buckets}.'''
+    names = ['days_{0}_{1}'.format(lo, hi) for lo, hi in zip(buckets, buckets[1:])]
+    names.append('days_{0}_plus'.format(buckets[-1]))
+    return names
+
+def percentile_names(percentiles):
+    return ['p{0:g}'.format(p) for p in percentiles]
+
+def summary_columns(group_by, percentiles=DEFAULT_PERCENTILES, buckets=DEFAULT_BUCKETS):
+    '''Return the columns of the summary table, in order.'''
+    return list(group_by) + ['count', 'mean'] + percentile_names(percentiles) + bucket_names(buckets)
+
+# set to False to always compute in pure Python
+use_numpy = True
+
+def _numpy():
+    '''Return the numpy module, or None when it is not installed or not
+    used. Imported on first use, so commands not computing statistics do not pay
+    for importing it.'''
+    if not use_numpy:
+        return None
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+def _days(begin, end):
+    if isinstance(begin, datetime.datetime):
+        begin = begin.date()
+    if isinstance(end, datetime.datetime):
+        end = end.date()
+    return end.toordinal() - begin.toordinal()
+
+def _percentile(sorted_values, p):
+    '''Linear interpolation between closest ranks, like numpy.percentile.'''
+    rank = (len(sorted_values) - 1) * p / 100.0
+    lo = int(rank)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (rank - lo)
+
+
+class CycleStatistics(object):
+    '''Accumulates day counts per group, then summarizes them.
+
+    Arguments:
+
+    group_by - columns grouping the issues, e.g. issuetype_name
+    begin, end - date columns, issues missing either are skipped
+    percentiles - percentiles to compute
+    buckets - lower bounds (days) of the histogram buckets
+    '''
+
+    def __init__(self, group_by=(), begin='cycle_begin', end='cycle_end',
+                 percentiles=DEFAULT_PERCENTILES, buckets=DEFAULT_BUCKETS):
+        self.group_by = list(group_by)
+        self.begin = begin
+        self.end = end
+        self.percentiles = list(percentiles)
+        self.buckets = list(buckets)
+        self._groups = OrderedDict()
+        self._group_idx = array('l')
+        self._days = array('l')
+
+    def add(self, record):
+        '''Add the day count of one issue {record}.'''
+        begin = record.get(self.begin)
+        end = record.get(self.end)
+        if not begin or not end:
+            return
+        group = tuple(record.get(col) for col in self.group_by)
+        idx = self._groups.get(group)
+        if idx is None:
+            idx = self._groups[group] = len(self._groups)
+        self._group_idx.append(idx)
+        self._days.append(_days(begin, end))
+
+    def extend(self, records):
+        for record in records:
+            self.add(record)
+        return self
+
+    def __len__(self):
+        return len(self._days)
+
+    def rows(self):
+        '''Return a summary row per group, in order of first appearance.'''
+        if not self._days:
+            return []
+        np = _numpy()
+        if np is not None:
+            stats = self._summarize_numpy(np)
+        else:
+            stats = self._summarize_python()
+        rows = []
+        names = percentile_names(self.percentiles)
+        histogram_names = bucket_names(self.buckets)
+        for group, idx in self._groups.items():
+            count, mean, percentiles, histogram = stats[idx]
+            row = OrderedDict(zip(self.group_by, group))
+            row['count'] = count
+            row['mean'] = round(mean, 1)
+            row.update((n, round(v, 1)) for n, v in zip(names, percentiles))
+            row.update(zip(histogram_names, histogram))
+            rows.append(row)
+        return rows
+
+    def _summarize_numpy(self, np):
+        n_groups = len(self._groups)
+        n_buckets = len(self.buckets)
+        group_idx = np.frombuffer(self._group_idx, dtype=self._group_idx.typecode)
+        days = np.frombuffer(self._days, dtype=self._days.typecode)
+
+        counts = np.bincount(group_idx, minlength=n_groups)
+        means = np.bincount(group_idx, weights=days, minlength=n_groups) / counts
+
+        # days before the first bucket go into the first bucket
+        bucket_idx = np.clip(np.searchsorted(self.buckets, days, side='right') - 1, 0, n_buckets - 1)
+        histograms = np.bincount(group_idx * n_buckets + bucket_idx,
+                                 minlength=n_groups * n_buckets).reshape(n_groups, n_buckets)
+
+        # one sort orders the days of every group, groups become slices
+        order = np.lexsort((days, group_idx))
+        sorted_days = days[order]
+        ends = np.cumsum(counts)
+        stats = []
+        for idx in range(n_groups):
+            group_days = sorted_days[ends[idx] - counts[idx]:ends[idx]]
+            percentiles = np.percentile(group_days, self.percentiles)
+            stats.append((int(counts[idx]), float(means[idx]),
+                          [float(p) for p in percentiles],
+                          [int(h) for h in histograms[idx]]))
+        return stats
+
+    def _summarize_python(self):
+        per_group = [[] for _ in self._groups]
+        for idx, days in zip(self._group_idx, self._days):
+            per_group[idx].append(days)
+        stats = []
+        for values in per_group:
+            values.sort()
+            histogram = [0] * len(self.buckets)
+            for days in values:
+                histogram[max(bisect.bisect_right(self.buckets, days) - 1, 0)] += 1
+            stats.append((len(values), float(sum(values)) / len(values),
+                          [_percentile(values, p) for p in self.percentiles],
+                          histogram))
+        return stats
@@ -1,11 +1,32 @@
 
 '''data.py - process a jira issue'''
 import re
+from itertools import chain
 from dateutil import parser as date_parser
 
-from .text_utils import _generate_name, _isstring
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+from .text_utils import _generate_name, _isstring, _intern
 from .log import Log
 
+# fields with few distinct values whose flattened string values are
+# interned, e.g. status_name, assignee_name or sprint_0_name; summaries,
+# descriptions and other one-off values are not
+INTERNED_FIELDS = frozenset(['status', 'issuetype', 'project', 'priority', 'resolution',
+                             'assignee', 'reporter', 'sprint', 'fixVersions', 'components'])
+
+# flattened column -> True if its values are interned
+_interned_columns = {}
+
+def _is_interned_column(k):
+    interned = _interned_columns.get(k)
+    if interned is None:
+        interned = _interned_columns[k] = k.split('_', 1)[0] in INTERNED_FIELDS
+    return interned
+
 re_prog = re.compile('[0-9]{4}\-[0-9]{2}\-[0-9]{2}T[0-9]{2}\:[0-9]{2}:[0-9]{2}\.[0-9]{3}\-[0-9]{4}')
 
 def flatten_json_struct(data, count_fields=[], datetime_fields=[]):
@@ -21,7 +42,8 @@ def flatten_json_struct(data, count_fields=[], datetime_fields=[]):
                 yield k, date_parser.parse(v).date()
             elif _isstring(v):
                 #print('> yielding value {0}: {1}'.format(k, repr(v)))
-                yield k, v.replace('\r', '').replace('\n', ' ')
+                v = v.replace('\r', '').replace('\n', ' ')
+                yield k, _intern(v) if _is_interned_column(k) else v
             else:
                 #print('> yielding value {0}: {1}'.format(k, repr(v)))
                 yield k, v
@@ -48,16 +70,77 @@ def flatten_json_struct(data, count_fields=[], datetime_fields=[]):
 
 
 
+class PivotOverlay(Mapping):
+    '''Issue {base} seen with field {pivot_on} set to one {pivot} value.
+
+    Pivoting an issue on a list field yields one overlay per element, all
+    referencing the same base issue instead of copying it. The overlays
+    of one issue also share {shared}, so the base issue is flattened once.
+    '''
+
+    __slots__ = ('base', 'pivot_on', 'pivot', '_shared')
+
+    def __init__(self, base, pivot_on, pivot, shared=None):
+        self.base = base
+        self.pivot_on = pivot_on
+        self.pivot = pivot
+        self._shared = shared if shared is not None else [None]
+
+    def __getitem__(self, key):
+        if key == self.pivot_on:
+            return self.pivot
+        return self.base[key]
+
+    def __iter__(self):
+        yield self.pivot_on
+        for k in self.base:
+            if k != self.pivot_on:
+                yield k
+
+    def __len__(self):
+        return len(self.base) + (0 if self.pivot_on in self.base else 1)
+
+    def flatten(self, flatten_fn):
+        '''Return the flattened (key, value) pairs of the pivot element
+        followed by those of the base issue.'''
+        base_items = self._shared[0]
+        if base_items is None:
+            base = self.base
+            if self.pivot_on in base:
+                base = {k:v for k,v in base.items() if k != self.pivot_on}
+            base_items = self._shared[0] = tuple(flatten_fn(base))
+        return chain(flatten_fn({self.pivot_on: self.pivot}), base_items)
+
+def pivot_overlays(data, pivot_on, pivots):
+    '''Generate an overlay of {data} for every element of {pivots}.'''
+    shared = [None]
+    for pivot in pivots:
+        yield PivotOverlay(data, pivot_on, pivot, shared)
+
 def load_changelog(data):
     update_data_history(data, _create_history)
 
 def load_transitions(data):
-    histories = sorted(data['_changelog']['histories'], key=lambda x: x['created'])
     transitions = [_transition(dict(item, created=h['created']))
-                   for h in histories for item in h['items']
-                   if item['field'] == 'status']
+                   for h, item in _status_items(data)]
     #print('>> transitions', transitions)
     data.update({'transitions': transitions})
+
+def status_transitions(data):
+    '''Return (from status, to status, change date) of every status change
+    of issue {data}, oldest first.'''
+    return [(_from_status(item), _to_status(item), date_parser.parse(h['created']).date())
+            for h, item in _status_items(data)]
+
+def _status_items(data):
+    histories = sorted(data['_changelog']['histories'], key=lambda x: x['created'])
+    return [(h, item) for h in histories for item in h['items'] if item['field'] == 'status']
+
+def _from_status(history):
+    return history.get('fromString') or 'New'
+
+def _to_status(history):
+    return history.get('toString') or 'Open'
     
 def update_data_history(data, callback):
     if data.get('_changelog'):
@@ -82,8 +165,8 @@ def _create_history(history):
 
 def _transition(history):
     '''Create a tuple of important info from a changelog history.'''
-    normalized_from_string = history.get('fromString', 'New')
-    normalized_to_string = history.get('toString', 'Open')
+    normalized_from_string = _from_status(history)
+    normalized_to_string = _to_status(history)
     field_name = 'from_{0}'.format(normalized_from_string).replace(' ', '')
     normalized_string = 'to_{0}'.format(normalized_to_string).replace(' ', '')
     created_date = date_parser.parse(history['created']).date()
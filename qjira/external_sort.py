@@ -0,0 +1,101 @@
+'''Sort rows that may not fit in memory.
+
+Rows are read in runs of at most {buffer_rows}. When all rows fit in one
+run they are sorted in memory. Otherwise every run is sorted and written
+to a temporary file, then the runs are merged with a heap, generating
+the rows in order while holding one row per run in memory.
+
+Runs are pickled row by row as the list of values, the column names of
+a row are written once per run: the first row with a set of columns
+carries them, later rows refer to them by number. Rows of the flattened
+pipeline come back as Row objects sharing a schema, other rows as dicts.
+'''
+import heapq
+import pickle
+import tempfile
+
+from .log import Log
+from .row import Row, RowSchema
+
+DEFAULT_BUFFER_ROWS = 100000
+
+def sort(rows, key, buffer_rows=DEFAULT_BUFFER_ROWS, tmpdir=None):
+    '''Return {rows} sorted by {key}: a list when they fit in {buffer_rows},
+    otherwise a generator merging the runs spilled to files in {tmpdir}
+    [default: the system temporary directory]. All rows are read before
+    returning.'''
+    rows = iter(rows)
+    run = _read_run(rows, buffer_rows)
+    if len(run) < buffer_rows:
+        run.sort(key=key)
+        return run
+
+    files = []
+    try:
+        while run:
+            run.sort(key=key)
+            files.append(_write_run(run, tmpdir))
+            run = _read_run(rows, buffer_rows)
+    except Exception:
+        for f in files:
+            f.close()
+        raise
+    Log.debug('Sorting {0} runs of up to {1} rows'.format(len(files), buffer_rows))
+    return _merge(files, key)
+
+def _read_run(rows, buffer_rows):
+    run = []
+    for row in rows:
+        run.append(row)
+        if len(run) >= buffer_rows:
+            break
+    return run
+
+def _write_run(run, tmpdir):
+    f = tempfile.TemporaryFile(dir=tmpdir)
+    pickler = pickle.Pickler(f, pickle.HIGHEST_PROTOCOL)
+    # (is Row, column names) -> number of the columns in this run
+    columns = {}
+    for row in run:
+        is_row = isinstance(row, Row)
+        keys = tuple(row.keys())
+        n = columns.get((is_row, keys))
+        if n is None:
+            n = columns[(is_row, keys)] = len(columns)
+            pickler.dump((n, is_row, keys, list(row.values())))
+        else:
+            pickler.dump((n, None, None, list(row.values())))
+        # the memo would keep every written row alive
+        pickler.clear_memo()
+    f.seek(0)
+    return f
+
+def _read_rows(f):
+    '''Generate the rows of run file {f}.'''
+    unpickler = pickle.Unpickler(f)
+    # number -> (RowSchema, None) for Rows, (None, column names) for dicts
+    columns = []
+    while True:
+        try:
+            n, is_row, keys, values = unpickler.load()
+        except EOFError:
+            return
+        if keys is not None:
+            columns.append((RowSchema.get(keys), None) if is_row else (None, keys))
+        schema, keys = columns[n]
+        yield Row(schema, values) if schema is not None else dict(zip(keys, values))
+
+def _decorate(rows, key, run):
+    # equal keys keep the order of the runs and of the rows in a run, rows
+    # themselves are never compared
+    for i, row in enumerate(rows):
+        yield key(row), run, i, row
+
+def _merge(files, key):
+    runs = [_decorate(_read_rows(f), key, n) for n, f in enumerate(files)]
+    try:
+        for entry in heapq.merge(*runs):
+            yield entry[3]
+    finally:
+        for f in files:
+            f.close()
@@ -0,0 +1,100 @@
+'''Monte Carlo delivery forecast: the periods (sprints or weeks) needed to
+complete a backlog, from the effort completed in past periods.
+
+Every trial replays the history, drawing a past period at random until
+the backlog is done. With NumPy installed (pip install qjira[stats]) all
+trials are drawn as matrices of periods, a cumulative sum per trial and
+a search for the first period reaching the backlog, so 10k+ trials take
+milliseconds. The matrices hold a bounded number of trials and periods,
+large backlogs take more passes rather than more memory. Otherwise the trials run in pure Python.
+'''
+import math
+import random
+
+DEFAULT_TRIALS = 10000
+
+DEFAULT_CONFIDENCES = (50, 85, 95)
+
+# the NumPy trials are drawn TRIAL_CHUNK trials and MAX_HORIZON periods at
+# a time, bounding the memory of a pass to a few MB
+TRIAL_CHUNK = 2048
+
+MAX_HORIZON = 256
+
+# set to False to always compute in pure Python
+use_numpy = True
+
+def _numpy():
+    '''Return the numpy module, or None when it is not installed or not
+    used. Imported on first use, so commands not forecasting do not pay
+    for importing it.'''
+    if not use_numpy:
+        return None
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+def simulate(history, remaining, trials=DEFAULT_TRIALS, seed=None):
+    '''Return the sorted periods needed to complete {remaining} effort in
+    each of {trials} trials drawn from the per-period {history}.'''
+    history = [float(h) for h in history]
+    if not history or max(history) <= 0:
+        raise ValueError('Cannot forecast without completed effort in the history')
+    if remaining <= 0:
+        return [0] * trials
+    np = _numpy()
+    if np is not None:
+        return _simulate_numpy(np, history, remaining, trials, seed)
+    return _simulate_python(history, remaining, trials, seed)
+
+def _simulate_numpy(np, history, remaining, trials, seed):
+    rng = np.random.RandomState(seed)
+    history = np.asarray(history)
+    periods = np.zeros(trials, dtype=np.int64)
+    for start in range(0, trials, TRIAL_CHUNK):
+        stop = min(start + TRIAL_CHUNK, trials)
+        periods[start:stop] = _simulate_chunk(np, rng, history, remaining, stop - start)
+    periods.sort()
+    return periods.tolist()
+
+def _simulate_chunk(np, rng, history, remaining, trials):
+    # draw a horizon of twice the mean periods, at most MAX_HORIZON, trials
+    # not done by then draw another horizon: a pass holds at most
+    # TRIAL_CHUNK x MAX_HORIZON periods whatever the backlog
+    horizon = min(int(math.ceil(2 * remaining / history.mean())) + 1, MAX_HORIZON)
+    periods = np.zeros(trials, dtype=np.int64)
+    completed = np.zeros(trials)
+    pending = np.arange(trials)
+    offset = 0
+    while pending.size:
+        samples = history[rng.randint(len(history), size=(pending.size, horizon))]
+        totals = completed[pending][:, np.newaxis] + np.cumsum(samples, axis=1)
+        done = totals[:, -1] >= remaining
+        first = np.argmax(totals[done] >= remaining, axis=1)
+        periods[pending[done]] = offset + first + 1
+        completed[pending[~done]] = totals[~done, -1]
+        pending = pending[~done]
+        offset += horizon
+    return periods
+
+def _simulate_python(history, remaining, trials, seed):
+    rng = random.Random(seed)
+    choice = rng.choice
+    periods = []
+    for _ in range(trials):
+        completed = 0.0
+        n = 0
+        while completed < remaining:
+            completed += choice(history)
+            n += 1
+        periods.append(n)
+    periods.sort()
+    return periods
+
+def confidence_intervals(periods, confidences=DEFAULT_CONFIDENCES):
+    '''Return (confidence, periods) pairs: {periods} sorted, the share of
+    trials done within the returned periods is at least the confidence.'''
+    n = len(periods)
+    return [(c, periods[max(int(math.ceil(c / 100.0 * n)) - 1, 0)]) for c in confidences]
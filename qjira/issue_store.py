@@ -0,0 +1,125 @@
+'''On-disk store of raw issue JSON, looked up by issue key.
+
+Two append-only files live in the store directory: issues.dat holds one
+JSON document per line, issues.idx one "base_url key offset length" line
+per document. Issue keys are only unique within a Jira instance, a store
+opened for one base URL ignores the issues of other instances sharing the
+directory. The index is read into a dict when the store opens and the data
+file is read through mmap, so a lookup costs one dict access and one
+slice whatever the size of the store. Rewriting an issue appends a new
+document; the latest one wins.
+'''
+import os
+import io
+import json
+import mmap
+import threading
+
+DATA_FILE = 'issues.dat'
+
+INDEX_FILE = 'issues.idx'
+
+
+class IssueStore(object):
+    '''Append-only raw issue store.
+
+    Arguments:
+
+    directory - store location, created when missing
+    base_url - Jira instance of the issues
+    '''
+
+    def __init__(self, directory, base_url):
+        directory = os.path.expanduser(directory)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.directory = directory
+        self.base_url = base_url
+        self._lock = threading.Lock()
+        self._data = io.open(os.path.join(directory, DATA_FILE), 'a+b')
+        self._index_file = io.open(os.path.join(directory, INDEX_FILE), 'a+b')
+        self._map = None
+        self._map_size = 0
+        self._index = self._load_index()
+
+    def _load_index(self):
+        '''Read the index entries of base_url, ignoring entries past the end
+        of the data file, e.g. from an interrupted write.'''
+        self._data.seek(0, os.SEEK_END)
+        data_size = self._data.tell()
+        index = {}
+        self._index_file.seek(0)
+        for line in self._index_file:
+            parts = line.decode('utf-8').split()
+            if len(parts) != 4 or parts[0] != self.base_url:
+                continue
+            key, offset, length = parts[1], int(parts[2]), int(parts[3])
+            if offset + length <= data_size:
+                index[key] = (offset, length)
+        return index
+
+    def _mapped(self, end):
+        '''Return a mmap of the data file covering byte {end}.'''
+        if self._map is None or self._map_size < end:
+            if self._map is not None:
+                self._map.close()
+            self._data.flush()
+            self._map = mmap.mmap(self._data.fileno(), 0, access=mmap.ACCESS_READ)
+            self._map_size = len(self._map)
+        return self._map
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def keys(self):
+        return list(self._index.keys())
+
+    def put(self, issue):
+        '''Append the raw JSON {issue}, replacing any earlier version.'''
+        record = json.dumps(issue, separators=(',', ':')).encode('utf-8') + b'\n'
+        with self._lock:
+            self._data.seek(0, os.SEEK_END)
+            offset = self._data.tell()
+            self._data.write(record)
+            self._data.flush()
+            self._index_file.write('{0} {1} {2} {3}\n'.format(self.base_url, issue['key'], offset,
+                                                            len(record) - 1).encode('utf-8'))
+            self._index_file.flush()
+            self._index[issue['key']] = (offset, len(record) - 1)
+
+    def get(self, key, default=None):
+        '''Return the raw JSON of issue {key}.'''
+        entry = self._index.get(key)
+        if entry is None:
+            return default
+        offset, length = entry
+        with self._lock:
+            data = self._mapped(offset + length)[offset:offset + length]
+        return json.loads(data.decode('utf-8'))
+
+    def scan(self):
+        '''Generate the latest version of every issue, in data file order.'''
+        with self._lock:
+            entries = sorted(self._index.values())
+        for offset, length in entries:
+            with self._lock:
+                data = self._mapped(offset + length)[offset:offset + length]
+            yield json.loads(data.decode('utf-8'))
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            self._data.close()
+            self._index_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+        return False
@@ -1,9 +1,11 @@
 '''Executes simple queries of Jira Cloud REST API'''
 #from __future__ import unicode_literals
-import requests
 import datetime
+import hashlib
 import json
 import re
+import time
+import timeit
 from dateutil import parser as date_parser
 
 try:
@@ -13,6 +15,10 @@ except ImportError:
 
 from .config import settings
 from .log import Log
+from .timing import Timing
+from .metrics import HttpMetrics
+from .snapshot import Snapshot
+from .text_utils import _intern
 
 CUSTOM_NAME_MAP = dict(settings.items('custom_fields'))
 
@@ -25,6 +31,18 @@ ISSUE_WORKLOG_ENDPOINT=ISSUE_ENDPOINT + '/worklog'
 ISSUE_SEARCH_ENDPOINT='{}/rest/api/2/search?{}'
 
 ISSUE_BROWSE='{}/browse/{}'
+
+WORKLOG_UPDATED_ENDPOINT='{}/rest/api/2/worklog/updated?{}'
+
+WORKLOG_DELETED_ENDPOINT='{}/rest/api/2/worklog/deleted?{}'
+
+WORKLOG_LIST_ENDPOINT='{}/rest/api/2/worklog/list'
+
+# most worklog ids /worklog/list accepts in one request
+WORKLOG_LIST_MAX_IDS = 1000
+
+# issue ids resolved to keys per search request
+ISSUE_KEYS_BATCH = 100
     
 HEADERS = {'content-type': 'application/json'}
 
@@ -32,11 +50,25 @@ DEFAULT_FIELDS = settings.get('jira','default_fields').split(',')
 
 DEFAULT_EXPANDS = settings.get('jira','default_expands').split(',')
 
+MAX_RETRIES = settings.getint('jira', 'max_retries')
+
+MAX_RETRY_DELAY = settings.getint('jira', 'max_retry_delay')
+
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+
+# optional IssueStore answering get_issue, see use_issue_store()
+ISSUE_STORE = None
+
+# when set, get_issue never calls Jira
+OFFLINE = False
+
 def extract_sprint(sprint):
     '''Return a dict object containing sprint details.'''
     m = re.search('\[(.+)\]', sprint)
     if m:
-        d = dict(e.split('=') for e in m.group(1).split(','))
+        # field names repeat for every sprint, values are interned when
+        # the sprint is flattened
+        d = dict((_intern(k), v) for k, v in (e.split('=') for e in m.group(1).split(',')))
         for n in ('startDate','endDate','completeDate'):
             try:
                 the_date = date_parser.parse(d[n]).date()
@@ -53,11 +85,57 @@ def customfield_value(name):
     can be added without additional configuration.'''
     return CUSTOM_NAME_MAP.get(name, name)
 
-def _get_json(url, username=None, password=None, headers=HEADERS):
-    r = requests.get(url, auth=(username, password), headers=headers)
-    Log.debug(r.status_code)
+def _retry_delay(response, attempt):
+    '''Seconds to wait before retrying, honoring a Retry-After header, at
+    most MAX_RETRY_DELAY.'''
+    try:
+        delay = max(float(response.headers.get('Retry-After')), 0.0)
+    except (TypeError, ValueError):
+        delay = 2 ** attempt
+    return min(delay, MAX_RETRY_DELAY)
+
+def _get_json(url, username=None, password=None, headers=HEADERS, endpoint='other'):
+    return _request_json('get', url, url, username, password, headers, endpoint)
+
+def _post_json(url, body, username=None, password=None, headers=HEADERS, endpoint='other'):
+    '''POST JSON {body} to {url}. Snapshots key the response by the url and
+    a digest of the body.'''
+    data = json.dumps(body, sort_keys=True)
+    snapshot_url = '{0}?body={1}'.format(url, hashlib.sha1(data.encode('utf-8')).hexdigest())
+    return _request_json('post', url, snapshot_url, username, password, headers, endpoint, data=data)
+
+def _request_json(method, url, snapshot_url, username, password, headers, endpoint, **kwargs):
+    if Snapshot.is_replaying():
+        HttpMetrics.record_cache_hit(endpoint)
+        with Timing.stage('snapshot', count=1):
+            return Snapshot.load(snapshot_url)
+
+    import requests
+
+    attempt = 0
+    while True:
+        started = timeit.default_timer()
+        with Timing.stage('http', count=1):
+            r = getattr(requests, method)(url, auth=(username, password), headers=headers, **kwargs)
+        HttpMetrics.record_response(endpoint, r.status_code, len(r.content),
+                                    timeit.default_timer() - started)
+        Log.debug(r.status_code)
+        if r.status_code not in RETRY_STATUS_CODES or attempt >= MAX_RETRIES:
+            break
+        attempt += 1
+        delay = _retry_delay(r, attempt)
+        HttpMetrics.record_retry(endpoint)
+        if r.status_code == 429:
+            HttpMetrics.record_rate_limit_wait(endpoint, delay)
+        Log.debug('Retry {0} of {1} in {2}s, status {3}'.format(attempt, MAX_RETRIES, delay, r.status_code))
+        time.sleep(delay)
     r.raise_for_status()        
-    return r.json()
+    with Timing.stage('json_decode', count=1):
+        payload = r.json()
+    if Snapshot.is_recording():
+        with Timing.stage('snapshot', count=1):
+            Snapshot.save(snapshot_url, endpoint, payload)
+    return payload
 
 def _as_data(issue, reverse_sprints=False):
     """
@@ -109,18 +187,92 @@ def get_worklog(baseUrl, issuekey, username=None, password=None):
     """Retrieve the worklog history for an issue."""
     url = ISSUE_WORKLOG_ENDPOINT.format(baseUrl, issuekey)
     Log.debug('url = ' + url)
-    return _get_json(url, username=username, password=password)
+    return _get_json(url, username=username, password=password, endpoint='worklog')
+
+def changed_worklogs(baseUrl, since, deleted=False, username=None, password=None):
+    '''Return (worklog ids, until) of the worklogs updated, or {deleted},
+    since {since} (epoch milliseconds). {until} is the since of the next
+    sync.'''
+    template = WORKLOG_DELETED_ENDPOINT if deleted else WORKLOG_UPDATED_ENDPOINT
+    url = template.format(baseUrl, urlencode({'since': since}))
+    ids = []
+    while url:
+        Log.debug('url = ' + url)
+        payload = _get_json(url, username=username, password=password, endpoint='worklog_changes')
+        ids.extend(v['worklogId'] for v in payload['values'])
+        since = payload.get('until', since)
+        url = None if payload.get('lastPage', True) else payload.get('nextPage')
+    return ids, since
+
+def list_worklogs(baseUrl, ids, username=None, password=None):
+    '''Generate the worklogs of worklog {ids}, requested in batches.'''
+    url = WORKLOG_LIST_ENDPOINT.format(baseUrl)
+    for start in range(0, len(ids), WORKLOG_LIST_MAX_IDS):
+        batch = ids[start:start + WORKLOG_LIST_MAX_IDS]
+        Log.debug('url = {0} ({1} ids)'.format(url, len(batch)))
+        for worklog in _post_json(url, {'ids': batch}, username=username, password=password,
+                                  endpoint='worklog_list'):
+            yield worklog
+
+def issue_keys(baseUrl, issue_ids, username=None, password=None):
+    '''Return dict of issue id to key of {issue_ids}. Each batch of ids is
+    paged until resolved, in case the server caps the page size; ids not
+    found (e.g. deleted issues) are logged and left out.'''
+    keys = {}
+    issue_ids = [str(i) for i in issue_ids]
+    for start in range(0, len(issue_ids), ISSUE_KEYS_BATCH):
+        batch = issue_ids[start:start + ISSUE_KEYS_BATCH]
+        start_at = 0
+        while True:
+            query_string = urlencode({
+                'jql': 'id in ({0})'.format(','.join(batch)),
+                'fields': '-*navigable',
+                'startAt': start_at,
+                'maxResults': len(batch)
+            })
+            url = ISSUE_SEARCH_ENDPOINT.format(baseUrl, query_string)
+            Log.debug('url = ' + url)
+            payload = _get_json(url, username=username, password=password, endpoint='search')
+            issues = payload['issues']
+            keys.update((str(issue['id']), issue['key']) for issue in issues)
+            start_at += len(issues)
+            if not issues or start_at >= payload.get('total', 0):
+                break
+    unresolved = [i for i in issue_ids if i not in keys]
+    if unresolved:
+        Log.info('No issue key found for issue ids: {0}'.format(', '.join(unresolved)))
+    return keys
 
 def get_browse_url(baseUrl, issuekey):
     if not issuekey:
         raise ValueError
     return ISSUE_BROWSE.format(baseUrl, issuekey)
 
+def use_issue_store(store, offline=False):
+    '''Answer get_issue from {store} (an IssueStore, or None to stop),
+    storing issues fetched from Jira. When {offline}, issues missing
+    from the store raise KeyError instead.'''
+    global ISSUE_STORE, OFFLINE
+    ISSUE_STORE = store
+    OFFLINE = offline and store is not None
+
 def get_issue(baseUrl, issuekey, username=None, password=None):
-    # this does not pass in the query string
-    url = ISSUE_ENDPOINT.format(baseUrl, issuekey)
-    Log.debug('url = ' + url)
-    return _as_data(_get_json(url, username=username, password=password))
+    # the store only holds issues of the instance it was opened for
+    store = ISSUE_STORE if ISSUE_STORE is not None and ISSUE_STORE.base_url == baseUrl else None
+    payload = store.get(issuekey) if store is not None else None
+    if payload is not None:
+        HttpMetrics.record_cache_hit('issue')
+    elif OFFLINE:
+        raise KeyError('{0} of {1} not found in issue store {2}'.format(issuekey, baseUrl, ISSUE_STORE.directory))
+    else:
+        # this does not pass in the query string
+        url = ISSUE_ENDPOINT.format(baseUrl, issuekey)
+        Log.debug('url = ' + url)
+        payload = _get_json(url, username=username, password=password, endpoint='issue')
+        if store is not None:
+            store.put(payload)
+    with Timing.stage('_as_data', count=1):
+        return _as_data(payload)
 
 def all_issues(baseUrl, jql,
                username=None,
@@ -153,14 +305,16 @@ def all_issues(baseUrl, jql,
         Log.debug('url = ' + url)
         if progress_cb:
             progress_cb(startAt, total)
-        payload = _get_json(url, username=username, password=password)
+        payload = _get_json(url, username=username, password=password, endpoint='search')
         #print('> payload {0}'.format(type(payload)))
         total = payload['total']
         issues = payload['issues']
         count = len(issues)
         startAt += count
         for issue in issues:
-            yield _as_data(issue, reverse_sprints=reverse_sprints)
+            with Timing.stage('_as_data', count=1):
+                data = _as_data(issue, reverse_sprints=reverse_sprints)
+            yield data
             if continue_cb and not continue_cb():
                 return
 
@@ -0,0 +1,169 @@
+'''HTTP client metrics of a run, exportable as JSON or as a Prometheus
+textfile for the node_exporter textfile collector.'''
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+
+# upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _new_endpoint():
+    return {
+        'requests': 0,
+        'bytes': 0,
+        'status_codes': {},
+        'latency_sum': 0.0,
+        'latency_buckets': [0] * (len(LATENCY_BUCKETS) + 1),
+        'retries': 0,
+        'rate_limit_waits': 0,
+        'rate_limit_wait_seconds': 0.0,
+        'cache_hits': 0
+    }
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(**kwargs):
+    return '{' + ','.join('{0}="{1}"'.format(k, _escape(v)) for k, v in sorted(kwargs.items())) + '}'
+
+def _bucket_label(bound):
+    return '{0:g}'.format(bound)
+
+
+class HttpMetrics:
+    '''Simple counters of Jira REST calls'''
+
+    # globals
+    endpoints = OrderedDict()
+    # requests may be recorded from several threads
+    _lock = threading.Lock()
+
+    @staticmethod
+    def reset():
+        HttpMetrics.endpoints = OrderedDict()
+
+    @staticmethod
+    def _endpoint(name):
+        stats = HttpMetrics.endpoints.get(name)
+        if stats is None:
+            stats = HttpMetrics.endpoints[name] = _new_endpoint()
+        return stats
+
+    @staticmethod
+    def record_response(endpoint, status_code, nbytes, latency):
+        '''Count a response of {nbytes} received after {latency} seconds.'''
+        idx = 0
+        while idx < len(LATENCY_BUCKETS) and latency > LATENCY_BUCKETS[idx]:
+            idx += 1
+        code = str(status_code)
+        with HttpMetrics._lock:
+            stats = HttpMetrics._endpoint(endpoint)
+            stats['requests'] += 1
+            stats['bytes'] += nbytes
+            stats['status_codes'][code] = stats['status_codes'].get(code, 0) + 1
+            stats['latency_sum'] += latency
+            stats['latency_buckets'][idx] += 1
+
+    @staticmethod
+    def record_retry(endpoint):
+        with HttpMetrics._lock:
+            HttpMetrics._endpoint(endpoint)['retries'] += 1
+
+    @staticmethod
+    def record_rate_limit_wait(endpoint, seconds):
+        with HttpMetrics._lock:
+            stats = HttpMetrics._endpoint(endpoint)
+            stats['rate_limit_waits'] += 1
+            stats['rate_limit_wait_seconds'] += seconds
+
+    @staticmethod
+    def record_cache_hit(endpoint):
+        '''Count a request answered without calling Jira.'''
+        with HttpMetrics._lock:
+            HttpMetrics._endpoint(endpoint)['cache_hits'] += 1
+
+    @staticmethod
+    def as_dict():
+        '''Return the summary of all endpoints, with totals.'''
+        endpoints = OrderedDict()
+        totals = {'requests': 0, 'bytes': 0, 'retries': 0, 'rate_limit_waits': 0, 'cache_hits': 0}
+        for name, stats in HttpMetrics.endpoints.items():
+            summary = OrderedDict((k, v) for k, v in stats.items() if k != 'latency_buckets')
+            summary['latency_histogram'] = OrderedDict(
+                (_bucket_label(b), n) for b, n in zip(LATENCY_BUCKETS + (float('inf'),),
+                                                     stats['latency_buckets']))
+            summary['latency_mean'] = stats['latency_sum'] / stats['requests'] if stats['requests'] else 0.0
+            endpoints[name] = summary
+            for k in totals:
+                totals[k] += stats[k]
+        return OrderedDict([('endpoints', endpoints), ('totals', totals)])
+
+    @staticmethod
+    def write_json(f):
+        json.dump(HttpMetrics.as_dict(), f, indent=4, separators=(',', ': '))
+        f.write('\n')
+
+    @staticmethod
+    def prometheus_lines(timestamp=None):
+        '''Generate the metrics in Prometheus text exposition format.'''
+        def metric(name, mtype, help_text, samples):
+            yield '# HELP {0} {1}'.format(name, help_text)
+            yield '# TYPE {0} {1}'.format(name, mtype)
+            for suffix, labels, value in samples:
+                yield '{0}{1}{2} {3}'.format(name, suffix, labels, value)
+
+        endpoints = HttpMetrics.endpoints.items()
+
+        for line in metric('qjira_http_requests_total', 'counter',
+                           'Jira REST requests by endpoint and status code.',
+                           [('', _labels(endpoint=e, code=c), n)
+                            for e, s in endpoints for c, n in sorted(s['status_codes'].items())]):
+            yield line
+
+        for line in metric('qjira_http_response_bytes_total', 'counter',
+                           'Bytes received from Jira.',
+                           [('', _labels(endpoint=e), s['bytes']) for e, s in endpoints]):
+            yield line
+
+        def histogram(e, s):
+            cumulative = 0
+            for bound, n in zip(LATENCY_BUCKETS + (float('inf'),), s['latency_buckets']):
+                cumulative += n
+                le = '+Inf' if bound == float('inf') else _bucket_label(bound)
+                yield '_bucket', _labels(endpoint=e, le=le), cumulative
+            yield '_sum', _labels(endpoint=e), s['latency_sum']
+            yield '_count', _labels(endpoint=e), s['requests']
+
+        for line in metric('qjira_http_request_duration_seconds', 'histogram',
+                           'Latency of Jira REST requests.',
+                           [sample for e, s in endpoints for sample in histogram(e, s)]):
+            yield line
+
+        for name, key, help_text in (
+                ('qjira_http_retries_total', 'retries', 'Jira REST requests retried.'),
+                ('qjira_http_rate_limit_waits_total', 'rate_limit_waits', 'Waits for Jira rate limiting (429).'),
+                ('qjira_http_rate_limit_wait_seconds_total', 'rate_limit_wait_seconds', 'Seconds waited for Jira rate limiting.'),
+                ('qjira_http_cache_hits_total', 'cache_hits', 'Requests answered without calling Jira.')):
+            for line in metric(name, 'counter', help_text,
+                               [('', _labels(endpoint=e), s[key]) for e, s in endpoints]):
+                yield line
+
+        for line in metric('qjira_last_run_timestamp_seconds', 'gauge',
+                           'Time the qjira run finished.',
+                           [('', '', int(timestamp or time.time()))]):
+            yield line
+
+    @staticmethod
+    def write_textfile(filepath):
+        '''Write the Prometheus textfile atomically, the node_exporter
+        textfile collector must never see a partial file.'''
+        tmp_path = '{0}.{1}.tmp'.format(filepath, os.getpid())
+        with open(tmp_path, 'w') as f:
+            for line in HttpMetrics.prometheus_lines():
+                f.write(line)
+                f.write('\n')
+        if os.name != 'posix' and os.path.exists(filepath):
+            os.remove(filepath)
+        os.rename(tmp_path, filepath)
@@ -0,0 +1,122 @@
+'''Compact rows for the flattened pipeline.
+
+A flattened issue has dozens to hundreds of columns and most issues of a
+query share the same columns. A Row keeps only a list of values and a
+reference to a RowSchema, the shared tuple of column names with their
+index. Rows with equal columns share one schema, so a column name costs
+memory once per schema instead of once per row.
+'''
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+
+# schemas are shared through this table, beyond the limit new column
+# sets get a private schema
+MAX_SCHEMAS = 4096
+
+_schemas = {}
+
+
+class RowSchema(object):
+    '''Column names of a row and the index of each.'''
+
+    __slots__ = ('keys', 'index', '_extended')
+
+    def __init__(self, keys):
+        self.keys = keys
+        self.index = {k: i for i, k in enumerate(keys)}
+        self._extended = {}
+
+    @staticmethod
+    def get(keys):
+        '''Return the shared schema of column tuple {keys}.'''
+        schema = _schemas.get(keys)
+        if schema is None:
+            schema = RowSchema(keys)
+            if len(_schemas) < MAX_SCHEMAS:
+                _schemas[keys] = schema
+        return schema
+
+    def extend(self, key):
+        '''Return the schema with column {key} appended.'''
+        schema = self._extended.get(key)
+        if schema is None:
+            schema = self._extended[key] = RowSchema.get(self.keys + (key,))
+        return schema
+
+
+def clear_schemas():
+    '''Drop the shared schemas, rows keep their own.'''
+    _schemas.clear()
+
+
+class Row(MutableMapping):
+    '''A dict-like row of column values.'''
+
+    __slots__ = ('_schema', '_values')
+
+    def __init__(self, schema, values):
+        self._schema = schema
+        self._values = values
+
+    @classmethod
+    def from_items(cls, items):
+        '''Return a row of the (key, value) pairs {items}, the last value of a
+        repeated key wins like in a dict.'''
+        keys = []
+        values = []
+        for k, v in items:
+            keys.append(k)
+            values.append(v)
+        schema = RowSchema.get(tuple(keys))
+        if len(schema.index) != len(keys):
+            d = dict(zip(keys, values))
+            schema = RowSchema.get(tuple(d.keys()))
+            values = list(d.values())
+        return cls(schema, values)
+
+    def __getitem__(self, key):
+        return self._values[self._schema.index[key]]
+
+    def get(self, key, default=None):
+        idx = self._schema.index.get(key)
+        return default if idx is None else self._values[idx]
+
+    def __contains__(self, key):
+        return key in self._schema.index
+
+    def __setitem__(self, key, value):
+        idx = self._schema.index.get(key)
+        if idx is None:
+            self._schema = self._schema.extend(key)
+            self._values.append(value)
+        else:
+            self._values[idx] = value
+
+    def __delitem__(self, key):
+        idx = self._schema.index[key]
+        keys = self._schema.keys
+        self._schema = RowSchema.get(keys[:idx] + keys[idx + 1:])
+        del self._values[idx]
+
+    def __iter__(self):
+        return iter(self._schema.keys)
+
+    def __len__(self):
+        return len(self._values)
+
+    def keys(self):
+        return list(self._schema.keys)
+
+    def values(self):
+        return list(self._values)
+
+    def items(self):
+        return list(zip(self._schema.keys, self._values))
+
+    def copy(self):
+        return Row(self._schema, list(self._values))
+
+    def __repr__(self):
+        return 'Row({0!r})'.format(dict(self.items()))
@@ -0,0 +1,111 @@
+'''Record Jira responses to a snapshot archive, or replay them from one
+without any network access.
+
+The archive is a deflate-compressed zip: one member per response plus an
+index.json mapping each request (path and query, without the base URL)
+to its member, so a snapshot replays against any --base URL.
+'''
+import json
+import time
+import hashlib
+import zipfile
+import threading
+
+try:
+    from urlparse import urlparse
+except ImportError:
+    from urllib.parse import urlparse
+
+INDEX_MEMBER = 'index.json'
+
+FORMAT_VERSION = 1
+
+def request_key(url):
+    '''Return the archive key of {url}: its path and query string.'''
+    parts = urlparse(url)
+    return parts.path + ('?' + parts.query if parts.query else '')
+
+def _member_name(key):
+    return 'responses/{0}.json'.format(hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+
+class Snapshot:
+    '''Simple response recorder'''
+
+    # globals
+    mode = None
+    filepath = None
+    _archive = None
+    _index = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def record(filepath):
+        '''Start recording every response into a new archive {filepath}.'''
+        Snapshot.close()
+        Snapshot._archive = zipfile.ZipFile(filepath, 'w', zipfile.ZIP_DEFLATED)
+        Snapshot._index = {}
+        Snapshot.filepath = filepath
+        Snapshot.mode = 'record'
+
+    @staticmethod
+    def replay(filepath):
+        '''Start answering requests from the archive {filepath}.'''
+        Snapshot.close()
+        archive = zipfile.ZipFile(filepath, 'r')
+        index = json.loads(archive.read(INDEX_MEMBER).decode('utf-8'))
+        if index.get('version') != FORMAT_VERSION:
+            archive.close()
+            raise ValueError('{0} has unsupported snapshot version {1}'.format(
+                filepath, index.get('version')))
+        Snapshot._archive = archive
+        Snapshot._index = index['requests']
+        Snapshot.filepath = filepath
+        Snapshot.mode = 'replay'
+
+    @staticmethod
+    def close():
+        '''Finish recording or replaying, writing the index of a recording.'''
+        with Snapshot._lock:
+            if Snapshot._archive is None:
+                return
+            if Snapshot.mode == 'record':
+                index = {'version': FORMAT_VERSION,
+                         'created': int(time.time()),
+                         'requests': Snapshot._index}
+                Snapshot._archive.writestr(INDEX_MEMBER, json.dumps(index, sort_keys=True, indent=1))
+            Snapshot._archive.close()
+            Snapshot._archive = None
+            Snapshot._index = {}
+            Snapshot.filepath = None
+            Snapshot.mode = None
+
+    @staticmethod
+    def is_recording():
+        return Snapshot.mode == 'record'
+
+    @staticmethod
+    def is_replaying():
+        return Snapshot.mode == 'replay'
+
+    @staticmethod
+    def save(url, endpoint, payload):
+        '''Store the decoded JSON {payload} of {url}.'''
+        key = request_key(url)
+        with Snapshot._lock:
+            if key in Snapshot._index:
+                return
+            member = _member_name(key)
+            Snapshot._archive.writestr(member, json.dumps(payload))
+            Snapshot._index[key] = {'member': member, 'endpoint': endpoint}
+
+    @staticmethod
+    def load(url):
+        '''Return the recorded JSON payload of {url}.'''
+        key = request_key(url)
+        entry = Snapshot._index.get(key)
+        if entry is None:
+            raise KeyError('{0} was not recorded in snapshot {1}'.format(key, Snapshot.filepath))
+        with Snapshot._lock:
+            data = Snapshot._archive.read(entry['member'])
+        return json.loads(data.decode('utf-8'))
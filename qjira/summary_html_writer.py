@@ -2,6 +2,7 @@
 from datetime import datetime
 
 from .text_utils import _encode
+from .timing import Timing
 
 TABLE_STYLE = 'style="border-width: 1px; width: 100%; border-color: #DADADA; border-style: solid; font-family: "Helvetica Neue",Helvetica,Arial,Lucida Grande,sans-serif;"'
 
@@ -63,14 +64,15 @@ def write(f, command, encoding, *args, **kwargs):
             header_done = True
             _write_body_start(f)
 
-        # perform unicode conversion 
-        unicode_row = {k:_encode(encoding, command.field_formatter(k)(v)) for k, v in row.items()}
+        with Timing.stage('writer', count=1):
+            # perform unicode conversion 
+            unicode_row = {k:_encode(encoding, command.field_formatter(k)(v)) for k, v in row.items()}
 
-        # begin rows, each grouping with table is marked with _row_header: True
-        if '_row_header' in row and row['_row_header'] is True:
-            _write_row_header(f, unicode_row)
-        else:
-            _write_row_content(f, fieldnames, unicode_row)
+            # begin rows, each grouping with table is marked with _row_header: True
+            if '_row_header' in row and row['_row_header'] is True:
+                _write_row_header(f, unicode_row)
+            else:
+                _write_row_content(f, fieldnames, unicode_row)
 
     _write_body_end(f)
     _write_table_end(f)
@@ -17,6 +17,21 @@ from . import worklog_tests
 from . import dataprocessor_tests
 from . import main_tests
 from . import dump_tests
+from . import startup_tests
+from . import credential_store_tests
+from . import timing_tests
+from . import metrics_tests
+from . import benchmark_tests
+from . import jira_server_tests
+from . import snapshot_tests
+from . import issue_store_tests
+from . import row_tests
+from . import cycle_stats_tests
+from . import timeinstatus_tests
+from . import flow_tests
+from . import forecast_tests
+from . import worklog_store_tests
+from . import external_sort_tests
 
 def suite():
     suite = unittest.TestSuite()
@@ -34,6 +49,21 @@ def suite():
     suite.addTest(unittest.defaultTestLoader.loadTestsFromModule(worklog_tests))
     suite.addTest(unittest.defaultTestLoader.loadTestsFromModule(main_tests))
     suite.addTest(unittest.defaultTestLoader.loadTestsFromModule(dump_tests))
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromModule(startup_tests))
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromModule(credential_store_tests))
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromModule(timing_tests))
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromModule(metrics_tests))
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromModule(benchmark_tests))
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromModule(jira_server_tests))
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromModule(snapshot_tests))
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromModule(issue_store_tests))
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromModule(row_tests))
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromModule(cycle_stats_tests))
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromModule(timeinstatus_tests))
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromModule(flow_tests))
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromModule(forecast_tests))
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromModule(worklog_store_tests))
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromModule(external_sort_tests))
     
     return suite
 
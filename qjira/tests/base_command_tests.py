@@ -8,7 +8,10 @@ import unittest
 #except ImportError:
 #    from contextlib2 import redirect_stdout
 
+import datetime
+
 from qjira.config import settings
+from qjira.commands.base_command import sort_key
 
 #from . import test_data
 from . import test_util
@@ -139,3 +142,49 @@ class BaseCommandHeaderWithFormatterTestCase(test_util.BaseTestCase, unittest.Te
     def test_header_with_format(self):
         fn = self.command.field_formatter('timeoriginalestimate')
         self.assertEqual(fn(8*60*60), u'1.00')
+
+class BaseCommandSortTestCase(test_util.BaseTestCase, unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        if not settings.has_section('test'):
+            settings.add_section('test')
+        settings.set('test', 'headers', 'summary')
+
+    def setUp(self):
+        self.rows = [
+            {'name': 'b', 'day': datetime.date(2018, 2, 1)},
+            {'name': 'a', 'day': None},
+            {'name': None, 'day': datetime.date(2018, 2, 1)},
+            {'name': 'c', 'day': datetime.date(2018, 1, 1)},
+        ]
+        self.key = sort_key(('day', datetime.date.max), 'name')
+
+    def _command(self, limit=None):
+        return test_util.TestCommand(project=['Test'], base_url='http://localhost:3000', limit=limit)
+
+    def test_sort_key_defaults(self):
+        self.assertEqual(self.key(self.rows[1]), (datetime.date.max, 'a'))
+        self.assertEqual(self.key(self.rows[2]), (datetime.date(2018, 2, 1), ''))
+
+    def test_sort_rows(self):
+        rows = self._command().sort_rows(self.rows, self.key)
+        self.assertEqual([r['name'] for r in rows], ['c', None, 'b', 'a'])
+
+    def test_sort_rows_limit(self):
+        rows = self._command(limit=2).sort_rows(iter(self.rows), self.key)
+        self.assertEqual([r['name'] for r in rows], ['c', None])
+
+    def test_sort_rows_limit_last(self):
+        rows = self._command(limit=2).sort_rows(iter(self.rows), self.key, last=True)
+        self.assertEqual([r['name'] for r in rows], ['b', 'a'])
+
+    def test_sort_rows_spills_above_sort_buffer_rows(self):
+        buffer_rows = settings.get('jira', 'sort_buffer_rows')
+        settings.set('jira', 'sort_buffer_rows', '2')
+        try:
+            rows = self._command().sort_rows(iter(self.rows), self.key)
+        finally:
+            settings.set('jira', 'sort_buffer_rows', buffer_rows)
+        self.assertNotIsInstance(rows, list)
+        self.assertEqual([r['name'] for r in rows], ['c', None, 'b', 'a'])
@@ -0,0 +1,169 @@
+"""End-to-end benchmark of the qjira commands against synthetic data.
+
+Each command runs through its writer with qjira.jira._get_json replaced
+by the MockJira hook, answering from SyntheticJira. With --server the
+requests go over HTTP to a local JiraServer instead, exercising the real
+client code path. Reports throughput, peak memory (tracemalloc) and the
+time spent per processing stage.
+
+Usage: python -m qjira.tests.benchmark -n 1000 -n 10000 -c velocity
+       python -m qjira.tests.benchmark -n 1000 --server --latency 0.05
+"""
+import sys
+import json
+import argparse
+import timeit
+from collections import OrderedDict
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from qjira.commands import (VelocityCommand, CycleTimeCommand, SummaryCommand,
+                            TechDebtCommand, BacklogCommand, WorklogCommand,
+                            JQLCommand)
+from qjira.timing import Timing
+
+from . import test_util
+from .synthetic_data import SyntheticJira
+from .jira_server import JiraServer
+
+BASE_URL = 'http://localhost:3000'
+
+COMMANDS = OrderedDict([
+    ('velocity', lambda source, **kw: VelocityCommand(project=source.projects, **kw)),
+    ('cycletime', lambda source, **kw: CycleTimeCommand(project=source.projects, **kw)),
+    ('summary', lambda source, **kw: SummaryCommand(project=source.projects, **kw)),
+    ('debt', lambda source, **kw: TechDebtCommand(project=source.projects, **kw)),
+    ('backlog', lambda source, **kw: BacklogCommand(project=source.projects, **kw)),
+    ('worklog', lambda source, **kw: WorklogCommand(author=source.authors[:5], **kw)),
+    ('jql', lambda source, **kw: JQLCommand(jql='project in ({0})'.format(','.join(source.projects)), **kw)),
+])
+
+class CountingSink(object):
+    '''Output file counting the characters written.'''
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, s):
+        self.size += len(s)
+
+class SyntheticJiraHook(test_util.MockJira):
+    '''Installs the MockJira hook, answering every url from {source}.'''
+
+    def __init__(self, source):
+        self._source = source
+
+    def get_json(self, url, *args, **kwargs):
+        self._actual_url = url
+        # keep payload generation out of the measured stages
+        with Timing.stage('synthetic_source', count=1):
+            return self._source.get_json(url)
+
+def run_command(name, source, measure_memory=True, server=None):
+    '''Run command {name} end-to-end, return its measurements.
+
+    Requests go to the running JiraServer {server} when given.'''
+    hook = None if server else SyntheticJiraHook(source)
+    if hook:
+        hook.setup_mock_jira()
+    Timing.reset(enabled=True)
+    if measure_memory and tracemalloc:
+        tracemalloc.start()
+    try:
+        started = timeit.default_timer()
+        if server:
+            command = COMMANDS[name](source, base_url=server.base_url, username='bench', password='bench')
+        else:
+            command = COMMANDS[name](source, base_url=BASE_URL)
+        sink = CountingSink()
+        command.writer.write(sink, command, 'UTF-8', delimiter=',')
+        elapsed = timeit.default_timer() - started
+        peak = tracemalloc.get_traced_memory()[1] if measure_memory and tracemalloc else None
+    finally:
+        if measure_memory and tracemalloc:
+            tracemalloc.stop()
+        if hook:
+            hook.teardown_mock_jira()
+    stages = Timing.as_dict()['stages']
+    Timing.reset()
+    return OrderedDict([
+        ('command', name),
+        ('issues', source.issues),
+        ('seconds', elapsed),
+        ('issues_per_second', source.issues / elapsed if elapsed else 0.0),
+        ('peak_memory_mb', peak / 1024.0 / 1024.0 if peak is not None else None),
+        ('output_chars', sink.size),
+        ('stages', stages)
+    ])
+
+def write_report(results, f):
+    f.write('{0:<10} {1:>9} {2:>9} {3:>10} {4:>9}  {5}\n'.format(
+        'Command', 'Issues', 'Seconds', 'Issues/s', 'Peak MB', 'Slowest stages (s)'))
+    for r in results:
+        slowest = sorted(r['stages'].items(), key=lambda x: x[1]['wall'], reverse=True)[:3]
+        f.write('{0:<10} {1:>9} {2:>9.2f} {3:>10.0f} {4:>9}  {5}\n'.format(
+            r['command'], r['issues'], r['seconds'], r['issues_per_second'],
+            '-' if r['peak_memory_mb'] is None else '{0:.1f}'.format(r['peak_memory_mb']),
+            ', '.join('{0}={1:.2f}'.format(k, v['wall']) for k, v in slowest)))
+
+def create_parser():
+    parser = argparse.ArgumentParser(
+        prog='qjira.tests.benchmark',
+        description='Benchmark qjira commands against synthetic Jira data')
+    parser.add_argument('-n', '--issues', type=int, action='append',
+        help='Number of issues, repeat for several sizes [default: 1000]')
+    parser.add_argument('-c', '--command', action='append', choices=list(COMMANDS.keys()),
+        help='Command to run, repeat for several [default: all]')
+    parser.add_argument('--projects', type=int, default=4)
+    parser.add_argument('--sprints-per-issue', type=int, default=2)
+    parser.add_argument('--changelog-length', type=int, default=6)
+    parser.add_argument('--worklogs', type=int, default=3)
+    parser.add_argument('--custom-fields', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', action='store_true',
+        help='Skip tracemalloc, it slows down the run')
+    parser.add_argument('--json', metavar='FILENAME',
+        help='Write all measurements as JSON to FILENAME')
+    parser.add_argument('--server', action='store_true',
+        help='Fetch over HTTP from a local stand-in Jira server')
+    parser.add_argument('--latency', type=float, default=0.0,
+        help='Server latency in seconds, with --server')
+    parser.add_argument('--jitter', type=float, default=0.0,
+        help='Server latency jitter in seconds, with --server')
+    parser.add_argument('--throttle-every', type=int, default=0, metavar='N',
+        help='Server answers every Nth request with 429, with --server')
+    return parser
+
+def main(args=None):
+    my_args = create_parser().parse_args(args)
+    results = []
+    for issues in my_args.issues or [1000]:
+        source = SyntheticJira(issues=issues,
+                               projects=my_args.projects,
+                               sprints_per_issue=my_args.sprints_per_issue,
+                               changelog_length=my_args.changelog_length,
+                               worklogs=my_args.worklogs,
+                               custom_fields=my_args.custom_fields,
+                               seed=my_args.seed)
+        server = None
+        if my_args.server:
+            server = JiraServer(source, latency=my_args.latency, jitter=my_args.jitter,
+                                throttle_every=my_args.throttle_every, retry_after=0).start()
+        try:
+            for name in my_args.command or list(COMMANDS.keys()):
+                results.append(run_command(name, source, measure_memory=not my_args.no_memory,
+                                           server=server))
+        finally:
+            if server:
+                server.stop()
+    write_report(results, sys.stdout)
+    if my_args.json:
+        with open(my_args.json, 'w') as f:
+            json.dump(results, f, indent=4, separators=(',', ': '))
+    return results
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
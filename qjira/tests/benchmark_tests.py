@@ -0,0 +1,45 @@
+import unittest
+
+import qjira.jira as _jira
+
+from . import benchmark
+from .synthetic_data import SyntheticJira
+
+class SyntheticJiraTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.source = SyntheticJira(issues=120, sprints_per_issue=3, worklogs=2, custom_fields=4)
+
+    def test_pages(self):
+        pages = list(self.source.pages(max_results=50))
+        self.assertEqual([50, 50, 20], [len(p['issues']) for p in pages])
+        self.assertEqual(120, pages[0]['total'])
+
+    def test_issues_are_reproducible(self):
+        self.assertEqual(self.source.issue(7), SyntheticJira(issues=120, sprints_per_issue=3,
+                                                             worklogs=2, custom_fields=4).issue(7))
+        self.assertNotEqual(self.source.issue(7), self.source.issue(8))
+
+    def test_issue_shape(self):
+        data = _jira._as_data(self.source.issue(3))
+        self.assertEqual(3, len(data['sprint']))
+        self.assertEqual('Done', data['status']['name'])
+        self.assertIn('customfield_20003', data)
+        self.assertIn('_changelog', data)
+
+    def test_get_json_routes_urls(self):
+        page = self.source.get_json('http://localhost:3000/rest/api/2/search?startAt=100&maxResults=50')
+        self.assertEqual(20, len(page['issues']))
+        worklog = self.source.get_json('http://localhost:3000/rest/api/2/issue/BENCH1-2/worklog')
+        self.assertEqual(2, len(worklog['worklogs']))
+
+class BenchmarkTestCase(unittest.TestCase):
+
+    def test_run_all_commands(self):
+        original_get_json = _jira._get_json
+        source = SyntheticJira(issues=20)
+        for name in benchmark.COMMANDS:
+            result = benchmark.run_command(name, source, measure_memory=False)
+            self.assertLess(0, result['output_chars'], msg=name)
+            self.assertIn('post_process', result['stages'], msg=name)
+        self.assertIs(original_get_json, _jira._get_json)
@@ -0,0 +1,120 @@
+import os
+import stat
+import time
+import json
+import shutil
+import tempfile
+import unittest
+import keyring
+
+import qjira.credential_store as creds
+from qjira.config import settings
+
+from .main_tests import TestableKeyring
+
+class UnavailableKeyring(TestableKeyring):
+    '''Keyring backend failing like a missing D-Bus session.'''
+
+    def get_password(self, servicename, username):
+        raise AssertionError('keyring must not be used')
+
+    set_password = delete_password = get_password
+
+class CredentialSettingsMixin(object):
+    '''Restores the [credentials] settings changed by a test.'''
+
+    def save_settings(self):
+        self._settings = dict(settings.items('credentials'))
+
+    def restore_settings(self):
+        for k, v in self._settings.items():
+            settings.set('credentials', k, v)
+
+class CredentialCacheTestCase(CredentialSettingsMixin, unittest.TestCase):
+
+    def setUp(self):
+        self.save_settings()
+        self._dir = tempfile.mkdtemp()
+        self._cache_file = os.path.join(self._dir, 'credentials')
+        self._original_keyring = keyring.get_keyring()
+        keyring.set_keyring(TestableKeyring())
+        keyring.get_keyring().entries['qjira-sp_usera'] = 'xyzzy'
+        settings.set('credentials', 'cache_ttl', '60')
+        settings.set('credentials', 'cache_file', self._cache_file)
+
+    def tearDown(self):
+        self.restore_settings()
+        keyring.set_keyring(self._original_keyring)
+        shutil.rmtree(self._dir)
+
+    def test_cache_file_owner_only(self):
+        creds.get_credentials('usera', None)
+        mode = stat.S_IMODE(os.stat(self._cache_file).st_mode)
+        self.assertEqual(0o600, mode)
+        with open(self._cache_file) as f:
+            entries = json.load(f)
+        self.assertEqual(['usera'], list(entries.keys()))
+        self.assertEqual('xyzzy', entries['usera']['password'])
+        self.assertLess(time.time(), entries['usera']['expires'])
+
+    def test_cached_password_skips_keyring(self):
+        creds.get_credentials('usera', None)
+        keyring.set_keyring(UnavailableKeyring())
+        self.assertEqual(('usera', 'xyzzy'), creds.get_credentials('usera', None))
+
+    def test_expired_password_ignored(self):
+        creds.cache_password('usera', 'stale')
+        with open(self._cache_file) as f:
+            entries = json.load(f)
+        entries['usera']['expires'] = time.time() - 1
+        with open(self._cache_file, 'w') as f:
+            json.dump(entries, f)
+        self.assertIsNone(creds.get_cached_password('usera'))
+        self.assertEqual(('usera', 'xyzzy'), creds.get_credentials('usera', None))
+
+    @unittest.skipIf(os.name != 'posix', 'file permissions are POSIX only')
+    def test_readable_cache_ignored(self):
+        creds.cache_password('usera', 'xyzzy')
+        os.chmod(self._cache_file, 0o644)
+        self.assertIsNone(creds.get_cached_password('usera'))
+
+    def test_clear_credentials_invalidates_cache(self):
+        creds.get_credentials('usera', None)
+        creds.clear_credentials('usera')
+        self.assertIsNone(creds.get_cached_password('usera'))
+        self.assertNotIn('qjira-sp_usera', keyring.get_keyring().entries)
+
+    def test_cache_disabled(self):
+        settings.set('credentials', 'cache_ttl', '0')
+        creds.get_credentials('usera', None)
+        self.assertFalse(os.path.exists(self._cache_file))
+
+class ApiTokenTestCase(CredentialSettingsMixin, unittest.TestCase):
+
+    def setUp(self):
+        self.save_settings()
+        self._dir = tempfile.mkdtemp()
+        self._cache_file = os.path.join(self._dir, 'credentials')
+        self._original_keyring = keyring.get_keyring()
+        keyring.set_keyring(UnavailableKeyring())
+        settings.set('credentials', 'cache_ttl', '60')
+        settings.set('credentials', 'cache_file', self._cache_file)
+
+    def tearDown(self):
+        self.restore_settings()
+        keyring.set_keyring(self._original_keyring)
+        shutil.rmtree(self._dir)
+
+    def test_api_token_skips_keyring(self):
+        self.assertEqual(('usera', 'token'),
+                         creds.get_credentials('usera', None, api_token='token'))
+        # the token is not cached either
+        self.assertFalse(os.path.exists(self._cache_file))
+
+    def test_clear_api_token_skips_keyring(self):
+        creds.cache_password('usera', 'stale')
+        creds.cache_password('userb', 'other')
+        creds.clear_credentials('usera', api_token='token')
+        with open(self._cache_file) as f:
+            entries = json.load(f)
+        self.assertEqual(['userb'], list(entries.keys()))
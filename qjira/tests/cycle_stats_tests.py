@@ -0,0 +1,68 @@
+import datetime
+import unittest
+
+import qjira.cycle_stats as cycle_stats
+from qjira.cycle_stats import CycleStatistics, summary_columns
+from qjira.commands import CycleTimeCommand
+
+def _record(issuetype, days, begin=datetime.date(2017, 1, 2)):
+    return {'issuetype_name': issuetype, 'cycle_begin': begin,
+            'cycle_end': begin + datetime.timedelta(days=days)}
+
+RECORDS = [_record('Story', d) for d in (1, 2, 3, 4, 10)] + \
+          [_record('Bug', d) for d in (0, 40)] + \
+          [{'issuetype_name': 'Story', 'cycle_end': datetime.date(2017, 1, 2)}]
+
+class CycleStatisticsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._use_numpy = cycle_stats.use_numpy
+
+    def tearDown(self):
+        cycle_stats.use_numpy = self._use_numpy
+
+    def _rows(self):
+        return CycleStatistics(group_by=['issuetype_name'], buckets=[0, 3, 8]).extend(RECORDS).rows()
+
+    def _check(self, rows):
+        self.assertEqual(['Story', 'Bug'], [r['issuetype_name'] for r in rows])
+        story = rows[0]
+        self.assertEqual(5, story['count'])
+        self.assertEqual(4.0, story['mean'])
+        self.assertEqual(3.0, story['p50'])
+        self.assertEqual(6.4, story['p85'])
+        self.assertEqual(8.8, story['p95'])
+        self.assertEqual([2, 2, 1], [story['days_0_3'], story['days_3_8'], story['days_8_plus']])
+        self.assertEqual([1, 0, 1], [rows[1]['days_0_3'], rows[1]['days_3_8'], rows[1]['days_8_plus']])
+
+    def test_python(self):
+        cycle_stats.use_numpy = False
+        self._check(self._rows())
+
+    @unittest.skipIf(cycle_stats._numpy() is None, 'numpy is not installed')
+    def test_numpy(self):
+        self._check(self._rows())
+
+    def test_empty(self):
+        self.assertEqual([], CycleStatistics().rows())
+
+    def test_summary_columns(self):
+        self.assertEqual(['fixVersions_0_name', 'count', 'mean', 'p50', 'p85', 'p95', 'days_0_1', 'days_1_plus'],
+                         summary_columns(['fixVersions_0_name'], buckets=[0, 1]))
+
+class CycleTimeStatsTestCase(unittest.TestCase):
+
+    def test_post_process(self):
+        command = CycleTimeCommand(base_url='localhost:3000', project=['TEST'], stats=True, group_by=['issuetype_name'])
+        rows = []
+        for n, (issuetype, days) in enumerate([('Story', 2), ('Story', 4), ('Bug', 1)]):
+            rows.append({'issue_key': 'TEST-{0}'.format(n), 'issuetype_name': issuetype,
+                         'transitions_name': 'from_Open_to_InProgress',
+                         'transitions_change_date': datetime.date(2017, 1, 2)})
+            rows.append({'issue_key': 'TEST-{0}'.format(n), 'issuetype_name': issuetype,
+                         'transitions_name': 'from_InProgress_to_Done',
+                         'transitions_change_date': datetime.date(2017, 1, 2 + days)})
+        data = command.post_process(iter(rows))
+        self.assertEqual(2, len(data))
+        self.assertEqual({'issuetype_name': 'Story', 'count': 2, 'mean': 3.0}, {k: data[0][k] for k in ('issuetype_name', 'count', 'mean')})
+        self.assertEqual(['issuetype_name', 'count', 'mean', 'p50', 'p85', 'p95'], command.header_keys[:6])
@@ -72,3 +72,54 @@ class TestCycleTime(test_util.MockJira, unittest.TestCase):
             'cycle_end': datetime.date(2017,1,31)
         }, data[0])
     
+
+    def test_rework_counted(self):
+        rows = [
+            {'issue_key': 'TEST-1', 'transitions_name': 'from_Ready_to_InProgress', 'transitions_change_date': datetime.date(2017, 1, 3)},
+            {'issue_key': 'TEST-1', 'transitions_name': 'from_InReview_to_InProgress', 'transitions_change_date': datetime.date(2017, 1, 5)},
+            {'issue_key': 'TEST-1', 'transitions_name': 'from_InReview_to_Done', 'transitions_change_date': datetime.date(2017, 1, 9)},
+            {'issue_key': 'TEST-1', 'transitions_name': 'from_Ready_to_InProgress', 'transitions_change_date': datetime.date(2017, 1, 2)},
+        ]
+        data = self.command_under_test.post_process(iter(rows))
+        self.assertDictContainsSubset({
+            'cycle_begin': datetime.date(2017, 1, 2),
+            'cycle_end': datetime.date(2017, 1, 9),
+            'count_cycle_begin': 3
+        }, data[0])
+        self.assertIn('count_cycle_begin', self.command_under_test.header_keys)
+
+    def test_matching_rules_memoized(self):
+        rules = self.command_under_test._matching_rules('from_Open_to_InProgress')
+        self.assertEqual([('cycle_begin', 'lt', 'count_cycle_begin')], list(rules))
+        self.assertIs(rules, self.command_under_test._matching_rules('from_Open_to_InProgress'))
+        self.assertEqual((), self.command_under_test._matching_rules('from_Open_to_Ready'))
+
+class TestCycleTimeOrder(unittest.TestCase):
+
+    def _rows(self, consumed):
+        for key, begin, end in [('TEST-2', 5, 9), ('TEST-1', 2, 4), ('TEST-3', 1, 12)]:
+            consumed.append(key)
+            yield {'issue_key': key, 'transitions_name': 'from_Open_to_InProgress',
+                   'transitions_change_date': datetime.date(2017, 1, begin)}
+            yield {'issue_key': key, 'transitions_name': 'from_InProgress_to_Done',
+                   'transitions_change_date': datetime.date(2017, 1, end)}
+
+    def test_sorted(self):
+        command = CycleTimeCommand(base_url='localhost:3000', project=['TEST'])
+        data = command.post_process(self._rows([]))
+        self.assertEqual(['TEST-3', 'TEST-1', 'TEST-2'], [r['issue_key'] for r in data])
+
+    def test_streaming(self):
+        command = CycleTimeCommand(base_url='localhost:3000', project=['TEST'], order='streaming')
+        consumed = []
+        records = command.post_process(self._rows(consumed))
+        first = next(records)
+        self.assertEqual('TEST-2', first['issue_key'])
+        self.assertEqual(datetime.date(2017, 1, 9), first['cycle_end'])
+        # emitted once the next issue starts, later issues not read yet
+        self.assertEqual(['TEST-2', 'TEST-1'], consumed)
+        self.assertEqual(['TEST-1', 'TEST-3'], [r['issue_key'] for r in records])
+
+    def test_unknown_order(self):
+        with self.assertRaises(ValueError):
+            CycleTimeCommand(base_url='localhost:3000', project=['TEST'], order='random')
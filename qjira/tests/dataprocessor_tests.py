@@ -5,6 +5,7 @@ import io
 import json
 
 import qjira.dataprocessor as dp
+import qjira.text_utils as text_utils
 
 from . import test_data
 
@@ -15,3 +16,85 @@ class TestDataProcessor(unittest.TestCase):
         [self.assertFalse(type(v)==list, msg='flattened data contains list') for v in row.values()]
         [self.assertFalse(type(v)==dict, msg='flattened data contains dict') for v in row.values()]
         
+
+    def test_pivot_overlays_share_issue(self):
+        issue = {'issue_key': 'TEST-1', 'summary': 'pivoted', 'status': {'name': 'Done'}}
+        overlays = list(dp.pivot_overlays(issue, 'sprint', [{'id': '1'}, {'id': '2'}]))
+        self.assertEqual(2, len(overlays))
+        self.assertEqual({'id': '2'}, overlays[1]['sprint'])
+        self.assertIs(issue, overlays[1].base)
+        self.assertEqual(dict(issue, sprint={'id': '1'}), dict(overlays[0]))
+
+    def test_pivot_overlay_flattens_issue_once(self):
+        calls = []
+        def flatten(data):
+            calls.append(data)
+            return dp.flatten_json_struct(data)
+        issue = {'issue_key': 'TEST-1', 'status': {'name': 'Done'}}
+        rows = [dict(o.flatten(flatten)) for o in dp.pivot_overlays(issue, 'fixVersions', [{'name': '1.0'}, {'name': '2.0'}])]
+        self.assertEqual({'issue_key': 'TEST-1', 'status_name': 'Done', 'fixVersions_name': '2.0'}, rows[1])
+        # one base and two pivot flattenings
+        self.assertEqual(3, len(calls))
+
+    def test_flattened_strings_are_shared(self):
+        first = dict(dp.flatten_json_struct({'status': {'name': ''.join(['In ', 'Progress'])}}))
+        second = dict(dp.flatten_json_struct({'status': {'name': ''.join(['In', ' Progress'])}}))
+        self.assertIs(first['status_name'], second['status_name'])
+        self.assertIs(list(first.keys())[0], list(second.keys())[0])
+
+    def test_one_off_strings_are_not_interned(self):
+        summary = ''.join(['Fix ', 'the ', 'login ', 'page'])
+        row = dict(dp.flatten_json_struct({'summary': summary, 'issue_key': 'TEST-1'}))
+        self.assertIs(summary, row['summary'])
+        self.assertNotIn(summary, text_utils._intern_table)
+
+class TestTransitions(unittest.TestCase):
+
+    def setUp(self):
+        self.issue = {'_changelog': {'histories': [
+            {'created': '2018-01-03T09:00:00.000-0600',
+             'items': [{'field': 'status', 'fromString': 'In Progress', 'toString': 'Done'}]},
+            {'created': '2018-01-02T09:00:00.000-0600',
+             'items': [{'field': 'status', 'fromString': None, 'toString': 'In Progress'},
+                       {'field': 'assignee', 'fromString': None, 'toString': 'alice'}]},
+        ]}}
+
+    def test_load_transitions(self):
+        dp.load_transitions(self.issue)
+        self.assertEqual([
+            {'name': 'from_New_to_InProgress', 'change_date': datetime.date(2018, 1, 2)},
+            {'name': 'from_InProgress_to_Done', 'change_date': datetime.date(2018, 1, 3)},
+        ], self.issue['transitions'])
+
+    def test_status_transitions(self):
+        self.assertEqual([
+            ('New', 'In Progress', datetime.date(2018, 1, 2)),
+            ('In Progress', 'Done', datetime.date(2018, 1, 3)),
+        ], dp.status_transitions(self.issue))
+
+class TestIntern(unittest.TestCase):
+
+    def setUp(self):
+        self._table_size = text_utils.INTERN_TABLE_SIZE
+
+    def tearDown(self):
+        text_utils.INTERN_TABLE_SIZE = self._table_size
+
+    def test_people_are_shared(self):
+        def flatten(name, display_name):
+            person = {'name': ''.join(name), 'displayName': ''.join(display_name)}
+            return dict(dp.flatten_json_struct({'assignee': person, 'reporter': dict(person)}))
+        first = flatten(['us', 'era'], ['User ', 'A'])
+        second = flatten(['use', 'ra'], ['User', ' A'])
+        for k in ('assignee_name', 'assignee_displayName', 'reporter_name', 'reporter_displayName'):
+            self.assertIs(first[k], second[k])
+
+    def test_long_strings_not_interned(self):
+        s = 'x' * (text_utils.INTERN_MAX_LENGTH + 1)
+        self.assertIsNot(text_utils._intern(s), text_utils._intern(''.join(['x'] * len(s))))
+
+    def test_table_is_bounded(self):
+        text_utils.INTERN_TABLE_SIZE = len(text_utils._intern_table)
+        a = ''.join(['not', ' yet', ' interned'])
+        self.assertIs(a, text_utils._intern(a))
+        self.assertNotIn(a, text_utils._intern_table)
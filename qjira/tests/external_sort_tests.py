@@ -0,0 +1,52 @@
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+from qjira import external_sort
+from qjira.row import Row
+from qjira.commands.base_command import sort_key
+
+class ExternalSortTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.key = sort_key(('day', datetime.date.max), 'issue_key')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _rows(self, n):
+        # descending days, every third row without a day
+        return [Row.from_items([('issue_key', 'TEST-{0}'.format(i)),
+                                ('day', None if i % 3 == 0 else datetime.date(2018, 1, 1) - datetime.timedelta(days=i))])
+                for i in range(n)]
+
+    def test_fits_in_memory(self):
+        rows = self._rows(10)
+        result = external_sort.sort(iter(rows), self.key, buffer_rows=20, tmpdir=self.tmpdir)
+        self.assertIsInstance(result, list)
+        self.assertEqual(result, sorted(rows, key=self.key))
+        self.assertEqual(os.listdir(self.tmpdir), [])
+
+    def test_spills_runs(self):
+        rows = self._rows(25)
+        expected = [r.items() for r in sorted(rows, key=self.key)]
+        result = external_sort.sort(iter(rows), self.key, buffer_rows=4, tmpdir=self.tmpdir)
+        self.assertNotIsInstance(result, list)
+        result = list(result)
+        self.assertEqual([r.items() for r in result], expected)
+        self.assertIsInstance(result[0], Row)
+
+    def test_spills_dicts_with_different_columns(self):
+        rows = [{'issue_key': 'TEST-{0}'.format(i % 5), 'n': i} for i in range(12)]
+        rows[3]['extra'] = True
+        result = list(external_sort.sort(rows, sort_key('issue_key'), buffer_rows=5, tmpdir=self.tmpdir))
+        self.assertEqual(result, sorted(rows, key=sort_key('issue_key')))
+        self.assertIsInstance(result[0], dict)
+
+    def test_equal_keys_keep_order(self):
+        rows = [{'issue_key': 'TEST-1', 'n': i} for i in range(7)]
+        result = external_sort.sort(rows, sort_key('issue_key'), buffer_rows=2, tmpdir=self.tmpdir)
+        self.assertEqual([r['n'] for r in result], list(range(7)))
@@ -0,0 +1,67 @@
+import datetime
+import unittest
+
+from qjira.commands import FlowCommand
+
+from . import test_util
+
+def _issue(key, created, *changes):
+    return {'key': key,
+            'fields': {'status': {'name': changes[-1][2] if changes else 'Open'}, 'created': created},
+            'changelog': {'histories': [
+                {'created': c, 'items': [{'field': 'status', 'fromString': f, 'toString': t}]}
+                for c, f, t in changes]}}
+
+ISSUES = [
+    _issue('TEST-1', '2018-01-01T09:00:00.000-0600',
+           ('2018-01-02T09:00:00.000-0600', 'Open', 'In Progress'),
+           ('2018-01-04T09:00:00.000-0600', 'In Progress', 'Done')),
+    _issue('TEST-2', '2018-01-02T09:00:00.000-0600',
+           ('2018-01-03T09:00:00.000-0600', 'Open', 'In Progress')),
+    _issue('TEST-3', '2018-01-05T09:00:00.000-0600'),
+]
+
+class TestFlow(test_util.MockJira, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_mock_jira()
+        self.json_response = {'total': len(ISSUES), 'issues': ISSUES}
+
+    def tearDown(self):
+        self.teardown_mock_jira()
+
+    def _counts(self, **kwargs):
+        command = FlowCommand(base_url='localhost:3000', project=['TEST'], **kwargs)
+        rows = list(command.execute())
+        return command, [(r['date'].day, r['Open'], r['InProgress'], r['Done']) for r in rows]
+
+    def test_daily_counts(self):
+        command, counts = self._counts(end_date=datetime.date(2018, 1, 6))
+        self.assertEqual(['date', 'Open', 'InProgress', 'Done'], command.header_keys)
+        self.assertEqual([
+            (1, 1, 0, 0),
+            (2, 1, 1, 0),
+            (3, 0, 2, 0),
+            (4, 0, 1, 1),
+            (5, 1, 1, 1),
+            (6, 1, 1, 1),
+        ], counts)
+
+    def test_range(self):
+        command, counts = self._counts(start_date=datetime.date(2018, 1, 3), end_date=datetime.date(2018, 1, 4))
+        self.assertEqual([(3, 0, 2, 0), (4, 0, 1, 1)], counts)
+
+    def test_request_fields(self):
+        command = FlowCommand(base_url='localhost:3000', project=['TEST'])
+        self.assertEqual(['status', 'created'], command.request_fields())
+
+    def test_null_status_names(self):
+        '''Jira sends "fromString": null for issues moved into a workflow.'''
+        self.json_response = {'total': 1, 'issues': [
+            _issue('TEST-4', '2018-01-01T09:00:00.000-0600',
+                   ('2018-01-02T09:00:00.000-0600', None, 'In Progress'))]}
+        command = FlowCommand(base_url='localhost:3000', project=['TEST'], end_date=datetime.date(2018, 1, 2))
+        rows = list(command.execute())
+        self.assertEqual(['date', 'New', 'InProgress'], command.header_keys)
+        self.assertEqual([1, 0], [r['New'] for r in rows])
+        self.assertEqual([0, 1], [r['InProgress'] for r in rows])
@@ -0,0 +1,153 @@
+import datetime
+import io
+import os
+import subprocess
+import sys
+import unittest
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+try:
+    from contextlib import redirect_stderr
+except ImportError:
+    from contextlib2 import redirect_stderr
+
+import qjira.forecast as forecast
+from qjira.commands import VelocityCommand
+
+class ForecastTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._use_numpy = forecast.use_numpy
+
+    def tearDown(self):
+        forecast.use_numpy = self._use_numpy
+
+    def _check(self):
+        self.assertEqual([3] * 100, forecast.simulate([5, 5], 12, trials=100))
+        periods = forecast.simulate([2, 4, 0, 6], 40, trials=2000, seed=1)
+        self.assertEqual(2000, len(periods))
+        self.assertEqual(sorted(periods), periods)
+        self.assertTrue(7 <= periods[0] and periods[-1] <= 60)
+        # 3 points per period on average
+        self.assertAlmostEqual(14.0, float(sum(periods)) / len(periods), delta=1.0)
+
+    def test_python(self):
+        forecast.use_numpy = False
+        self._check()
+
+    @unittest.skipIf(forecast._numpy() is None, 'numpy is not installed')
+    def test_numpy(self):
+        self._check()
+
+    @unittest.skipIf(forecast._numpy() is None, 'numpy is not installed')
+    @unittest.skipIf(tracemalloc is None, 'tracemalloc is not available')
+    def test_numpy_memory_bounded(self):
+        '''A long backlog at a low throughput takes more passes, not more memory.'''
+        tracemalloc.start()
+        try:
+            periods = forecast.simulate([0, 1, 0, 2, 1, 0, 3, 1], 2000, trials=10000, seed=1)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(10000, len(periods))
+        self.assertLess(peak, 32 * 1024 * 1024)
+
+    def test_no_history(self):
+        with self.assertRaises(ValueError):
+            forecast.simulate([0, 0], 10)
+        with self.assertRaises(ValueError):
+            forecast.simulate([], 10)
+
+    def test_nothing_remaining(self):
+        self.assertEqual([0, 0], forecast.simulate([1], 0, trials=2))
+
+    def test_confidence_intervals(self):
+        periods = list(range(1, 101))
+        self.assertEqual([(50, 50), (85, 85), (95, 95)], forecast.confidence_intervals(periods))
+        self.assertEqual([(50, 4)], forecast.confidence_intervals([4], confidences=[50]))
+
+class TestVelocityMonteCarlo(unittest.TestCase):
+
+    def _row(self, issue_key, sprint_id, points, done):
+        start = datetime.date(2018, 1, 1) + datetime.timedelta(days=14 * sprint_id)
+        return {
+            'issue_key': issue_key,
+            'issuetype_name': 'Story',
+            'project_key': 'TEST',
+            'sprint_id': str(sprint_id),
+            'sprint_name': 'Sprint {0}'.format(sprint_id),
+            'sprint_startDate': start,
+            'sprint_endDate': start + datetime.timedelta(days=14),
+            'sprint_completeDate': start + datetime.timedelta(days=14),
+            'status_Done': done,
+            'story_points': points
+        }
+
+    def _rows(self):
+        return [self._row('TEST-{0}'.format(n), n // 2, 5.0, datetime.date(2018, 1, 2) + datetime.timedelta(days=7 * n))
+                for n in range(6)]
+
+    def test_sprints(self):
+        command = VelocityCommand(base_url='localhost:3000', project=['TEST'], backlog=25, seed=1)
+        self.assertEqual(['confidence', 'sprints', 'date'], command.header_keys)
+        # the sprint rows are not sorted for a forecast
+        command.sort_rows = None
+        data = command.post_process(iter(self._rows()))
+        # 10 points every sprint, last one completed 2018-02-12
+        self.assertEqual([
+            {'confidence': '50%', 'sprints': 3, 'date': datetime.date(2018, 3, 26)},
+            {'confidence': '85%', 'sprints': 3, 'date': datetime.date(2018, 3, 26)},
+            {'confidence': '95%', 'sprints': 3, 'date': datetime.date(2018, 3, 26)},
+        ], data)
+
+    def test_throughput(self):
+        command = VelocityCommand(base_url='localhost:3000', project=['TEST'], backlog=3, throughput=True, seed=1)
+        self.assertEqual(['confidence', 'weeks', 'date'], command.header_keys)
+        data = command.post_process(iter(self._rows()))
+        # an issue completed every week
+        self.assertEqual([3, 3, 3], [r['weeks'] for r in data])
+        self.assertEqual(datetime.date(2018, 2, 27), data[0]['date'])
+
+    def _no_history(self, rows, **kwargs):
+        command = VelocityCommand(base_url='localhost:3000', project=['TEST'], backlog=10, seed=1, **kwargs)
+        err = io.StringIO()
+        with redirect_stderr(err):
+            data = command.post_process(iter(rows))
+        self.assertEqual([], list(data))
+        self.assertIn('No completed history to forecast from', err.getvalue())
+
+    def test_no_closed_sprints(self):
+        self._no_history([])
+
+    def test_no_completed_effort(self):
+        rows = self._rows()
+        for r in rows:
+            r['story_points'] = 0.0
+        self._no_history(rows)
+
+    def test_no_completed_issues(self):
+        rows = self._rows()
+        for r in rows:
+            r['status_Done'] = None
+        self._no_history(rows, throughput=True)
+
+    def test_cache_with_throughput(self):
+        with self.assertRaises(ValueError):
+            VelocityCommand(base_url='localhost:3000', project=['TEST'], backlog=10,
+                            throughput=True, cache_file='velocity.json')
+
+class NumpyImportTestCase(unittest.TestCase):
+
+    def test_commands_do_not_import_numpy(self):
+        '''numpy is imported by the statistics, not with the commands.'''
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        env = dict(os.environ, QJIRA_TESTMODE='Testing')
+        env['PYTHONPATH'] = os.pathsep.join([root] + [p for p in [os.environ.get('PYTHONPATH')] if p])
+        output = subprocess.check_output(
+            [sys.executable, '-c', 'import sys, qjira.commands; print("numpy" in sys.modules)'],
+            cwd=root, env=env)
+        self.assertEqual('False', output.decode('utf-8').strip().splitlines()[-1])
@@ -0,0 +1,133 @@
+import io
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+try:
+    from contextlib import redirect_stdout, redirect_stderr
+except ImportError:
+    from contextlib2 import redirect_stdout, redirect_stderr
+
+import qjira.jira as _jira
+import qjira.__dump__ as dump
+from qjira.issue_store import IssueStore, INDEX_FILE
+from qjira.metrics import HttpMetrics
+
+from . import test_util
+from .synthetic_data import SyntheticJira
+
+PY3 = sys.version_info > (3,)
+
+BASE_URL = 'http://localhost:3000'
+
+class IssueStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.source = SyntheticJira(issues=30, custom_fields=2)
+        self.store = IssueStore(os.path.join(self.tmp_dir, 'store'), BASE_URL)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_put_and_get(self):
+        for idx in range(30):
+            self.store.put(self.source.issue(idx))
+        self.assertEqual(30, len(self.store))
+        self.assertIn('BENCH1-6', self.store)
+        self.assertEqual(self.source.issue(5), self.store.get('BENCH1-6'))
+        self.assertIsNone(self.store.get('BENCH1-99'))
+
+    def test_latest_version_wins(self):
+        self.store.put({'key': 'A-1', 'fields': {'summary': 'old'}})
+        self.store.put({'key': 'A-2', 'fields': {'summary': 'other'}})
+        self.store.put({'key': 'A-1', 'fields': {'summary': 'new'}})
+        self.assertEqual('new', self.store.get('A-1')['fields']['summary'])
+        self.assertEqual(['other', 'new'], [i['fields']['summary'] for i in self.store.scan()])
+
+    def test_reopen(self):
+        for idx in range(10):
+            self.store.put(self.source.issue(idx))
+        self.store.close()
+        self.store = IssueStore(os.path.join(self.tmp_dir, 'store'), BASE_URL)
+        self.assertEqual(10, len(self.store))
+        self.assertEqual([self.source.issue(idx) for idx in range(10)], list(self.store.scan()))
+
+    def test_interrupted_write_ignored(self):
+        self.store.put({'key': 'A-1', 'fields': {}})
+        self.store.close()
+        with open(os.path.join(self.tmp_dir, 'store', INDEX_FILE), 'ab') as f:
+            f.write(b'http://localhost:3000 A-2 1000 20\nhttp://localhost:3000 A-3 10')
+        self.store = IssueStore(os.path.join(self.tmp_dir, 'store'), BASE_URL)
+        self.assertEqual(['A-1'], self.store.keys())
+
+    def test_empty_scan(self):
+        self.assertEqual([], list(self.store.scan()))
+
+    def test_keyed_by_base_url(self):
+        self.store.put({'key': 'A-1', 'fields': {'summary': 'localhost'}})
+        self.store.close()
+        other = IssueStore(os.path.join(self.tmp_dir, 'store'), 'https://other.atlassian.net')
+        try:
+            self.assertNotIn('A-1', other)
+            other.put({'key': 'A-1', 'fields': {'summary': 'other'}})
+            self.assertEqual('other', other.get('A-1')['fields']['summary'])
+        finally:
+            other.close()
+        self.store = IssueStore(os.path.join(self.tmp_dir, 'store'), BASE_URL)
+        self.assertEqual('localhost', self.store.get('A-1')['fields']['summary'])
+
+class IssueStoreLookupTestCase(test_util.MockJira, unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.store = IssueStore(self.tmp_dir, BASE_URL)
+        self.setup_mock_jira()
+        self._actual_url = None
+        HttpMetrics.reset()
+
+    def tearDown(self):
+        _jira.use_issue_store(None)
+        self.teardown_mock_jira()
+        self.store.close()
+        HttpMetrics.reset()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_get_issue_fetches_once(self):
+        self.json_response = {'key': 'TEST-1', 'fields': {'customfield_10019': 'Epic'}}
+        _jira.use_issue_store(self.store)
+        self.assertEqual('Epic', _jira.get_issue('http://localhost:3000', 'TEST-1')['customfield_10019'])
+        self._actual_url = None
+        self.assertEqual('Epic', _jira.get_issue('http://localhost:3000', 'TEST-1')['customfield_10019'])
+        self.assertIsNone(self._actual_url)
+        self.assertEqual(1, HttpMetrics.as_dict()['totals']['cache_hits'])
+
+    def test_store_of_other_instance_not_used(self):
+        self.store.put({'key': 'TEST-1', 'fields': {'customfield_10019': 'Stored'}})
+        self.json_response = {'key': 'TEST-1', 'fields': {'customfield_10019': 'Fetched'}}
+        _jira.use_issue_store(self.store)
+        self.assertEqual('Fetched', _jira.get_issue('https://other.atlassian.net', 'TEST-1')['customfield_10019'])
+
+    def test_offline_missing_issue(self):
+        _jira.use_issue_store(self.store, offline=True)
+        with self.assertRaises(KeyError):
+            _jira.get_issue('http://localhost:3000', 'TEST-1')
+        self.assertIsNone(self._actual_url)
+
+    def test_dump_offline(self):
+        self.store.put({'key': 'TEST-1', 'fields': {'summary': 'Stored summary'}})
+        self.store.close()
+        std_out = io.StringIO() if PY3 else io.BytesIO()
+        with redirect_stdout(std_out):
+            dump.main(['-b', BASE_URL, '--store', self.tmp_dir, '--offline', 'TEST-1'])
+        self.assertIn('Stored summary', std_out.getvalue())
+        self.assertIsNone(self._actual_url)
+        self.store = IssueStore(self.tmp_dir, BASE_URL)
+
+    def test_dump_offline_requires_store(self):
+        with self.assertRaises(SystemExit):
+            with redirect_stderr(io.StringIO() if PY3 else io.BytesIO()):
+                dump.main(['--offline', 'TEST-1'])
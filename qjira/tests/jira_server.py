@@ -0,0 +1,368 @@
+"""Local stand-in for the Jira REST endpoints used by qjira.jira.
+
+Serves /rest/api/2/search, /rest/api/2/issue/{key},
+/rest/api/2/issue/{key}/worklog and the bulk worklog endpoints
+(/rest/api/2/worklog/updated, /deleted and /list) from synthetic or
+recorded issues, with configurable latency, jitter, 429 throttling and
+page size clamping. The real requests code path can then be load tested
+without a network.
+
+Usage: python -m qjira.tests.jira_server --issues 10000 --port 8080 --latency 0.05
+       qjira -b http://localhost:8080 -w any velocity BENCH0
+"""
+import io
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+try:
+    from urlparse import urlparse, parse_qs
+except ImportError:
+    from urllib.parse import urlparse, parse_qs
+
+from .synthetic_data import SyntheticJira
+
+API_PREFIX = '/rest/api/2/'
+
+# search JQL resolving issue ids, as sent by qjira.jira.issue_keys
+ID_QUERY = re.compile(r'^id in \(([^)]*)\)$')
+
+# updated time (epoch milliseconds) of the first worklog, each later
+# change is a millisecond after the previous one
+WORKLOG_EPOCH = 1514764800000
+
+class RecordedData(object):
+    '''Serves issues loaded from JSON: a single issue, a list of issues
+    or a search result page, such as doc/test.json.'''
+
+    def __init__(self, issues):
+        self._issues = list(issues)
+        self._by_key = {i['key']: i for i in self._issues}
+        self._by_id = {str(i['id']): i for i in self._issues if 'id' in i}
+        self.issues = len(self._issues)
+
+    @classmethod
+    def load(cls, *filepaths):
+        issues = []
+        for filepath in filepaths:
+            with io.open(filepath, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict) and 'issues' in data:
+                issues += data['issues']
+            elif isinstance(data, dict):
+                issues.append(data)
+            else:
+                issues += data
+        return cls(issues)
+
+    def search_page(self, start_at=0, max_results=50):
+        return {
+            'startAt': start_at,
+            'maxResults': max_results,
+            'total': self.issues,
+            'issues': self._issues[start_at:start_at + max_results]
+        }
+
+    def issue_by_key(self, issue_key):
+        return self._by_key.get(issue_key)
+
+    def issue_by_id(self, issue_id):
+        return self._by_id.get(str(issue_id))
+
+    def all_worklogs(self):
+        for issue in self._issues:
+            for worklog in (issue['fields'].get('worklog') or {}).get('worklogs', []):
+                if 'issueId' not in worklog and 'id' in issue:
+                    worklog = dict(worklog, issueId=issue['id'])
+                yield worklog
+
+    def worklog(self, issue_key):
+        issue = self._by_key.get(issue_key)
+        if issue is None:
+            return None
+        worklog = issue['fields'].get('worklog') or {}
+        worklogs = worklog.get('worklogs', [])
+        return {'startAt': 0, 'maxResults': len(worklogs), 'total': len(worklogs), 'worklogs': worklogs}
+
+def _select_fields(issue, fields, expand):
+    '''Return a copy of {issue} restricted like Jira to the requested
+    {fields} and {expand} parameters.'''
+    names = [f for f in fields if f and not f.startswith('-')]
+    result = {k: v for k, v in issue.items() if k not in ('fields', 'changelog')}
+    if not names or '*all' in names or '*navigable' in names:
+        result['fields'] = issue.get('fields', {})
+    else:
+        result['fields'] = {k: v for k, v in issue.get('fields', {}).items() if k in names}
+    if 'changelog' in expand and 'changelog' in issue:
+        result['changelog'] = issue['changelog']
+    return result
+
+class _JiraRequestHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if self.server.jira.verbose:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _segments(self):
+        '''Return the path segments after the API prefix and the query, None
+        when the request was answered (throttled or not found).'''
+        jira = self.server.jira
+        if jira.throttled():
+            self._send_json(429, {'errorMessages': ['Rate limit exceeded']},
+                            headers={'Retry-After': str(jira.retry_after)})
+            return None, None
+        jira.delay()
+
+        parts = urlparse(self.path)
+        if not parts.path.startswith(API_PREFIX):
+            self._send_json(404, {'errorMessages': ['Not found']})
+            return None, None
+        return parts.path[len(API_PREFIX):].strip('/').split('/'), parse_qs(parts.query)
+
+    def do_POST(self):
+        jira = self.server.jira
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        segments, qs = self._segments()
+        if segments is None:
+            return
+        if segments == ['worklog', 'list']:
+            self._send_json(200, jira.list_worklogs(json.loads(body.decode('utf-8'))['ids']))
+        else:
+            self._send_json(404, {'errorMessages': ['Not found']})
+
+    def do_GET(self):
+        jira = self.server.jira
+        segments, qs = self._segments()
+        if segments is None:
+            return
+
+        if segments == ['search']:
+            payload = jira.search(qs)
+        elif segments in (['worklog', 'updated'], ['worklog', 'deleted']):
+            payload = jira.changed_worklogs(segments[1], int(qs.get('since', ['0'])[0]))
+        elif len(segments) == 2 and segments[0] == 'issue':
+            payload = jira.source.issue_by_key(segments[1])
+        elif len(segments) == 3 and segments[0] == 'issue' and segments[2] == 'worklog':
+            payload = jira.source.worklog(segments[1])
+        else:
+            payload = None
+
+        if payload is None:
+            self._send_json(404, {'errorMessages': ['Issue does not exist']})
+        else:
+            self._send_json(200, payload)
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+class JiraServer(object):
+    '''Stand-in Jira server answering from {source}.
+
+    Arguments:
+
+    source - SyntheticJira or RecordedData
+    host, port - address to bind, port 0 picks a free port
+    latency - seconds added to every response
+    jitter - up to +/- seconds added to the latency
+    throttle_every - answer every Nth request with 429, 0 disables
+    retry_after - Retry-After seconds sent with a 429
+    max_page_size - clamp search maxResults like Jira does
+    worklog_page_size - worklog changes per page of /worklog/updated
+
+    Worklogs are updated in the order of the source, one millisecond
+    apart, starting at WORKLOG_EPOCH. update_worklog() and
+    delete_worklog() change them later.
+    '''
+
+    def __init__(self, source, host='127.0.0.1', port=0, latency=0.0, jitter=0.0,
+                 throttle_every=0, retry_after=1, max_page_size=100, worklog_page_size=1000,
+                 seed=0, verbose=False):
+        self.source = source
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.max_page_size = max_page_size
+        self.worklog_page_size = worklog_page_size
+        self.verbose = verbose
+        # worklog id -> [updated time, worklog], deleted id -> deleted time
+        self._worklogs = None
+        self._deleted = {}
+        self._clock = WORKLOG_EPOCH
+        self.requests = 0
+        self.throttled_requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = _ThreadingHTTPServer((host, port), _JiraRequestHandler)
+        self._httpd.jira = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return 'http://{0}:{1}'.format(host, port)
+
+    def throttled(self):
+        '''Count the request, return True when it must be throttled.'''
+        with self._lock:
+            self.requests += 1
+            if self.throttle_every and self.requests % self.throttle_every == 0:
+                self.throttled_requests += 1
+                return True
+        return False
+
+    def delay(self):
+        with self._lock:
+            seconds = self.latency + self._random.uniform(-self.jitter, self.jitter)
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def search(self, qs):
+        start_at = int(qs.get('startAt', ['0'])[0])
+        max_results = min(int(qs.get('maxResults', ['50'])[0]), self.max_page_size)
+        fields = ','.join(qs.get('fields', [''])).split(',')
+        expand = ','.join(qs.get('expand', [''])).split(',')
+        m = ID_QUERY.match(qs.get('jql', [''])[0].strip())
+        if m:
+            issues = [self.source.issue_by_id(i.strip()) for i in m.group(1).split(',')]
+            issues = [i for i in issues if i is not None]
+            page = {'startAt': start_at, 'maxResults': max_results, 'total': len(issues),
+                    'issues': issues[start_at:start_at + max_results]}
+        else:
+            page = self.source.search_page(start_at, max_results)
+        page['issues'] = [_select_fields(i, fields, expand) for i in page['issues']]
+        return page
+
+    def _worklog_table(self):
+        # called with the lock held
+        if self._worklogs is None:
+            self._worklogs = {}
+            for worklog in self.source.all_worklogs():
+                self._worklogs[str(worklog['id'])] = [self._clock, worklog]
+                self._clock += 1
+        return self._worklogs
+
+    def update_worklog(self, worklog):
+        '''Add or replace {worklog}, updated now.'''
+        with self._lock:
+            self._worklog_table()[str(worklog['id'])] = [self._clock, worklog]
+            self._deleted.pop(str(worklog['id']), None)
+            self._clock += 1
+
+    def delete_worklog(self, worklog_id):
+        with self._lock:
+            del self._worklog_table()[str(worklog_id)]
+            self._deleted[str(worklog_id)] = self._clock
+            self._clock += 1
+
+    def changed_worklogs(self, change, since):
+        '''Return the page of worklog ids updated (or deleted) since
+        {since}, like /worklog/updated and /worklog/deleted.'''
+        with self._lock:
+            if change == 'deleted':
+                changes = self._deleted.items()
+            else:
+                changes = ((k, v[0]) for k, v in self._worklog_table().items())
+            changes = sorted((t, k) for k, t in changes if t >= since)
+        values = [{'worklogId': int(k), 'updatedTime': t} for t, k in changes[:self.worklog_page_size]]
+        last_page = len(changes) <= self.worklog_page_size
+        until = values[-1]['updatedTime'] if values else since
+        page = {'values': values, 'since': since, 'until': until, 'lastPage': last_page}
+        if not last_page:
+            page['nextPage'] = '{0}{1}worklog/{2}?since={3}'.format(self.base_url, API_PREFIX, change, until + 1)
+        return page
+
+    def list_worklogs(self, ids):
+        '''Return the worklogs of {ids}, like /worklog/list.'''
+        with self._lock:
+            worklogs = self._worklog_table()
+            return [worklogs[str(i)][1] for i in ids if str(i) in worklogs]
+
+    def start(self):
+        '''Serve from a background thread.'''
+        self._thread = threading.Thread(target=self._httpd.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+        return False
+
+def create_parser():
+    parser = argparse.ArgumentParser(
+        prog='qjira.tests.jira_server',
+        description='Serve synthetic or recorded issues like the Jira REST API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--data', metavar='FILE', action='append',
+        help='Serve recorded issues from JSON file(s) instead of synthetic data')
+    parser.add_argument('-n', '--issues', type=int, default=1000,
+        help='Number of synthetic issues [default: 1000]')
+    parser.add_argument('--latency', type=float, default=0.0,
+        help='Seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0,
+        help='Up to +/- seconds added to the latency')
+    parser.add_argument('--throttle-every', type=int, default=0, metavar='N',
+        help='Answer every Nth request with 429 Too Many Requests')
+    parser.add_argument('--retry-after', type=int, default=1,
+        help='Retry-After seconds of a 429 response')
+    parser.add_argument('--max-page-size', type=int, default=100,
+        help='Clamp search maxResults [default: 100]')
+    parser.add_argument('-v', '--verbose', action='store_true',
+        help='Log every request')
+    return parser
+
+def main(args=None):
+    my_args = create_parser().parse_args(args)
+    source = RecordedData.load(*my_args.data) if my_args.data else SyntheticJira(issues=my_args.issues)
+    server = JiraServer(source, host=my_args.host, port=my_args.port,
+                        latency=my_args.latency, jitter=my_args.jitter,
+                        throttle_every=my_args.throttle_every,
+                        retry_after=my_args.retry_after,
+                        max_page_size=my_args.max_page_size,
+                        verbose=my_args.verbose)
+    sys.stderr.write('Serving {0} issues at {1}\n'.format(source.issues, server.base_url))
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
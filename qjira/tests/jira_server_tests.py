@@ -0,0 +1,122 @@
+import io
+import os
+import shutil
+import tempfile
+import timeit
+import unittest
+
+import qjira.jira as _jira
+import qjira.__main__ as prog
+from qjira.metrics import HttpMetrics
+from qjira.worklog_store import WorklogStore
+
+from . import benchmark
+from .synthetic_data import SyntheticJira
+from .jira_server import JiraServer, RecordedData
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+
+class JiraServerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        HttpMetrics.reset()
+        self.source = SyntheticJira(issues=120, worklogs=2, custom_fields=2)
+
+    def tearDown(self):
+        HttpMetrics.reset()
+
+    def test_all_issues_clamps_page_size(self):
+        with JiraServer(self.source, max_page_size=30) as server:
+            issues = list(_jira.all_issues(server.base_url, 'project = BENCH0'))
+            self.assertEqual(120, len(issues))
+            self.assertEqual(4, server.requests)
+        self.assertEqual('BENCH0-1', issues[0]['issue_key'])
+        self.assertEqual('BENCH3-120', issues[-1]['issue_key'])
+
+    def test_fields_and_expand(self):
+        with JiraServer(self.source) as server:
+            issue = next(_jira.all_issues(server.base_url, 'project = BENCH0',
+                                          fields=['summary', 'status'], expands=['']))
+        self.assertEqual({'issue_key', 'summary', 'status'}, set(issue.keys()))
+
+    def test_issue_and_worklog(self):
+        with JiraServer(self.source) as server:
+            issue = _jira.get_issue(server.base_url, 'BENCH1-2')
+            worklog = _jira.get_worklog(server.base_url, 'BENCH1-2')
+            epic = _jira.get_issue(server.base_url, 'BENCH1-EPIC2')
+        self.assertEqual('BENCH1-2', issue['issue_key'])
+        self.assertEqual(2, len(worklog['worklogs']))
+        self.assertEqual('Epic BENCH1-EPIC2', epic['customfield_10019'])
+
+    def test_throttling_is_retried(self):
+        with JiraServer(self.source, throttle_every=2, retry_after=0) as server:
+            issues = list(_jira.all_issues(server.base_url, 'project = BENCH0'))
+            self.assertEqual(120, len(issues))
+            self.assertEqual(2, server.throttled_requests)
+        totals = HttpMetrics.as_dict()['totals']
+        self.assertEqual(2, totals['retries'])
+        self.assertEqual(2, totals['rate_limit_waits'])
+
+    def test_latency(self):
+        with JiraServer(self.source, latency=0.05, jitter=0.01) as server:
+            started = timeit.default_timer()
+            _jira.get_worklog(server.base_url, 'BENCH0-1')
+            self.assertLessEqual(0.04, timeit.default_timer() - started)
+
+    def test_recorded_data(self):
+        source = RecordedData.load(os.path.join(DATA_DIR, 'single_sprint_story.json'),
+                                   os.path.join(DATA_DIR, 'simple_bug.json'))
+        with JiraServer(source) as server:
+            issues = list(_jira.all_issues(server.base_url, 'project = TEST'))
+            self.assertEqual(source.issues, len(issues))
+            self.assertIsNotNone(_jira.get_issue(server.base_url, issues[0]['issue_key']))
+
+    def test_benchmark_over_http(self):
+        source = SyntheticJira(issues=20)
+        with JiraServer(source) as server:
+            result = benchmark.run_command('velocity', source, measure_memory=False, server=server)
+        self.assertLess(0, result['output_chars'])
+        self.assertIn('http', result['stages'])
+
+class JiraServerWorklogSyncTestCase(unittest.TestCase):
+
+    def setUp(self):
+        HttpMetrics.reset()
+        self.tmpdir = tempfile.mkdtemp()
+        self.source = SyntheticJira(issues=30, worklogs=2, custom_fields=0)
+        self.author = next(self.source.all_worklogs())['author']['name']
+
+    def tearDown(self):
+        HttpMetrics.reset()
+        shutil.rmtree(self.tmpdir)
+
+    def _path(self, name):
+        return os.path.join(self.tmpdir, name)
+
+    def _read(self, name):
+        with io.open(self._path(name), 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def _sync(self, store, outfile, *args):
+        prog.main(list(args) + ['worklog', '--no-progress', '--sync', self._path(store),
+                                '-o', self._path(outfile), self.author])
+
+    def test_sync(self):
+        with JiraServer(self.source, worklog_page_size=25) as server:
+            self._sync('store.json', 'first.csv', '-b', server.base_url, '-t', 'token',
+                       '--record', self._path('sync.zip'))
+            # 3 pages of updated worklogs, a worklog list and an issue key search
+            self.assertEqual(3 + 1 + 1, server.requests)
+            self.assertEqual(60, len(WorklogStore(self._path('store.json'), server.base_url)))
+
+            first = next(w for w in self.source.all_worklogs() if w['author']['name'] == self.author)
+            server.delete_worklog(first['id'])
+            self._sync('store.json', 'second.csv', '-b', server.base_url, '-t', 'token')
+            self.assertEqual(59, len(WorklogStore(self._path('store.json'), server.base_url)))
+
+        self.assertIn(self.author, self._read('first.csv'))
+        self.assertNotEqual(self._read('first.csv'), self._read('second.csv'))
+
+        # the recorded GET and POST requests answer the same sync offline
+        self._sync('replayed.json', 'replayed.csv', '--replay', self._path('sync.zip'))
+        self.assertEqual(self._read('first.csv'), self._read('replayed.csv'))
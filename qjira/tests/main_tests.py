@@ -6,6 +6,8 @@ import keyring.backend
 import re
 import os
 import tempfile
+import shutil
+import json
 
 from requests.exceptions import HTTPError
 from requests import Response
@@ -16,6 +18,7 @@ except ImportError:
     from contextlib2 import redirect_stdout, redirect_stderr
 
 import qjira.__main__ as prog
+from qjira.timing import Timing
 
 from . import test_util
 from . import test_data
@@ -83,6 +86,19 @@ class TestMainCLI(test_util.BaseTestCase, test_util.MockJira, unittest.TestCase)
         with self.assertRaises(KeyError):
             keyring.get_keyring().entries['qjira-sp_userb']
 
+    def test_metrics_written_on_error(self):
+        tmp_dir = tempfile.mkdtemp()
+        path = os.path.join(tmp_dir, 'qjira.prom')
+        self.raise401 = True
+        try:
+            with self.assertRaises(HTTPError):
+                with redirect_stdout(self.std_out):
+                    with redirect_stderr(self.std_err):
+                        prog.main(['-w','xyzzy','-u','userb', '--metrics-textfile', path, 'cycletime', 'IIQCB'])
+            self.assertTrue(os.path.exists(path))
+        finally:
+            shutil.rmtree(tmp_dir)
+
     def test_progress_shown(self):
         re_1of1 = re.compile('Retrieved 1 issue')
         self.json_response = {
@@ -161,3 +177,36 @@ class TestMainCLI(test_util.BaseTestCase, test_util.MockJira, unittest.TestCase)
         exc = ctx.exception
         self.assertEqual(exc.code, 2)
         self.assertRegex_(self.std_err.getvalue(), r'velocity: error:')
+
+    def test_profile_json(self):
+        f, path = tempfile.mkstemp(suffix='json')
+        os.close(f)
+        self.json_response = {
+            'total': 1,
+            'issues': [test_data.singleSprintStory()]
+        }
+        try:
+            with redirect_stderr(self.std_err):
+                with redirect_stdout(self.std_out):
+                    prog.main(['-w', 'blah', '--profile-json', path, 'velocity', '--no-progress', 'TEST'])
+            with open(path, 'r') as o:
+                report = json.load(o)
+        finally:
+            Timing.reset()
+            os.unlink(path)
+        for stage in ['_as_data', 'pre_load', 'pre_process', 'flatten_json_struct', 'post_process', 'writer']:
+            self.assertIn(stage, report['stages'])
+        self.assertEqual(1, report['stages']['_as_data']['items'])
+
+    def test_profile_report(self):
+        self.json_response = {
+            'total': 1,
+            'issues': [test_data.singleSprintStory()]
+        }
+        try:
+            with redirect_stderr(self.std_err):
+                with redirect_stdout(self.std_out):
+                    prog.main(['-w', 'blah', '--profile', 'cycletime', '--no-progress', 'TEST'])
+        finally:
+            Timing.reset()
+        self.assertRegex_(self.std_err.getvalue(), r'flatten_json_struct +\d+ +\d+')
@@ -0,0 +1,103 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import requests
+from requests import Response
+
+import qjira.jira as _jira
+from qjira.metrics import HttpMetrics
+
+def _response(status_code, content=b'{}', headers=None):
+    response = Response()
+    response.status_code = status_code
+    response._content = content
+    response.headers.update(headers or {})
+    return response
+
+class HttpMetricsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        HttpMetrics.reset()
+
+    def tearDown(self):
+        HttpMetrics.reset()
+
+    def test_record_response(self):
+        HttpMetrics.record_response('search', 200, 100, 0.07)
+        HttpMetrics.record_response('search', 200, 50, 60.0)
+        HttpMetrics.record_response('issue', 404, 10, 0.01)
+        summary = HttpMetrics.as_dict()
+        search = summary['endpoints']['search']
+        self.assertEqual(2, search['requests'])
+        self.assertEqual(150, search['bytes'])
+        self.assertEqual({'200': 2}, search['status_codes'])
+        self.assertEqual(1, search['latency_histogram']['0.1'])
+        self.assertEqual(1, search['latency_histogram']['inf'])
+        self.assertEqual(3, summary['totals']['requests'])
+        self.assertEqual(160, summary['totals']['bytes'])
+
+    def test_prometheus_histogram_is_cumulative(self):
+        HttpMetrics.record_response('search', 200, 100, 0.07)
+        HttpMetrics.record_response('search', 200, 100, 0.3)
+        HttpMetrics.record_cache_hit('search')
+        lines = list(HttpMetrics.prometheus_lines(timestamp=1))
+        self.assertIn('qjira_http_requests_total{code="200",endpoint="search"} 2', lines)
+        self.assertIn('qjira_http_request_duration_seconds_bucket{endpoint="search",le="0.1"} 1', lines)
+        self.assertIn('qjira_http_request_duration_seconds_bucket{endpoint="search",le="0.5"} 2', lines)
+        self.assertIn('qjira_http_request_duration_seconds_bucket{endpoint="search",le="+Inf"} 2', lines)
+        self.assertIn('qjira_http_request_duration_seconds_count{endpoint="search"} 2', lines)
+        self.assertIn('qjira_http_cache_hits_total{endpoint="search"} 1', lines)
+        self.assertIn('qjira_last_run_timestamp_seconds 1', lines)
+
+    def test_write_textfile(self):
+        tmp_dir = tempfile.mkdtemp()
+        path = os.path.join(tmp_dir, 'qjira.prom')
+        try:
+            HttpMetrics.record_response('worklog', 200, 1, 0.01)
+            HttpMetrics.write_textfile(path)
+            self.assertEqual(['qjira.prom'], os.listdir(tmp_dir))
+            with open(path) as f:
+                self.assertIn('qjira_http_response_bytes_total{endpoint="worklog"} 1\n', f.readlines())
+        finally:
+            shutil.rmtree(tmp_dir)
+
+class GetJsonMetricsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        HttpMetrics.reset()
+        self._original_get = requests.get
+        self._responses = []
+        requests.get = lambda url, **kwargs: self._responses.pop(0)
+
+    def tearDown(self):
+        requests.get = self._original_get
+        HttpMetrics.reset()
+
+    def test_rate_limited_request_retried(self):
+        self._responses = [
+            _response(429, headers={'Retry-After': '0'}),
+            _response(200, content=b'{"total": 0}')
+        ]
+        payload = _jira._get_json('http://localhost:3000/rest/api/2/search', endpoint='search')
+        self.assertEqual({'total': 0}, payload)
+        search = HttpMetrics.as_dict()['endpoints']['search']
+        self.assertEqual({'429': 1, '200': 1}, search['status_codes'])
+        self.assertEqual(1, search['retries'])
+        self.assertEqual(1, search['rate_limit_waits'])
+
+    def test_retries_exhausted(self):
+        self._responses = [_response(503, headers={'Retry-After': '0'})
+                           for _ in range(_jira.MAX_RETRIES + 1)]
+        with self.assertRaises(requests.exceptions.HTTPError):
+            _jira._get_json('http://localhost:3000/rest/api/2/issue/A-1', endpoint='issue')
+        issue = HttpMetrics.as_dict()['endpoints']['issue']
+        self.assertEqual(_jira.MAX_RETRIES, issue['retries'])
+        self.assertEqual(0, issue['rate_limit_waits'])
+
+    def test_retry_delay_capped(self):
+        self.assertEqual(_jira.MAX_RETRY_DELAY, _jira._retry_delay(_response(429, headers={'Retry-After': '3600'}), 1))
+        self.assertEqual(_jira.MAX_RETRY_DELAY, _jira._retry_delay(_response(503), 10))
+        self.assertEqual(5.0, _jira._retry_delay(_response(429, headers={'Retry-After': '5'}), 1))
+        self.assertEqual(2, _jira._retry_delay(_response(503), 1))
@@ -0,0 +1,52 @@
+import unittest
+
+from qjira.row import Row, RowSchema
+
+class RowTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.row = Row.from_items([('issue_key', 'TEST-1'), ('sprint_0_name', 'Sprint 1'), ('story_points', 3.0)])
+
+    def test_mapping_access(self):
+        self.assertEqual('TEST-1', self.row['issue_key'])
+        self.assertEqual(3.0, self.row.get('story_points'))
+        self.assertIsNone(self.row.get('missing'))
+        self.assertEqual('x', self.row.get('missing', 'x'))
+        self.assertIn('sprint_0_name', self.row)
+        self.assertNotIn('missing', self.row)
+        with self.assertRaises(KeyError):
+            self.row['missing']
+        self.assertEqual(3, len(self.row))
+
+    def test_equals_dict(self):
+        expected = {'issue_key': 'TEST-1', 'sprint_0_name': 'Sprint 1', 'story_points': 3.0}
+        self.assertEqual(expected, self.row)
+        self.assertEqual(expected, dict(self.row))
+        self.assertEqual(expected, dict(self.row.items()))
+
+    def test_shared_schema(self):
+        other = Row.from_items([('issue_key', 'TEST-2'), ('sprint_0_name', 'Sprint 2'), ('story_points', 5.0)])
+        self.assertIs(self.row._schema, other._schema)
+
+    def test_update(self):
+        other = self.row.copy()
+        self.row.update({'story_points': 8.0, 'planned_story_points': 8.0})
+        other['planned_story_points'] = 1.0
+        self.assertEqual(8.0, self.row['story_points'])
+        self.assertEqual(8.0, self.row['planned_story_points'])
+        self.assertEqual(3.0, other['story_points'])
+        self.assertIs(self.row._schema, other._schema)
+        self.assertEqual(['issue_key', 'sprint_0_name', 'story_points', 'planned_story_points'], self.row.keys())
+
+    def test_delete(self):
+        del self.row['sprint_0_name']
+        self.assertEqual({'issue_key': 'TEST-1', 'story_points': 3.0}, self.row)
+
+    def test_repeated_key(self):
+        row = Row.from_items([('a', 1), ('b', 2), ('a', 3)])
+        self.assertEqual({'a': 3, 'b': 2}, row)
+
+    def test_schema_extend_cached(self):
+        schema = RowSchema.get(('a', 'b'))
+        self.assertIs(schema.extend('c'), schema.extend('c'))
+        self.assertEqual(('a', 'b', 'c'), schema.extend('c').keys)
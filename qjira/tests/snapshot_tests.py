@@ -0,0 +1,106 @@
+import io
+import os
+import sys
+import json
+import shutil
+import zipfile
+import tempfile
+import unittest
+
+try:
+    from contextlib import redirect_stderr
+except ImportError:
+    from contextlib2 import redirect_stderr
+
+import qjira.jira as _jira
+import qjira.__main__ as prog
+from qjira.snapshot import Snapshot, request_key, INDEX_MEMBER
+from qjira.metrics import HttpMetrics
+
+from .synthetic_data import SyntheticJira
+from .jira_server import JiraServer
+
+PY3 = sys.version_info > (3,)
+
+class SnapshotTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'snapshot.zip')
+        self.source = SyntheticJira(issues=60, worklogs=2, custom_fields=2)
+        HttpMetrics.reset()
+
+    def tearDown(self):
+        Snapshot.close()
+        HttpMetrics.reset()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_request_key_ignores_base_url(self):
+        self.assertEqual('/rest/api/2/search?jql=x',
+                         request_key('https://jira.example.com/rest/api/2/search?jql=x'))
+        self.assertEqual('/rest/api/2/issue/A-1', request_key('http://localhost:3000/rest/api/2/issue/A-1'))
+
+    def test_record_and_replay(self):
+        with JiraServer(self.source) as server:
+            Snapshot.record(self.path)
+            expected = list(_jira.all_issues(server.base_url, 'project = BENCH0'))
+            worklog = _jira.get_worklog(server.base_url, 'BENCH0-1')
+            epic = _jira.get_issue(server.base_url, 'BENCH0-EPIC1')
+            Snapshot.close()
+            requests = server.requests
+
+        with zipfile.ZipFile(self.path) as archive:
+            index = json.loads(archive.read(INDEX_MEMBER).decode('utf-8'))
+            self.assertEqual(zipfile.ZIP_DEFLATED, archive.infolist()[0].compress_type)
+        self.assertEqual(requests, len(index['requests']))
+
+        Snapshot.replay(self.path)
+        self.assertEqual(expected, list(_jira.all_issues('https://other.example.com', 'project = BENCH0')))
+        self.assertEqual(worklog, _jira.get_worklog('https://other.example.com', 'BENCH0-1'))
+        self.assertEqual(epic, _jira.get_issue('https://other.example.com', 'BENCH0-EPIC1'))
+        self.assertEqual(requests, HttpMetrics.as_dict()['totals']['cache_hits'])
+
+    def test_replay_missing_request(self):
+        Snapshot.record(self.path)
+        Snapshot.close()
+        Snapshot.replay(self.path)
+        with self.assertRaises(KeyError):
+            _jira.get_issue('http://localhost:3000', 'BENCH0-1')
+
+    def test_replay_unsupported_version(self):
+        with zipfile.ZipFile(self.path, 'w') as archive:
+            archive.writestr(INDEX_MEMBER, json.dumps({'version': 99, 'requests': {}}))
+        with self.assertRaises(ValueError):
+            Snapshot.replay(self.path)
+        self.assertIsNone(Snapshot.mode)
+
+class SnapshotCLITestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'snapshot.zip')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _main(self, args):
+        outfile = os.path.join(self.tmp_dir, 'out.csv')
+        with redirect_stderr(io.StringIO() if PY3 else io.BytesIO()):
+            prog.main(args + ['-o', outfile])
+        with io.open(outfile, 'r', encoding='ascii') as f:
+            return f.read()
+
+    def test_replay_matches_recording(self):
+        source = SyntheticJira(issues=60)
+        with JiraServer(source) as server:
+            recorded = self._main(['-b', server.base_url, '-u', 'bench', '-t', 'token',
+                                   '--record', self.path, 'velocity', '--no-progress', 'BENCH0'])
+        self.assertIsNone(Snapshot.mode)
+        replayed = self._main(['--replay', self.path, 'velocity', '--no-progress', 'BENCH0'])
+        self.assertLess(0, len(recorded))
+        self.assertEqual(recorded, replayed)
+
+    def test_record_and_replay_exclusive(self):
+        with self.assertRaises(SystemExit):
+            with redirect_stderr(io.StringIO() if PY3 else io.BytesIO()):
+                prog.main(['--record', 'a.zip', '--replay', 'b.zip', 'velocity', 'BENCH0'])
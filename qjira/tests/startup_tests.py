@@ -0,0 +1,77 @@
+"""Import-time budget of the command line entry points.
+
+Each check runs in a fresh interpreter so modules already loaded by
+other tests do not hide an eager import.
+"""
+import os
+import sys
+import json
+import subprocess
+import unittest
+
+# seconds allowed for importing an entry point module
+IMPORT_TIME_BUDGET = 0.15
+
+HEAVY_MODULES = ['requests', 'dateutil', 'keyring', 'qjira.commands', 'qjira.jira']
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STARTUP_SCRIPT = '''
+import io
+import sys
+import json
+import time
+
+start = time.time()
+import {module} as prog
+elapsed = time.time() - start
+settings_loaded_on_import = prog.settings.loaded
+
+out = io.StringIO() if sys.version_info > (3,) else io.BytesIO()
+sys.stdout, sys.stderr = out, out
+try:
+    prog.main({args!r})
+except SystemExit:
+    pass
+sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+
+print(json.dumps({{
+    'elapsed': elapsed,
+    'settings_loaded_on_import': settings_loaded_on_import,
+    'loaded': [m for m in {heavy!r} if m in sys.modules]
+}}))
+'''
+
+def run_startup(module, args):
+    '''Import {module} and call main({args}) in a new interpreter.'''
+    env = dict(os.environ, QJIRA_TESTMODE='Testing')
+    env['PYTHONPATH'] = os.pathsep.join(
+        [PROJECT_ROOT] + [p for p in [os.environ.get('PYTHONPATH')] if p])
+    script = STARTUP_SCRIPT.format(module=module, args=args, heavy=HEAVY_MODULES)
+    output = subprocess.check_output([sys.executable, '-c', script],
+                                     cwd=PROJECT_ROOT, env=env)
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+class StartupTimeTestCase(unittest.TestCase):
+
+    def assertStartupBudget(self, module, args):
+        result = run_startup(module, args)
+        self.assertFalse(result['settings_loaded_on_import'])
+        self.assertListEqual([], result['loaded'])
+        self.assertLess(result['elapsed'], IMPORT_TIME_BUDGET)
+
+    def test_qjira_help(self):
+        self.assertStartupBudget('qjira.__main__', ['-h'])
+
+    def test_qjira_command_help(self):
+        self.assertStartupBudget('qjira.__main__', ['velocity', '-h'])
+
+    def test_qjira_argument_error(self):
+        self.assertStartupBudget('qjira.__main__', ['cycletime', '--no-progress'])
+
+    def test_qjira_dump_help(self):
+        self.assertStartupBudget('qjira.__dump__', ['-h'])
+
+    def test_myworklog_help(self):
+        self.assertStartupBudget('qjira.__myworklog__', ['-h'])
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""Synthetic Jira payloads at any scale.
+
+Issues are derived from their index and the seed alone, so any search
+page can be (re)built on demand and memory does not grow with the
+number of issues.
+"""
+import datetime
+import random
+
+try:
+    from urlparse import urlparse, parse_qs
+except ImportError:
+    from urllib.parse import urlparse, parse_qs
+
+SPRINT_FORMAT = ('com.atlassian.greenhopper.service.sprint.Sprint@be7f5f[id={id},rapidViewId=52,'
+                 'state={state},name={name},goal=<null>,startDate={start},endDate={end},'
+                 'completeDate={complete},sequence={id}]')
+
+SPRINT_DAYS = 14
+
+# issue ids are the index plus this base
+ISSUE_ID_BASE = 10000
+
+FIRST_SPRINT = datetime.datetime(2016, 1, 4, 10, 0, 0)
+
+# status workflow walked by the changelog, rework steps repeat the middle
+WORKFLOW = ['Open', 'Ready', 'In Progress', 'In Review', 'Done']
+
+ISSUE_TYPES = ['Story', 'Story', 'Story', 'Bug']
+
+PRIORITIES = ['Highest', 'High', 'Medium', 'Low']
+
+SEVERITIES = ['Critical', 'Major', 'Normal', 'Minor']
+
+def _jira_datetime(d):
+    return d.strftime('%Y-%m-%dT%H:%M:%S.000-0500')
+
+def _sprint_datetime(d):
+    return d.strftime('%Y-%m-%dT%H:%M:%S.000-05:00')
+
+class SyntheticJira(object):
+    '''Generates search pages, issues and worklogs of a fake Jira project.
+
+    Arguments:
+
+    issues - total number of issues returned by a search
+    projects - number of projects the issues are spread over
+    sprints_per_issue - sprints each issue is carried through
+    changelog_length - status changes per issue
+    worklogs - worklog entries per issue
+    custom_fields - extra customfield_NNNNN values per issue
+    authors - number of distinct assignees and worklog authors
+    seed - random seed, equal seeds give equal data
+    '''
+
+    def __init__(self, issues=1000, projects=4, sprints_per_issue=2,
+                 changelog_length=6, worklogs=3, custom_fields=10,
+                 authors=40, sprints=52, seed=0):
+        self.issues = issues
+        self.projects = ['BENCH{0}'.format(i) for i in range(max(projects, 1))]
+        self.sprints_per_issue = sprints_per_issue
+        self.changelog_length = changelog_length
+        self.worklogs = worklogs
+        self.custom_fields = custom_fields
+        self.authors = ['user.{0:03d}'.format(i) for i in range(max(authors, 1))]
+        self.sprints = max(sprints, sprints_per_issue)
+        self.seed = seed
+
+    def _random(self, idx):
+        return random.Random(self.seed * 1000003 + idx)
+
+    def _sprint_start(self, sprint_id):
+        return FIRST_SPRINT + datetime.timedelta(days=SPRINT_DAYS * sprint_id)
+
+    def sprint(self, sprint_id):
+        '''Return the encoded sprint string of the greenhopper plugin.'''
+        start = self._sprint_start(sprint_id)
+        end = start + datetime.timedelta(days=SPRINT_DAYS - 1)
+        return SPRINT_FORMAT.format(id=sprint_id + 1, state='CLOSED',
+                                    name='Bench Sprint {0}'.format(sprint_id + 1),
+                                    start=_sprint_datetime(start),
+                                    end=_sprint_datetime(end),
+                                    complete=_sprint_datetime(end))
+
+    def issue_key(self, idx):
+        return '{0}-{1}'.format(self.projects[idx % len(self.projects)], idx + 1)
+
+    def issue_id(self, idx):
+        return str(ISSUE_ID_BASE + idx)
+
+    def _changelog(self, rnd, begin, end):
+        '''Status changes from begin to end, plus a doc link change.'''
+        statuses = WORKFLOW[1:]
+        rework = max(self.changelog_length - len(statuses), 0)
+        path = statuses[:-1] + (['In Progress', 'In Review'] * rework)[:rework] + statuses[-1:]
+        step = (end - begin) / max(len(path), 1)
+        histories = []
+        current = 'Open'
+        for n, status in enumerate(path):
+            created = begin + step * n + datetime.timedelta(minutes=rnd.randint(0, 59))
+            histories.append({
+                'id': str(n),
+                'created': _jira_datetime(created),
+                'items': [{'field': 'status', 'fieldtype': 'jira', 'fieldId': 'status',
+                           'fromString': current, 'toString': status}]
+            })
+            current = status
+        histories.append({
+            'id': str(len(path)),
+            'created': _jira_datetime(begin),
+            'items': [{'field': 'ENG Design', 'fieldId': 'customfield_11101', 'fieldtype': 'custom',
+                       'fromString': None, 'toString': 'https://docs.example.com/DOC-1'}]
+        })
+        return {'startAt': 0, 'maxResults': len(histories), 'total': len(histories),
+                'histories': histories}
+
+    def issue(self, idx):
+        '''Return the JSON structure of issue number {idx}.'''
+        rnd = self._random(idx)
+        project = self.projects[idx % len(self.projects)]
+        first_sprint = rnd.randint(0, self.sprints - self.sprints_per_issue)
+        sprint_ids = list(range(first_sprint, first_sprint + self.sprints_per_issue))
+        begin = self._sprint_start(sprint_ids[0]) + datetime.timedelta(days=1)
+        end = self._sprint_start(sprint_ids[-1]) + datetime.timedelta(days=SPRINT_DAYS - 3)
+        assignee = self.authors[rnd.randint(0, len(self.authors) - 1)]
+        fields = {
+            'project': {'key': project, 'name': 'Bench Project {0}'.format(project)},
+            'issuetype': {'name': ISSUE_TYPES[idx % len(ISSUE_TYPES)]},
+            'status': {'name': 'Done'},
+            'summary': u'Synthetic issue {0} “benchmark”'.format(idx),
+            'assignee': {'name': assignee, 'displayName': assignee.replace('.', ' ').title()},
+            'priority': {'name': PRIORITIES[rnd.randint(0, len(PRIORITIES) - 1)], 'id': '2'},
+            'created': _jira_datetime(begin - datetime.timedelta(days=7)),
+            'updated': _jira_datetime(end),
+            'fixVersions': [{'id': '1{0}'.format(v), 'name': '7.{0}'.format(v),
+                             'archived': False, 'released': False}
+                            for v in range(1 + idx % 2)],
+            'customfield_10016': [self.sprint(s) for s in sprint_ids],
+            'customfield_10017': '{0}-EPIC{1}'.format(project, idx % 10),
+            'customfield_10109': float(rnd.choice([1, 2, 3, 5, 8])),
+            'customfield_11101': 'https://docs.example.com/DOC-1',
+            'customfield_14300': 'https://docs.example.com/DOC-2',
+            'customfield_10112': {'value': SEVERITIES[rnd.randint(0, len(SEVERITIES) - 1)], 'id': '10014'},
+            'customfield_10400': [{'value': 'Customer {0}'.format(c), 'id': str(c)}
+                                  for c in range(rnd.randint(0, 3))],
+            'timeoriginalestimate': 28800 * rnd.randint(1, 5),
+            'timespent': 14400 * rnd.randint(1, 8),
+        }
+        for n in range(self.custom_fields):
+            fields['customfield_2{0:04d}'.format(n)] = 'value {0}'.format(rnd.randint(0, 100))
+        return {
+            'id': self.issue_id(idx),
+            'key': self.issue_key(idx),
+            'fields': fields,
+            'changelog': self._changelog(rnd, begin, end)
+        }
+
+    def search_page(self, start_at=0, max_results=50):
+        '''Return a search result page.'''
+        stop = min(start_at + max_results, self.issues)
+        return {
+            'startAt': start_at,
+            'maxResults': max_results,
+            'total': self.issues,
+            'issues': [self.issue(idx) for idx in range(start_at, stop)]
+        }
+
+    def pages(self, max_results=50):
+        '''Generate every search result page.'''
+        for start_at in range(0, self.issues, max_results):
+            yield self.search_page(start_at, max_results)
+
+    def worklog(self, issue_key):
+        '''Return the worklog of {issue_key}.'''
+        idx = int(issue_key.rpartition('-')[2]) - 1
+        rnd = self._random(idx)
+        begin = self._sprint_start(idx % self.sprints)
+        worklogs = []
+        for n in range(self.worklogs):
+            author = self.authors[rnd.randint(0, len(self.authors) - 1)]
+            worklogs.append({
+                'id': str(idx * self.worklogs + n + 1),
+                'issueId': self.issue_id(idx),
+                'author': {'name': author, 'displayName': author},
+                'comment': 'synthetic work',
+                'started': _jira_datetime(begin + datetime.timedelta(days=n)),
+                'timeSpentSeconds': 3600 * rnd.randint(1, 8)
+            })
+        return {'startAt': 0, 'maxResults': len(worklogs), 'total': len(worklogs), 'worklogs': worklogs}
+
+    def all_worklogs(self):
+        '''Generate the worklogs of every issue.'''
+        for idx in range(self.issues):
+            for worklog in self.worklog(self.issue_key(idx))['worklogs']:
+                yield worklog
+
+    def epic(self, issue_key):
+        return {'key': issue_key, 'fields': {'customfield_10019': 'Epic {0}'.format(issue_key)}}
+
+    def issue_by_key(self, issue_key):
+        '''Return issue {issue_key}, including the epics issues link to.'''
+        number = issue_key.rpartition('-')[2]
+        if not number.isdigit():
+            return self.epic(issue_key)
+        return self.issue(int(number) - 1)
+
+    def issue_by_id(self, issue_id):
+        idx = int(issue_id) - ISSUE_ID_BASE
+        return self.issue(idx) if 0 <= idx < self.issues else None
+
+    def get_json(self, url, *args, **kwargs):
+        '''Answer a Jira REST url, same signature as qjira.jira._get_json.'''
+        parts = urlparse(url)
+        path = parts.path
+        if path.endswith('/search'):
+            qs = parse_qs(parts.query)
+            return self.search_page(int(qs.get('startAt', ['0'])[0]),
+                                    int(qs.get('maxResults', ['50'])[0]))
+        segments = path.rstrip('/').split('/')
+        if path.endswith('/worklog'):
+            return self.worklog(segments[-2])
+        return self.issue_by_key(segments[-1])
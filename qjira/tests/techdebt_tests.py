@@ -1,5 +1,9 @@
 #from . import test_context
 
+import datetime
+import os
+import shutil
+import tempfile
 import unittest
 
 from qjira.commands import TechDebtCommand
@@ -80,3 +84,70 @@ class TestTechDebt(test_util.MockJira, unittest.TestCase):
                               'story_points': '0',
                               'tech_debt': '0%'},
                              data[1])
+
+class TestTechDebtTrend(test_util.BaseTestCase, unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_file = os.path.join(self.tmp_dir, 'debt.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _row(self, project_name, issuetype, points, done, sprint=None):
+        row = {'issue_key': 'TEST-1', 'project_name': project_name, 'issuetype_name': issuetype,
+               'story_points': points, 'status_Done': done}
+        if sprint is not None:
+            start = datetime.date(2018, 1, 1) + datetime.timedelta(days=14 * sprint)
+            row.update({'sprint_name': 'Sprint {0}'.format(sprint), 'sprint_startDate': start,
+                        'sprint_completeDate': start + datetime.timedelta(days=14)})
+        return row
+
+    def _rows(self):
+        return [self._row('Test', 'Story', 3, datetime.date(2018, 1, 10)),
+                self._row('Test', 'Bug', 1, datetime.date(2018, 1, 20)),
+                self._row('Other', 'Bug', 2, datetime.date(2018, 2, 3)),
+                self._row('Test', 'Bug', 5, None)]
+
+    def _command(self, **kwargs):
+        return TechDebtCommand(project=['TEST'], base_url='localhost:3000', **kwargs)
+
+    def test_header(self):
+        self.assertEqual(['project_name', 'bucket', 'bug_points', 'tech_debt', 'story_points'],
+                         self._command(by='month').header_keys)
+
+    def test_invalid_bucket(self):
+        with self.assertRaises(ValueError):
+            self._command(by='week')
+
+    def test_by_month(self):
+        data = self._command(by='month').post_process(iter(self._rows()))
+        self.assertEqual([('2018-01', 'Test', '1', '3', '25%'),
+                          ('2018-01', 'Grand Total', '1', '3', '25%'),
+                          ('2018-02', 'Other', '2', '0', '100%'),
+                          ('2018-02', 'Grand Total', '2', '0', '100%')],
+                         [(r['bucket'], r['project_name'], r['bug_points'], r['story_points'], r['tech_debt'])
+                          for r in data])
+
+    def test_by_sprint(self):
+        rows = [self._row('Test', 'Story', 3, datetime.date(2018, 1, 20), sprint=1),
+                # pivoted row of an earlier sprint the issue was not completed in
+                self._row('Test', 'Story', 3, datetime.date(2018, 1, 20), sprint=0),
+                self._row('Test', 'Bug', 1, datetime.date(2018, 1, 3), sprint=0)]
+        command = self._command(by='sprint')
+        self.assertIn('customfield_10016', command.request_fields())
+        data = command.post_process(iter(rows))
+        self.assertEqual([('Sprint 0', 'Test', '100%'), ('Sprint 0', 'Grand Total', '100%'),
+                          ('Sprint 1', 'Test', '0%'), ('Sprint 1', 'Grand Total', '0%')],
+                         [(r['bucket'], r['project_name'], r['tech_debt']) for r in data])
+
+    def test_closed_buckets_cached(self):
+        first = self._command(by='month', cache_file=self.cache_file).post_process(iter(self._rows()))
+
+        # later run: only recent updates are requested, past months come from the cache
+        command = self._command(by='month', cache_file=self.cache_file)
+        self.assertRegex_(command.query, r'updated >= "\d{4}/\d{2}/\d{2}"')
+        self.assertEqual(first, command.post_process(iter([])))
+        # months in the cache are not counted twice
+        command = self._command(by='month', cache_file=self.cache_file)
+        self.assertEqual(first, command.post_process(iter(self._rows())))
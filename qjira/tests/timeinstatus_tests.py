@@ -0,0 +1,100 @@
+import datetime
+import unittest
+
+from qjira.commands import TimeInStatusCommand
+from qjira import time_in_status as tis
+
+from . import test_util
+
+def _history(created, from_status, to_status):
+    return {'created': created,
+            'items': [{'field': 'status', 'fromString': from_status, 'toString': to_status}]}
+
+def _issue(key, status, histories, created='2018-01-01T09:00:00.000-0600'):
+    return {'key': key,
+            'fields': {'project': {'key': 'TEST'}, 'issuetype': {'name': 'Story'},
+                       'status': {'name': status}, 'created': created},
+            'changelog': {'histories': histories}}
+
+# Monday Jan 1 to Friday Jan 12, 2018
+REWORKED = _issue('TEST-1', 'Done', [
+    _history('2018-01-02T09:00:00.000-0600', 'Open', 'In Progress'),
+    _history('2018-01-03T09:00:00.000-0600', 'In Progress', 'Open'),
+    _history('2018-01-08T09:00:00.000-0600', 'Open', 'In Progress'),
+    _history('2018-01-10T09:00:00.000-0600', 'In Progress', 'Done'),
+])
+
+IN_PROGRESS = _issue('TEST-2', 'In Progress', [
+    _history('2018-01-03T09:00:00.000-0600', 'Open', 'In Progress'),
+])
+
+class TestBusinessCalendar(unittest.TestCase):
+
+    def test_weekend_skipped(self):
+        calendar = tis.BusinessCalendar()
+        # Friday noon to Monday noon
+        self.assertEqual(1.0, calendar.days_between(datetime.datetime(2018, 1, 5, 12),
+                                                    datetime.datetime(2018, 1, 8, 12)))
+
+    def test_holidays(self):
+        calendar = tis.BusinessCalendar(holidays=tis.BusinessCalendar.parse_holidays('2018-01-01, 2018-01-06'))
+        self.assertFalse(calendar.is_business_day(datetime.date(2018, 1, 1)))
+        self.assertEqual(4, calendar.days_between(datetime.date(2018, 1, 1), datetime.date(2018, 1, 8)))
+
+    def test_matches_day_by_day_count(self):
+        calendar = tis.BusinessCalendar(weekend=[6], holidays=[datetime.date(2018, 2, 14)])
+        begin = datetime.date(2018, 1, 1)
+        for n in range(60):
+            end = begin + datetime.timedelta(days=n)
+            expected = sum(1 for i in range(n) if calendar.is_business_day(begin + datetime.timedelta(days=i)))
+            self.assertEqual(expected, calendar.days_between(begin, end))
+
+class TestStatusIntervals(unittest.TestCase):
+
+    def test_every_visit_counted(self):
+        changes = list(tis.status_changes(REWORKED['changelog']['histories']))
+        intervals = tis.status_intervals(changes, created=tis.parse_time(REWORKED['fields']['created']))
+        totals = tis.time_in_status(intervals)
+        self.assertEqual(['Open', 'In Progress'], list(totals.keys()))
+        self.assertEqual(6.0, totals['Open'])
+        self.assertEqual(3.0, totals['In Progress'])
+
+    def test_current_status_until(self):
+        intervals = list(tis.status_intervals([], created=datetime.datetime(2018, 1, 1),
+                                              status='Open', until=datetime.datetime(2018, 1, 3)))
+        self.assertEqual([('Open', datetime.datetime(2018, 1, 1), datetime.datetime(2018, 1, 3))], intervals)
+
+class TestTimeInStatusCommand(test_util.MockJira, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_mock_jira()
+        self.json_response = {'total': 2, 'issues': [REWORKED, IN_PROGRESS]}
+
+    def tearDown(self):
+        self.teardown_mock_jira()
+
+    def _command(self, **kwargs):
+        return TimeInStatusCommand(base_url='localhost:3000', project=['TEST'],
+                                   as_of=datetime.datetime(2018, 1, 12, 9), **kwargs)
+
+    def test_per_issue(self):
+        command = self._command()
+        data = list(command.execute())
+        self.assertEqual(['TEST-1', 'TEST-2'], [r['issue_key'] for r in data])
+        self.assertEqual({'days_Open': 6.0, 'days_InProgress': 3.0},
+                         {k: data[0][k] for k in ('days_Open', 'days_InProgress')})
+        # current status counts until as_of, Done does not
+        self.assertNotIn('days_Done', data[0])
+        self.assertEqual(9.0, data[1]['days_InProgress'])
+        self.assertEqual(['status_name', 'days_Open', 'days_InProgress'], command.header_keys[-3:])
+
+    def test_business_days(self):
+        data = list(self._command(business_days=True).execute())
+        self.assertEqual(4.0, data[0]['days_Open'])
+        self.assertEqual(7.0, data[1]['days_InProgress'])
+
+    def test_aggregate(self):
+        command = self._command(aggregate=True)
+        data = list(command.execute())
+        self.assertEqual(command.AGGREGATE_HEADER, command.header_keys)
+        self.assertEqual({'status': 'In Progress', 'issues': 2, 'total_days': 12.0, 'mean_days': 6.0}, data[1])
@@ -0,0 +1,51 @@
+import sys
+import io
+import unittest
+import time
+
+from qjira.timing import Timing
+
+PY3 = sys.version_info > (3,)
+
+class TimingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        Timing.reset(enabled=True)
+
+    def tearDown(self):
+        Timing.reset()
+
+    def test_disabled_returns_iterable(self):
+        Timing.reset()
+        rows = [1, 2, 3]
+        self.assertIs(rows, Timing.timed('rows', rows))
+        with Timing.stage('noop'):
+            pass
+        self.assertEqual({}, Timing.stages)
+
+    def test_timed_counts_items(self):
+        self.assertEqual([1, 2, 3], list(Timing.timed('rows', [1, 2, 3])))
+        # one call per item, plus the exhausting call
+        self.assertEqual(4, Timing.stages['rows']['calls'])
+        self.assertEqual(3, Timing.stages['rows']['items'])
+
+    def test_nested_stage_time_is_exclusive(self):
+        def slow_source():
+            for i in range(2):
+                with Timing.stage('source', count=1):
+                    time.sleep(0.02)
+                yield i
+
+        list(Timing.timed('consumer', slow_source()))
+        self.assertGreaterEqual(Timing.stages['source']['wall'], 0.04)
+        self.assertLess(Timing.stages['consumer']['wall'], 0.02)
+        self.assertEqual(2, Timing.stages['source']['items'])
+
+    def test_report(self):
+        with Timing.stage('writer', count=5):
+            pass
+        out = io.StringIO() if PY3 else io.BytesIO()
+        Timing.write_report(out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(3, len(lines))
+        self.assertEqual(['writer', '1', '5'], lines[1].split()[:3])
@@ -1,5 +1,8 @@
 import unittest
 import datetime
+import os
+import shutil
+import tempfile
 
 from qjira.commands import VelocityCommand
 from qjira.config import settings
@@ -71,6 +74,19 @@ class TestVelocity(test_util.MockJira, unittest.TestCase):
             'completed_story_points': 3.0
         }, data[1])
 
+    def test_process_limit_keeps_latest_sprints(self):
+        self.json_response = {
+            'total': 2,
+            'issues': [
+                test_data.multiSprintStory(),
+                test_data.singleSprintStory()
+            ]
+        }
+        command = VelocityCommand(base_url='localhost:3000', project=['TEST'], limit=1)
+        data = list(command.execute())
+        self.assertEqual(len(data), 1)
+        self.assertEqual(data[0]['sprint_name'], 'Chambers Sprint 10')
+
     def test_process_bugs_in_stories_only(self):
         '''Test that bug points calculations are constrained to story-related sprints.
 
@@ -253,3 +269,84 @@ class TestVelocityTimeOriginalEstimate(test_util.MockJira, unittest.TestCase):
             'timeoriginalestimate': 28800,
             'completed_timeoriginalestimate': 28800
         }, data[1])
+
+class TestVelocityAggregation(unittest.TestCase):
+
+    def setUp(self):
+        self.command = VelocityCommand(base_url='localhost:3000', project=['TEST'], forecast=True)
+
+    def _row(self, issue_key, sprint_id, issuetype='Story', points=1.0):
+        return {
+            'issue_key': issue_key,
+            'issuetype_name': issuetype,
+            'project_key': 'TEST',
+            'sprint_id': sprint_id,
+            'sprint_name': 'Sprint {0}'.format(sprint_id),
+            'story_points': points
+        }
+
+    def test_streams_rows_into_sprint_accumulators(self):
+        consumed = []
+        def rows():
+            for n in range(100):
+                consumed.append(n)
+                yield self._row('TEST-{0}'.format(n), str(n % 3), points=2.0)
+        results = self.command._reduce_process(rows())
+        self.assertEqual(100, len(consumed))
+        self.assertEqual(3, len(results))
+        self.assertEqual(200.0, sum(r['story_points'] for r in results))
+        self.assertEqual(200.0, sum(r['planned_story_points'] for r in results))
+
+    def test_sprint_filter_applied_after_all_rows(self):
+        rows = [self._row('TEST-1', '1', issuetype='Bug', points=5.0),
+                self._row('TEST-2', '1', points=3.0),
+                self._row('TEST-3', '2', issuetype='Bug', points=8.0)]
+        results = self.command._reduce_process(iter(rows))
+        self.assertEqual(['Sprint 1'], [r['sprint_name'] for r in results])
+        self.assertEqual(8.0, results[0]['story_points'])
+
+class TestVelocityCache(test_util.BaseTestCase, test_util.MockJira, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_mock_jira()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_file = os.path.join(self.tmp_dir, 'velocity.json')
+
+    def tearDown(self):
+        self.teardown_mock_jira()
+        shutil.rmtree(self.tmp_dir)
+
+    def _command(self, **kwargs):
+        return VelocityCommand(base_url='localhost:3000', project=['TEST'], cache_file=self.cache_file, **kwargs)
+
+    def test_closed_sprints_are_cached(self):
+        self.json_response = {
+            'total': 2,
+            'issues': [
+                test_data.multiSprintStory(),
+                test_data.singleSprintStory()
+            ]
+        }
+        first = list(self._command().execute())
+        self.assertEqual(2, len(first))
+        self.assertNotRegex_(self._actual_url, 'openSprints')
+
+        # nothing changed in Jira, closed sprints come from the cache
+        self.json_response = {'total': 0, 'issues': []}
+        command = self._command()
+        second = list(command.execute())
+        self.assertEqual(first, second)
+        self.assertIsInstance(second[0]['sprint_startDate'], datetime.date)
+        query = command._create_query_string()
+        self.assertRegex_(query, r'sprint in openSprints\(\)')
+        # cached sprints are not listed, the query stays bounded
+        self.assertNotRegex_(query, r'sprint not in')
+        self.assertRegex_(query, r'updated >= "\d{4}/\d{2}/\d{2}"')
+
+    def test_cache_keyed_by_include_bugs(self):
+        self.json_response = {
+            'total': 1,
+            'issues': [test_data.singleSprintStory()]
+        }
+        list(self._command().execute())
+        self.assertNotRegex_(self._command(include_bugs=True)._create_query_string(), 'openSprints')
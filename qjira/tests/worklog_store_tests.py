@@ -0,0 +1,182 @@
+import datetime
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    from contextlib import redirect_stderr
+except ImportError:
+    from contextlib2 import redirect_stderr
+
+try:
+    from urlparse import urlparse, parse_qs
+except ImportError:
+    from urllib.parse import urlparse, parse_qs
+
+import qjira.jira as _jira
+from qjira.commands import WorklogCommand
+from qjira.config import settings
+from qjira.worklog_store import WorklogStore
+
+def _worklog(worklog_id, issue_id, name, started, seconds):
+    return {'id': str(worklog_id), 'issueId': str(issue_id), 'author': {'name': name},
+            'started': started, 'timeSpentSeconds': seconds}
+
+class FakeWorklogJira(object):
+    '''Answers the worklog sync requests from {worklogs} and {deleted}.'''
+
+    def __init__(self, page_size=2, search_page_size=50):
+        self.worklogs = {}
+        self.deleted = []
+        self.updated = {}
+        self.page_size = page_size
+        self.search_page_size = search_page_size
+        self.missing_issues = set()
+        self.requests = []
+        self.now = 1000
+
+    def put(self, worklog):
+        self.now += 1
+        self.worklogs[worklog['id']] = worklog
+        self.updated[worklog['id']] = self.now
+
+    def delete(self, worklog_id):
+        self.now += 1
+        del self.worklogs[worklog_id]
+        del self.updated[worklog_id]
+        self.deleted.append((worklog_id, self.now))
+
+    def get_json(self, url, username=None, password=None, **kwargs):
+        self.requests.append(url)
+        parts = urlparse(url)
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        if parts.path.endswith('/search'):
+            ids = [i for i in query['jql'][len('id in ('):-1].split(',') if i not in self.missing_issues]
+            start_at = int(query['startAt'])
+            max_results = min(int(query['maxResults']), self.search_page_size)
+            return {'startAt': start_at, 'total': len(ids),
+                    'issues': [{'id': i, 'key': 'TEST-{0}'.format(i)} for i in ids[start_at:start_at + max_results]]}
+        since = int(query['since'])
+        if parts.path.endswith('/deleted'):
+            changes = [(i, t) for i, t in self.deleted if t >= since]
+        else:
+            changes = sorted(((i, t) for i, t in self.updated.items() if t >= since), key=lambda x: x[1])
+        page = changes[:self.page_size]
+        last_page = len(changes) <= self.page_size
+        until = page[-1][1] + 1 if page else since
+        payload = {'values': [{'worklogId': int(i), 'updatedTime': t} for i, t in page],
+                   'since': since, 'until': until, 'lastPage': last_page}
+        if not last_page:
+            payload['nextPage'] = '{0}://{1}{2}?since={3}'.format(parts.scheme, parts.netloc, parts.path, until)
+        return payload
+
+    def post_json(self, url, body, username=None, password=None, **kwargs):
+        self.requests.append(url)
+        return [self.worklogs[str(i)] for i in body['ids'] if str(i) in self.worklogs]
+
+
+class WorklogStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'worklogs.json')
+        self.jira = FakeWorklogJira()
+        self._get_json = _jira._get_json
+        self._post_json = _jira._post_json
+        _jira._get_json = self.jira.get_json
+        _jira._post_json = self.jira.post_json
+        self.jira.put(_worklog(1, 10, 'andrew.hamlin', '2018-04-05T10:39:00.000-0400', 14400))
+        self.jira.put(_worklog(2, 10, 'someone.else', '2018-04-05T10:39:00.000-0400', 28800))
+        self.jira.put(_worklog(3, 11, 'andrew.hamlin', '2018-04-06T10:39:00.000-0400', 28800))
+
+    def tearDown(self):
+        _jira._get_json = self._get_json
+        _jira._post_json = self._post_json
+        shutil.rmtree(self.tmp_dir)
+
+    def _sync(self, start_date=None):
+        store = WorklogStore(self.path, 'http://localhost:3000')
+        store.sync(start_date)
+        store.save()
+        return store
+
+    def test_full_sync(self):
+        store = self._sync()
+        self.assertEqual(3, len(store))
+        rows = sorted(store.rows(authors={'andrew.hamlin'}), key=lambda r: r['worklog_started'])
+        self.assertEqual([('TEST-10', datetime.date(2018, 4, 5), 14400), ('TEST-11', datetime.date(2018, 4, 6), 28800)],
+                         [(r['issue_key'], r['worklog_started'], r['worklog_timeSpentSeconds']) for r in rows])
+        self.assertEqual(1, len(list(store.rows(start_date=datetime.date(2018, 4, 6)))))
+
+    def test_batches(self):
+        _jira.WORKLOG_LIST_MAX_IDS, max_ids = 2, _jira.WORKLOG_LIST_MAX_IDS
+        try:
+            self._sync()
+        finally:
+            _jira.WORKLOG_LIST_MAX_IDS = max_ids
+        self.assertEqual(2, len([u for u in self.jira.requests if u.endswith('/worklog/list')]))
+
+    def test_issue_keys_paged(self):
+        self.jira.search_page_size = 1
+        store = self._sync()
+        self.assertEqual(['TEST-10', 'TEST-11'], sorted(set(r['issue_key'] for r in store.rows())))
+        self.assertEqual(2, len([u for u in self.jira.requests if '/search' in u]))
+
+    def test_unresolved_issue_ids_logged(self):
+        self.jira.missing_issues.add('11')
+        err = io.StringIO()
+        with redirect_stderr(err):
+            store = self._sync()
+        self.assertEqual(['11', 'TEST-10'], sorted(set(r['issue_key'] for r in store.rows())))
+        self.assertIn('No issue key found for issue ids: 11', err.getvalue())
+
+    def test_incremental_sync(self):
+        self._sync()
+        self.jira.requests = []
+        self.jira.put(_worklog(3, 11, 'andrew.hamlin', '2018-04-06T10:39:00.000-0400', 3600))
+        self.jira.put(_worklog(4, 12, 'andrew.hamlin', '2018-04-07T10:39:00.000-0400', 7200))
+        self.jira.delete('2')
+
+        store = self._sync()
+        self.assertEqual(3, len(store))
+        self.assertEqual(['TEST-10', 'TEST-11', 'TEST-12'], sorted(r['issue_key'] for r in store.rows()))
+        self.assertEqual(3600, [r for r in store.rows() if r['issue_key'] == 'TEST-11'][0]['worklog_timeSpentSeconds'])
+        # only issue 12 is new
+        searches = [u for u in self.jira.requests if '/search' in u]
+        self.assertEqual(1, len(searches))
+        self.assertIn('12', parse_qs(urlparse(searches[0]).query)['jql'][0])
+
+    def test_earlier_start_date_syncs_again(self):
+        store = self._sync(datetime.date(2018, 4, 6))
+        self.assertTrue(store._covers(datetime.date(2018, 4, 7)))
+        self.assertFalse(store._covers(datetime.date(2018, 4, 5)))
+        self.assertFalse(store._covers(None))
+        self.assertEqual(3, len(self._sync()))
+
+    def test_worklog_command(self):
+        command = WorklogCommand(base_url='http://localhost:3000', author=['Andrew.Hamlin'],
+                                 worklog_store=self.path, total_by_username=True)
+        data = list(command.execute())
+        self.assertEqual([('2018-04-05', '0.500', 'TEST-10'), ('2018-04-06', '1.000', 'TEST-11'),
+                          (str(datetime.date.max), '1.500', 'Total of entire time period')],
+                         [(r['worklog_started'], r['worklog_timeSpentDays'], r['issue_keys']) for r in data])
+        self.assertFalse([u for u in self.jira.requests if '/issue/' in u])
+
+    def test_worklog_query_not_applied(self):
+        query = settings.get('worklog', 'query') if settings.has_option('worklog', 'query') else None
+        settings.set('worklog', 'query', 'project = OTHER')
+        try:
+            command = WorklogCommand(base_url='http://localhost:3000', author=['Andrew.Hamlin'],
+                                     worklog_store=self.path)
+            err = io.StringIO()
+            with redirect_stderr(err):
+                data = list(command.execute())
+        finally:
+            if query is None:
+                settings.remove_option('worklog', 'query')
+            else:
+                settings.set('worklog', 'query', query)
+        self.assertEqual(2, len(data))
+        self.assertIn('The [worklog] query is not applied', err.getvalue())
@@ -1,6 +1,14 @@
+import re
 import unittest
 import datetime
 
+try:
+    from urlparse import urlparse, parse_qs
+except ImportError:
+    from urllib.parse import urlparse, parse_qs
+
+import qjira.jira as _jira
+
 from qjira.commands import WorklogCommand
 from qjira.config import settings
 
@@ -147,3 +155,126 @@ class TestWorklogMultiAuthorFilterTestCase(test_util.MockJira, unittest.TestCase
             'worklog_timeSpentDays':'1.000',
             'worklog_started':str(datetime.date(2018, 4, 5))
         }, data[1])
+
+def _worklog(name, started, seconds):
+    return {"author": {"name": name, "displayName": name},
+            "started": started,
+            "timeSpentSeconds": seconds}
+
+class TestWorklogFilterTestCase(test_util.MockJira, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_mock_jira()
+        self.command_under_test = WorklogCommand(base_url='localhost:3000', author=['Andrew.Hamlin'],
+                                                 start_date=datetime.date(2018, 4, 5),
+                                                 end_date=datetime.date(2018, 4, 6),
+                                                 total_by_username=True)
+        self.worklogs = {
+            'total': 5,
+            'worklogs': [
+                _worklog('andrew.hamlin', '2018-04-04T10:39:00.000-0400', 28800),
+                _worklog('andrew.hamlin', '2018-04-05T10:39:00.000-0400', 14400),
+                _worklog('andrew.hamlin', '2018-04-06T23:39:00.000-0400', 28800),
+                _worklog('andrew.hamlin', '2018-04-07T10:39:00.000-0400', 28800),
+                _worklog('someone.else', '2018-04-05T10:39:00.000-0400', 28800),
+            ]
+        }
+
+    def tearDown(self):
+        self.teardown_mock_jira()
+
+    def test_worklogs_filtered_before_flatten(self):
+        self.json_response = (x for x in [self.worklogs])
+        overlays = list(self.command_under_test.pre_process([{'issue_key': 'TEST-1'}]))
+        self.assertEqual(['2018-04-05T10:39:00.000-0400', '2018-04-06T23:39:00.000-0400'],
+                         [y['worklog']['started'] for y in overlays])
+
+    def test_process(self):
+        self.json_response = (x for x in [{
+            'total': 1,
+            'issues': [test_data.singleSprintStory()]
+        }, self.worklogs])
+        data = list(self.command_under_test.execute())
+        self.assertEqual([('2018-04-05', '0.500'), ('2018-04-06', '1.000'), (str(datetime.date.max), '1.500')],
+                         [(r['worklog_started'], r['worklog_timeSpentDays']) for r in data])
+        self.assertEqual('Total of entire time period', data[2]['issue_keys'])
+
+    def test_author_without_name(self):
+        rows = [{'issue_key': 'TEST-1', 'worklog_author_name': name, 'worklog_started': datetime.date(2018, 4, 5),
+                 'worklog_timeSpentSeconds': 28800} for name in ('andrew.hamlin', None)]
+        data = self.command_under_test.post_process(rows)
+        self.assertEqual([None, None, 'andrew.hamlin', 'andrew.hamlin'], [r['worklog_author_name'] for r in data])
+
+class TestWorklogTeamTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._original_get_json = _jira._get_json
+        _jira._get_json = self.get_json
+        self.requests = []
+        self.issues = {
+            'alice': ['TEST-1', 'TEST-2'],
+            'bob': ['TEST-2'],
+            'carol': [],
+        }
+        self.worklogs = {
+            'TEST-1': [_worklog('alice', '2018-04-02T10:00:00.000-0400', 28800),
+                       _worklog('mallory', '2018-04-02T10:00:00.000-0400', 28800)],
+            'TEST-2': [_worklog('alice', '2018-04-03T10:00:00.000-0400', 14400),
+                       _worklog('bob', '2018-04-03T10:00:00.000-0400', 28800),
+                       _worklog('bob', '2018-04-09T10:00:00.000-0400', 28800)],
+        }
+
+    def tearDown(self):
+        _jira._get_json = self._original_get_json
+
+    def get_json(self, url, *args, **kwargs):
+        self.requests.append(url)
+        parts = urlparse(url)
+        if parts.path.endswith('/search'):
+            jql = parse_qs(parts.query)['jql'][0]
+            authors = re.search(r'worklogAuthor in \(([^)]*)\)', jql).group(1).split(', ')
+            keys = sorted(set(k for a in authors for k in self.issues[a]))
+            return {'total': len(keys), 'issues': [{'key': k, 'fields': {}} for k in keys]}
+        return {'worklogs': self.worklogs[parts.path.split('/')[-2]]}
+
+    def _command(self, **kwargs):
+        return WorklogCommand(base_url='localhost:3000', author=['Alice', 'Bob', 'Carol'], team=True,
+                              start_date=datetime.date(2018, 4, 2), end_date=datetime.date(2018, 4, 4), **kwargs)
+
+    def test_timesheet(self):
+        command = self._command(workers=4)
+        data = list(command.execute())
+        self.assertEqual(['worklog_author_name', '2018-04-02', '2018-04-03', '2018-04-04', 'worklog_timeSpentDays'],
+                         command.header_keys)
+        self.assertEqual([
+            ['alice', '1.000', '0.500', '0.000', '1.500'],
+            ['bob', '0.000', '1.000', '0.000', '1.000'],
+            ['carol', '0.000', '0.000', '0.000', '0.000'],
+        ], [list(r.values()) for r in data])
+
+    def test_shared_issues_fetched_once(self):
+        list(self._command(shard_size=2).execute())
+        searches = [u for u in self.requests if '/search' in u]
+        worklogs = [u for u in self.requests if u.endswith('/worklog')]
+        self.assertEqual(2, len(searches))
+        self.assertEqual(['localhost:3000/rest/api/2/issue/TEST-1/worklog',
+                          'localhost:3000/rest/api/2/issue/TEST-2/worklog'], sorted(worklogs))
+
+    def test_requires_author(self):
+        with self.assertRaises(TypeError):
+            WorklogCommand(base_url='localhost:3000', team=True, restrict_to_username=False)
+
+    def test_limit_keeps_first_authors(self):
+        data = list(self._command(limit=2).execute())
+        self.assertEqual(['alice', 'bob'], [r['worklog_author_name'] for r in data])
+
+    def test_rejects_total(self):
+        with self.assertRaises(ValueError):
+            self._command(total_by_username=True)
+
+    def test_empty_timesheet_without_end_date(self):
+        command = WorklogCommand(base_url='localhost:3000', author=['Alice'], team=True,
+                                 start_date=datetime.date(2018, 4, 2))
+        data = command._timesheet([])
+        self.assertEqual(['worklog_author_name', '2018-04-02', 'worklog_timeSpentDays'], command.header_keys)
+        self.assertEqual([['alice', '0.000', '0.000']], [list(r.values()) for r in data])
@@ -1,11 +1,33 @@
 
 import six
 
+# bounded table of shared strings, see _intern()
+INTERN_TABLE_SIZE = 65536
+
+INTERN_MAX_LENGTH = 64
+
+_intern_table = {}
+
+def _intern(s):
+    '''Return the shared copy of short string {s}, so strings repeated
+    across issues (column names, status and project names) are stored
+    once. Once the table is full new strings are returned as is. Only
+    strings with few distinct values belong here, the table lives as long
+    as the process.'''
+    if len(s) > INTERN_MAX_LENGTH:
+        return s
+    shared = _intern_table.get(s)
+    if shared is None:
+        if len(_intern_table) >= INTERN_TABLE_SIZE:
+            return s
+        shared = _intern_table[s] = s
+    return shared
+
 def _encode(encoding, s):
     return six.text_type(s).encode(encoding, errors='ignore').decode(encoding)
 
 def _generate_name(*args):
-    return '_'.join([six.text_type(a) for a in args])
+    return _intern('_'.join([six.text_type(a) for a in args]))
 
 def _isstring(s):
     return isinstance(s, six.string_types)
@@ -0,0 +1,116 @@
+'''Time in status: the intervals an issue spent in each status, built from
+its full changelog, and their durations in calendar or business days.
+
+Unlike the cycle time columns, which keep one date per rule, every visit
+of a status is counted, so an issue moved back to Open does not count the
+time it waited there as In Progress.
+'''
+import bisect
+import datetime
+from collections import OrderedDict
+
+from dateutil import parser as date_parser
+
+SECONDS_PER_DAY = 86400.0
+
+
+class BusinessCalendar(object):
+    '''Working days: every day but the {weekend} weekdays (0 is Monday) and
+    the {holidays} dates.
+
+    Times are mapped to a count of business days since the epoch, so the
+    business days between two times are a subtraction, constant time
+    except for a bisect of the holidays.
+    '''
+
+    def __init__(self, weekend=(5, 6), holidays=()):
+        self.weekend = frozenset(weekend)
+        workdays = [d not in self.weekend for d in range(7)]
+        # _week_prefix[n] - business days in the first n days of a week
+        self._week_prefix = [sum(workdays[:n]) for n in range(8)]
+        self._holiday_set = frozenset(h.toordinal() for h in holidays
+                                      if h.weekday() not in self.weekend)
+        self._holidays = sorted(self._holiday_set)
+
+    @staticmethod
+    def parse_holidays(value):
+        '''Return the dates of comma separated YYYY-MM-DD {value}.'''
+        return [datetime.datetime.strptime(h.strip(), '%Y-%m-%d').date()
+                for h in value.split(',') if h.strip()]
+
+    def is_business_day(self, d):
+        return d.weekday() not in self.weekend and d.toordinal() not in self._holiday_set
+
+    def _days_before(self, d):
+        '''Business days from the epoch up to, not including, date {d}.'''
+        # ordinal 1 (0001-01-01) is a Monday
+        weeks, rest = divmod(d.toordinal() - 1, 7)
+        return weeks * self._week_prefix[7] + self._week_prefix[rest] - \
+            bisect.bisect_left(self._holidays, d.toordinal())
+
+    def position(self, t):
+        '''Return the business days from the epoch to time {t}.'''
+        if isinstance(t, datetime.datetime):
+            d = t.date()
+            position = self._days_before(d)
+            if self.is_business_day(d):
+                position += (t - datetime.datetime.combine(d, datetime.time())).total_seconds() / SECONDS_PER_DAY
+            return position
+        return self._days_before(t)
+
+    def days_between(self, begin, end):
+        return self.position(end) - self.position(begin)
+
+
+def calendar_days_between(begin, end):
+    '''Return the (fractional) calendar days from {begin} to {end}.'''
+    return (end - begin).total_seconds() / SECONDS_PER_DAY
+
+
+def parse_time(value):
+    '''Return the naive local time of a Jira timestamp, the wall clock of
+    the Jira user decides which day a change falls on.'''
+    return date_parser.parse(value).replace(tzinfo=None)
+
+
+def status_changes(histories):
+    '''Generate (time, from status, to status) of the status changes in
+    changelog {histories}, in time order.'''
+    # Jira returns the changelog in time order, the sort is then linear
+    for h in sorted(histories, key=lambda x: x['created']):
+        for item in h['items']:
+            if item['field'] == 'status':
+                yield parse_time(h['created']), item.get('fromString'), item.get('toString')
+
+
+def status_intervals(changes, created=None, status=None, until=None):
+    '''Generate (status, begin, end) of the statuses of an issue.
+
+    Arguments:
+
+    changes - (time, from status, to status) in time order
+    created - creation time, begins the interval of the first status
+    status - current status, used when there are no changes
+    until - ends the interval of the current status, None leaves it out
+    '''
+    current, begin = None, created
+    for t, from_status, to_status in changes:
+        if current is None:
+            current = from_status
+        if current and begin is not None:
+            yield current, begin, t
+        current, begin = to_status, t
+    if current is None:
+        current = status
+    if current and begin is not None and until is not None and until > begin:
+        yield current, begin, until
+
+
+def time_in_status(intervals, calendar=None):
+    '''Return OrderedDict of status to days spent, statuses in order of
+    first visit. A {calendar} counts business days only.'''
+    days_between = calendar.days_between if calendar else calendar_days_between
+    totals = OrderedDict()
+    for status, begin, end in intervals:
+        totals[status] = totals.get(status, 0.0) + days_between(begin, end)
+    return totals
@@ -0,0 +1,175 @@
+'''Lightweight per-stage timing of a command run.
+
+Stages nest, e.g. the writer pulls rows through post_process which pulls
+through pre_process and the HTTP requests. Each stage records its own
+(exclusive) wall and CPU time, nested stages are subtracted. Every thread
+nests its own stages, e.g. concurrent worklog requests.
+'''
+import sys
+import json
+import time
+import timeit
+import threading
+from collections import OrderedDict
+
+try:
+    _cpu_time = time.process_time
+except AttributeError:
+    _cpu_time = time.clock
+
+_wall_time = timeit.default_timer
+
+
+class _Frame(object):
+    __slots__ = ('name', 'wall', 'cpu', 'child_wall', 'child_cpu')
+
+    def __init__(self, name):
+        self.name = name
+        self.child_wall = 0.0
+        self.child_cpu = 0.0
+        self.wall = _wall_time()
+        self.cpu = _cpu_time()
+
+
+class _Stage(object):
+    '''Context manager timing a block of code as a named stage.'''
+
+    __slots__ = ('name', 'count', 'frame')
+
+    def __init__(self, name, count):
+        self.name = name
+        self.count = count
+
+    def __enter__(self):
+        self.frame = Timing._enter(self.name)
+        return self
+
+    def __exit__(self, *args):
+        Timing._exit(self.frame, self.count)
+        return False
+
+
+class _NullStage(object):
+    '''Does nothing, returned when timing is disabled.'''
+
+    count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+
+class Timing:
+    '''Simple stage timer'''
+
+    # globals
+    enabled = False
+    stages = OrderedDict()
+    _local = threading.local()
+    _lock = threading.Lock()
+    _started = None
+
+    @staticmethod
+    def reset(enabled=False):
+        '''Discard collected timings, enable or disable collection.'''
+        Timing.enabled = enabled
+        Timing.stages = OrderedDict()
+        Timing._local = threading.local()
+        Timing._started = _wall_time() if enabled else None
+
+    @staticmethod
+    def stage(name, count=0):
+        '''Return a context manager timing the block as stage {name}.
+
+        The {count} of items processed may be updated within the block.'''
+        if not Timing.enabled:
+            return _NULL_STAGE
+        return _Stage(name, count)
+
+    @staticmethod
+    def timed(name, iterable):
+        '''Return {iterable}, timing every item pulled from it as stage {name}.'''
+        if not Timing.enabled:
+            return iterable
+        return Timing._timed(name, iter(iterable))
+
+    @staticmethod
+    def _timed(name, iterator):
+        while True:
+            frame = Timing._enter(name)
+            count = 0
+            try:
+                item = next(iterator)
+                count = 1
+            except StopIteration:
+                return
+            finally:
+                Timing._exit(frame, count)
+            yield item
+
+    @staticmethod
+    def _stack():
+        '''Return the stage stack of the current thread.'''
+        stack = getattr(Timing._local, 'stack', None)
+        if stack is None:
+            stack = Timing._local.stack = []
+        return stack
+
+    @staticmethod
+    def _enter(name):
+        frame = _Frame(name)
+        Timing._stack().append(frame)
+        return frame
+
+    @staticmethod
+    def _exit(frame, count):
+        wall = _wall_time() - frame.wall
+        cpu = _cpu_time() - frame.cpu
+        stack = Timing._stack()
+        if stack and stack[-1] is frame:
+            stack.pop()
+        if stack:
+            parent = stack[-1]
+            parent.child_wall += wall
+            parent.child_cpu += cpu
+
+        with Timing._lock:
+            stats = Timing.stages.get(frame.name)
+            if stats is None:
+                stats = Timing.stages[frame.name] = {'calls': 0, 'items': 0, 'wall': 0.0, 'cpu': 0.0}
+            stats['calls'] += 1
+            stats['items'] += count
+            stats['wall'] += max(wall - frame.child_wall, 0.0)
+            stats['cpu'] += max(cpu - frame.child_cpu, 0.0)
+
+    @staticmethod
+    def as_dict():
+        '''Return the collected timings, including the total run time.'''
+        total = _wall_time() - Timing._started if Timing._started else 0.0
+        return OrderedDict([
+            ('total_wall', total),
+            ('stages', OrderedDict((k, dict(v)) for k, v in Timing.stages.items()))
+        ])
+
+    @staticmethod
+    def write_report(f=None):
+        '''Print a per-stage breakdown, slowest stage first.'''
+        f = f or sys.stderr
+        report = Timing.as_dict()
+        f.write('{0:<20} {1:>10} {2:>10} {3:>10} {4:>10}\n'.format(
+            'Stage', 'Calls', 'Items', 'Wall (s)', 'CPU (s)'))
+        for name, stats in sorted(report['stages'].items(),
+                                  key=lambda x: x[1]['wall'], reverse=True):
+            f.write('{0:<20} {1:>10} {2:>10} {3:>10.3f} {4:>10.3f}\n'.format(
+                name, stats['calls'], stats['items'], stats['wall'], stats['cpu']))
+        f.write('{0:<20} {1:>10} {2:>10} {3:>10.3f}\n'.format(
+            'total', '', '', report['total_wall']))
+
+    @staticmethod
+    def write_json(f):
+        json.dump(Timing.as_dict(), f, indent=4, separators=(',', ': '))
+        f.write('\n')
@@ -1,6 +1,7 @@
 import csv
 
 from .text_utils import _encode
+from .timing import Timing
 
 
 def write(f, command, encoding, delimiter=','):
@@ -26,4 +27,5 @@ def write(f, command, encoding, delimiter=','):
             writer.writerow(command.header)
 
         # TODO format values if specified
-        writer.writerow({k: _encode(encoding, command.field_formatter(k)(v)) for k, v in row.items() })
+        with Timing.stage('writer', count=1):
+            writer.writerow({k: _encode(encoding, command.field_formatter(k)(v)) for k, v in row.items() })
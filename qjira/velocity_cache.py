@@ -0,0 +1,46 @@
+'''Persisted velocity of closed sprints.
+
+Once a sprint is complete its planned, carried and completed effort no
+longer change, so VelocityCommand keeps them in a JSON cache file and
+later runs only fetch issues of open, unknown or recently updated sprints.
+
+The file holds one bucket per query (base URL, projects, effort engine,
+include bugs), each bucket:
+
+{
+    "last_run": "2018-05-01",
+    "open_sprint_ids": ["1234"],
+    "sprints": {"1200": {"story": true, "row": {...}, "dates": ["sprint_startDate", ...]}}
+}
+'''
+import datetime
+
+from . import cache_file
+
+def _new_bucket():
+    return {'last_run': None, 'open_sprint_ids': [], 'sprints': {}}
+
+def load(path, key):
+    '''Return the bucket {key} of cache file {path}, empty when missing.'''
+    bucket = cache_file.load(path, key)
+    return bucket if bucket else _new_bucket()
+
+def save(path, key, bucket):
+    '''Replace bucket {key} in cache file {path}.'''
+    cache_file.save(path, key, bucket)
+
+def encode_sprint(row, story):
+    '''Return the cache entry of sprint velocity {row}.'''
+    dates = sorted(k for k, v in row.items() if isinstance(v, datetime.date))
+    return {
+        'story': story,
+        'row': {k: v.isoformat() if k in dates else v for k, v in row.items()},
+        'dates': dates
+    }
+
+def decode_sprint(entry):
+    '''Return the sprint velocity row of cache {entry}.'''
+    row = dict(entry['row'])
+    for k in entry['dates']:
+        row[k] = datetime.date(*map(int, row[k].split('-')))
+    return row
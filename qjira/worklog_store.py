@@ -0,0 +1,112 @@
+'''Local copy of the worklogs of a Jira instance, synced incrementally.
+
+Reports read the store instead of searching issues and requesting the
+worklog of every issue. A sync asks Jira for the ids of the worklogs
+updated and deleted since the previous sync, then requests the updated
+worklogs in batches of up to 1000 ids (/worklog/list). Worklogs only
+carry the issue id, new issue ids are resolved to keys with one search
+per 100 issues.
+
+The store is an entry per base URL of a JSON cache file:
+
+{
+    "since": 1525132800000,
+    "from": "2018-01-01",
+    "worklogs": {"10100": ["10001", "andrew.hamlin", "2018-04-05T10:39:00.000-0400", 14400]},
+    "issue_keys": {"10001": "TEST-1"}
+}
+'''
+import calendar
+import datetime
+
+from . import cache_file
+from . import jira
+from .log import Log
+
+def _epoch_millis(d):
+    return calendar.timegm(d.timetuple()) * 1000
+
+def _parse_day(started):
+    return datetime.date(*map(int, started[:10].split('-')))
+
+
+class WorklogStore(object):
+    '''Worklogs of the Jira at {base_url}, kept in JSON file {path}.'''
+
+    def __init__(self, path, base_url):
+        self.path = path
+        self.base_url = base_url
+        entry = cache_file.load(path, base_url) or {}
+        self._since = entry.get('since')
+        self._from = entry.get('from')
+        # worklog id -> [issue id, author name, started, seconds]
+        self._worklogs = entry.get('worklogs', {})
+        self._issue_keys = entry.get('issue_keys', {})
+
+    def __len__(self):
+        return len(self._worklogs)
+
+    def _covers(self, start_date):
+        '''Return True if the store holds the worklogs started on or after
+        {start_date} (None for all of them).'''
+        if self._since is None:
+            return False
+        if self._from is None:
+            return True
+        return start_date is not None and str(start_date) >= self._from
+
+    def sync(self, start_date=None, username=None, password=None):
+        '''Bring the store up to date with Jira. Worklogs started before
+        {start_date} may be left out; a later sync asking for earlier
+        worklogs starts over.'''
+        if not self._covers(start_date):
+            Log.debug('Full worklog sync from {0}'.format(start_date or 'the beginning'))
+            self._worklogs = {}
+            self._from = str(start_date) if start_date else None
+            # a worklog started on or after start_date was updated since then
+            self._since = _epoch_millis(start_date) if start_date else 0
+        else:
+            deleted, _ = jira.changed_worklogs(self.base_url, self._since, deleted=True,
+                                               username=username, password=password)
+            for worklog_id in deleted:
+                self._worklogs.pop(str(worklog_id), None)
+
+        updated, until = jira.changed_worklogs(self.base_url, self._since,
+                                               username=username, password=password)
+        Log.debug('{0} worklogs updated since {1}'.format(len(updated), self._since))
+        for w in jira.list_worklogs(self.base_url, updated, username=username, password=password):
+            self._worklogs[str(w['id'])] = [str(w['issueId']), w['author']['name'],
+                                            w['started'], w['timeSpentSeconds']]
+        self._since = until
+
+        missing = set(w[0] for w in self._worklogs.values()) - set(self._issue_keys)
+        if missing:
+            self._issue_keys.update(jira.issue_keys(self.base_url, sorted(missing),
+                                                    username=username, password=password))
+
+    def save(self):
+        cache_file.save(self.path, self.base_url, {
+            'since': self._since,
+            'from': self._from,
+            'worklogs': self._worklogs,
+            'issue_keys': self._issue_keys
+        })
+
+    def rows(self, authors=None, start_date=None, end_date=None):
+        '''Generate a row per worklog of {authors} started between
+        {start_date} and {end_date}, with the columns of flattened
+        worklog rows.'''
+        start_day = str(start_date) if start_date else None
+        end_day = str(end_date) if end_date else None
+        for issue_id, author_name, started, seconds in self._worklogs.values():
+            if authors is not None and author_name not in authors:
+                continue
+            day = started[:10]
+            if (start_day and day < start_day) or (end_day and day > end_day):
+                continue
+            yield {
+                'issue_key': self._issue_keys.get(issue_id, issue_id),
+                'worklog_author_name': author_name,
+                'worklog_started': _parse_day(started),
+                'worklog_timeSpentSeconds': seconds
+            }
@@ -25,6 +25,7 @@ setup(name='qjira',
           'keyring',
           'six',
       ],
+      extras_require={'stats': ['numpy']},
       tests_require=['contextlib2;python_version<"3.4"']
 )
      